@@ -0,0 +1,67 @@
+"""
+Admission control for the heavy verification endpoints.
+
+At most `max_concurrent` requests run at once in a process. Up to
+`max_queue` more may wait, each for at most `queue_timeout` seconds, for a
+free slot. A request beyond that, or one that waits too long, is turned
+away (the caller answers 429). A spike then produces fast, retryable
+rejections instead of a growing pile of slow requests that all time out.
+"""
+
+import threading
+import time
+
+
+class AdmissionLimiter:
+    def __init__(self, max_concurrent=4, max_queue=16, queue_timeout=10.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    def acquire(self):
+        """Takes a slot, waiting in the queue if need be; returns False if the request must be rejected."""
+        with self._condition:
+            if self.active < self.max_concurrent and not self.waiting:
+                self.active += 1
+                self.admitted += 1
+                return True
+            if self.waiting >= self.max_queue:
+                self.rejected_queue_full += 1
+                return False
+            self.waiting += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected_timeout += 1
+                        return False
+                    self._condition.wait(remaining)
+                self.active += 1
+                self.admitted += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "active": self.active,
+                "waiting": self.waiting,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "rejected_queue_full": self.rejected_queue_full,
+                "rejected_timeout": self.rejected_timeout,
+            }
@@ -0,0 +1,98 @@
+"""
+Throughput of server-side landmark extraction, in frames per second, for
+sizing the fleet that serves /landmarks and /liveness/<id>/video.
+
+Frames come from a video file or a folder of images, re-encoded as JPEG
+the way a browser would upload them. They are run through:
+
+  * sequential: one FaceMesh, decode -> downscale -> process, frame by frame;
+  * FaceMeshPool with each --workers count. Frames are spread over
+    --streams streams, as concurrent liveness sessions would be.
+
+    python benchmark_landmarks.py --video sample.mp4 --workers 1 2 4 --streams 8
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from landmark_pool import FaceMeshPool, decode_frame
+
+
+def load_frames(args):
+    """The benchmark frames as JPEG bytes."""
+    images = []
+    if args.video:
+        capture = cv2.VideoCapture(args.video)
+        while len(images) < args.max_frames:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            images.append(frame)
+        capture.release()
+    elif args.images:
+        for path in sorted(glob.glob(os.path.join(args.images, "*")))[:args.max_frames]:
+            image = cv2.imread(path)
+            if image is not None:
+                images.append(image)
+    else:  # noise frames: measures decoding and face detection cost only
+        rng = np.random.default_rng(0)
+        images = [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(min(args.max_frames, 120))]
+    return [cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, args.jpeg_quality])[1].tobytes() for image in images]
+
+
+def run_sequential(frames, max_side):
+    import mediapipe as mp
+    with mp.solutions.face_mesh.FaceMesh(max_num_faces=1, min_detection_confidence=0.6,
+                                         min_tracking_confidence=0.6) as mesh:
+        start = time.perf_counter()
+        found = sum(mesh.process(decode_frame(frame, max_side)).multi_face_landmarks is not None for frame in frames)
+        return len(frames) / (time.perf_counter() - start), found
+
+
+def run_pool(frames, workers, decode_workers, streams, max_side):
+    pool = FaceMeshPool(workers, decode_workers, max_side)
+    try:
+        pool.extract(frames[:workers * 2])  # FaceMesh graphs start on their first frame
+        start = time.perf_counter()
+        futures = [pool.submit(frame, stream=i % streams) for i, frame in enumerate(frames)]
+        found = sum(future.result() is not None for future in futures)
+        return len(frames) / (time.perf_counter() - start), found, pool.stats()
+    finally:
+        pool.close()
+
+
+def main(args):
+    frames = load_frames(args)
+    if not frames:
+        raise SystemExit("No frames to process.")
+    print(f"{len(frames)} frames, {np.mean([len(f) for f in frames]) / 1024:.0f} KiB JPEG on average, "
+          f"downscaled to {args.max_side} px, {os.cpu_count()} CPUs\n")
+    print(f"{'setup':<24} {'fps':>8} {'faces':>7} {'mesh ms/frame':>14}")
+    fps, found = run_sequential(frames, args.max_side)
+    print(f"{'sequential':<24} {fps:>8.1f} {found:>7} {'':>14}")
+    for workers in args.workers:
+        fps, found, stats = run_pool(frames, workers, args.decode_workers, args.streams, args.max_side)
+        print(f"{f'pool, {workers} workers':<24} {fps:>8.1f} {found:>7} {stats['mesh_ms_per_frame']:>14.1f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure FaceMesh landmark extraction throughput.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--video", help="Video file to take frames from.")
+    source.add_argument("--images", help="Folder of frame images.")
+    parser.add_argument("--max-frames", type=int, default=600)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Pool sizes to try.")
+    parser.add_argument("--decode-workers", type=int, default=2)
+    parser.add_argument("--streams", type=int, default=8, help="Concurrent streams the frames are spread over.")
+    parser.add_argument("--max-side", type=int, default=480, help="Downscale frames to this size first.")
+    parser.add_argument("--jpeg-quality", type=int, default=80)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,154 @@
+"""
+Microbenchmark of the liveness checks: the original per-frame functions
+(reproduced below as they were in face_reco.py) against liveness_engine.
+
+Synthetic FaceMesh frames are generated so that every challenge is met by
+some frames and missed by others. The script first checks that the engine
+makes the same decision as the original code for every frame and challenge,
+then reports the cost per frame of:
+
+  * original: json.loads of one frame + the if/elif dispatch, per challenge
+    (what each /verify-liveness POST did), and the checks alone;
+  * engine, one frame: the same JSON frame through to_frames + evaluate,
+    judging all challenges at once;
+  * engine, binary frame: a float32 frame as streamed to a liveness session;
+  * engine, batch: evaluate over a whole (frames, 468, 3) array.
+
+    python benchmark_liveness.py --frames 5000
+"""
+
+import argparse
+import json
+import logging
+import time
+
+import numpy as np
+
+import liveness_engine
+
+
+# --- The original checks, unchanged apart from reading thresholds from one dict ---
+
+def legacy_check_blink(landmarks, t):
+    if not landmarks or len(landmarks) < 160: return False
+    left_eye_dist = abs(landmarks[159][1] - landmarks[145][1])
+    return left_eye_dist < t["BLINK_EYE_GAP"]
+
+def legacy_check_head_turn(landmarks, direction, t):
+    if not landmarks or len(landmarks) < 468: return False
+    nose = landmarks[1]; left_contour = landmarks[127]; right_contour = landmarks[356]
+    dist_left = abs(nose[0] - left_contour[0]); dist_right = abs(right_contour[0] - nose[0])
+    if dist_right == 0: return False
+    ratio = dist_left / dist_right
+    logging.info(f"[Liveness] Turn Ratio: {ratio:.2f}")
+    if direction == 'left': return ratio < t["TURN_LEFT_RATIO"]
+    elif direction == 'right': return ratio > t["TURN_RIGHT_RATIO"]
+    return False
+
+def legacy_check_nod(landmarks, direction, t):
+    if not landmarks or len(landmarks) < 468: return False
+    forehead_top = landmarks[10]; chin = landmarks[152]; left_contour = landmarks[127]; right_contour = landmarks[356]
+    dist_vertical = abs(chin[1] - forehead_top[1]); dist_horizontal = abs(right_contour[0] - left_contour[0])
+    if dist_horizontal == 0: return False
+    ratio = dist_vertical / dist_horizontal
+    logging.info(f"[Liveness] Nod Ratio: {ratio:.2f}")
+    if direction == 'up': return ratio < t["NOD_UP_RATIO"]
+    elif direction == 'down': return ratio > t["NOD_UP_RATIO"] and ratio < t["NOD_DOWN_RATIO"]
+    return False
+
+def legacy_perform_liveness_check(landmarks, challenge, t):
+    if challenge == "blink": return legacy_check_blink(landmarks, t)
+    elif challenge == "turn_left": return legacy_check_head_turn(landmarks, 'left', t)
+    elif challenge == "turn_right": return legacy_check_head_turn(landmarks, 'right', t)
+    elif challenge == "nod_up": return legacy_check_nod(landmarks, 'up', t)
+    elif challenge == "nod_down": return legacy_check_nod(landmarks, 'down', t)
+    return False
+
+
+# --- Synthetic frames ---
+
+def synthetic_frames(count, seed=0):
+    """(count, 468, 3) float32 frames spread across every challenge's threshold."""
+    rng = np.random.default_rng(seed)
+    frames = rng.uniform(0.2, 0.8, size=(count, 468, 3)).astype(np.float32)
+    frames[:, 127, 0] = rng.uniform(0.25, 0.35, count)    # left contour
+    frames[:, 356, 0] = rng.uniform(0.65, 0.75, count)    # right contour
+    width = frames[:, 356, 0] - frames[:, 127, 0]
+    frames[:, 1, 0] = frames[:, 127, 0] + width * rng.uniform(0.2, 0.8, count)  # nose: yaw ratio 0.25 .. 4
+    frames[:, 145, 1] = 0.45
+    frames[:, 159, 1] = 0.45 + rng.uniform(-0.05, 0.05, count)  # eye gap 0 .. 0.05
+    frames[:, 10, 1] = 0.1
+    frames[:, 152, 1] = 0.1 + width * rng.uniform(1.2, 1.8, count)  # pitch ratio 1.2 .. 1.8
+    return frames
+
+
+def per_frame_us(func, items, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return best / len(items) * 1e6
+
+
+def main(args):
+    logging.basicConfig(level=logging.INFO if args.with_logging else logging.WARNING)
+    t = liveness_engine.DEFAULT_THRESHOLDS
+    frames = synthetic_frames(args.frames)
+    json_frames = [json.dumps(frame.tolist()) for frame in frames]
+    binary_frames = [frame.astype("<f4").tobytes() for frame in frames]
+
+    # Parity: the engine must decide exactly as the original code did.
+    decisions = liveness_engine.evaluate(frames, t)
+    mismatches = 0
+    for i, frame in enumerate(frames.tolist()):
+        for challenge in liveness_engine.CHALLENGES:
+            mismatches += legacy_perform_liveness_check(frame, challenge, t) != bool(decisions[challenge][i])
+    met = {challenge: int(decisions[challenge].sum()) for challenge in liveness_engine.CHALLENGES}
+    print(f"{args.frames} frames, challenge met in: {met}")
+    print(f"Decisions differing from the original checks: {mismatches} of {args.frames * len(met)}\n")
+
+    def original(payload):
+        landmarks = json.loads(payload)
+        return [legacy_perform_liveness_check(landmarks, c, t) for c in liveness_engine.CHALLENGES]
+
+    def engine_json(payload):
+        return liveness_engine.evaluate(liveness_engine.to_frames(json.loads(payload)), t)
+
+    def engine_binary(payload):
+        return liveness_engine.evaluate(np.frombuffer(payload, dtype="<f4").reshape(-1, 468, 3), t)
+
+    def original_parsed(landmarks):
+        return [legacy_perform_liveness_check(landmarks, c, t) for c in liveness_engine.CHALLENGES]
+
+    sample = slice(0, min(args.frames, 1000))
+    results = [
+        ("original (JSON, 5 checks)", per_frame_us(original, json_frames[sample], args.repeats)),
+        ("original, checks only", per_frame_us(original_parsed, frames[sample].tolist(), args.repeats)),
+        ("engine, JSON frame", per_frame_us(engine_json, json_frames[sample], args.repeats)),
+        ("engine, binary frame", per_frame_us(engine_binary, binary_frames[sample], args.repeats)),
+        ("engine, evaluate only", per_frame_us(lambda f: liveness_engine.evaluate(f, t),
+                                               [f[np.newaxis] for f in frames[sample]], args.repeats)),
+    ]
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        liveness_engine.evaluate(frames, t)
+    results.append((f"engine, batch of {args.frames}", (time.perf_counter() - start) / args.repeats / args.frames * 1e6))
+
+    baseline = results[0][1]
+    print(f"{'path':<28} {'us/frame':>10} {'speedup':>8}")
+    for name, us in results:
+        print(f"{name:<28} {us:>10.2f} {baseline / us:>7.1f}x")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized liveness engine against the original checks.")
+    parser.add_argument("--frames", type=int, default=5000, help="Synthetic frames to generate.")
+    parser.add_argument("--repeats", type=int, default=5, help="Timing runs (fastest is kept).")
+    parser.add_argument("--with-logging", action="store_true", help="Let the original checks' INFO logs through.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,158 @@
+"""
+Latency and field-level accuracy of the Aadhaar OCR engines on synthetic
+card images.
+
+The fixture set is generated locally and reproducibly from --seed. Each
+card is a phone-sized photo with a name, DOB, gender, Aadhaar number and
+a two-line address printed next to a noisy "photo". The photos have
+varied size, tint, blur and JPEG quality. labels.json holds the fields
+parse_aadhar_data should return for each card.
+
+Engines compared (each after downscaling to the /upload working size):
+  * page:       the original pass, Otsu over the whole card, one Tesseract run;
+  * page-text:  one Tesseract run over the detected text lines only;
+  * roi:        ocr_engine.OcrEngine, lines in parallel with per-field passes.
+
+    python benchmark_ocr.py --make 40 --fixtures ocr_fixtures
+    python benchmark_ocr.py --fixtures ocr_fixtures --engines page roi
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+
+import cv2
+import numpy as np
+
+import document_ocr
+from image_preprocessing import downscale
+
+ENGINES = ("page", "page-text", "roi")
+FIELDS = ("name", "dob", "address")
+
+FIRST_NAMES = ["Ravi", "Priya", "Amit", "Sunita", "Arjun", "Kavya", "Rahul", "Meena", "Vikram", "Anjali"]
+LAST_NAMES = ["Sharma", "Patel", "Reddy", "Iyer", "Singh", "Gupta", "Nair", "Das", "Joshi", "Khan"]
+STREETS = ["MG Road", "Station Road", "Park Street", "Lake View", "Gandhi Nagar", "Temple Street"]
+CITIES = [("Bengaluru", "Karnataka"), ("Pune", "Maharashtra"), ("Jaipur", "Rajasthan"),
+          ("Kochi", "Kerala"), ("Indore", "Madhya Pradesh"), ("Patna", "Bihar")]
+
+
+# --- 1. Fixtures ---
+
+def make_card(rng, width):
+    """One synthetic card photo and its expected fields."""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    dob = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1950, 2005)}"
+    city, state = rng.choice(CITIES)
+    street = f"{rng.randint(1, 999)} {rng.choice(STREETS)}, {city}"
+    pin = f"{rng.randint(110000, 855999)}"
+    lines = [
+        "Government of India",
+        name,
+        f"DOB: {dob}",
+        rng.choice(["Male", "Female"]),
+        f"Address: {street}",
+        f"{state} {pin}",
+        f"{rng.randint(1000, 9999)} {rng.randint(1000, 9999)} {rng.randint(1000, 9999)}",
+    ]
+    height = int(width * 0.63)
+    tint = [rng.randint(215, 250) for _ in range(3)]
+    card = np.full((height, width, 3), tint, np.uint8)
+    photo = (slice(int(height * 0.22), int(height * 0.78)), slice(int(width * 0.05), int(width * 0.27)))
+    card[photo] = np.random.default_rng(rng.randint(0, 2 ** 31)).integers(
+        40, 220, (photo[0].stop - photo[0].start, photo[1].stop - photo[1].start, 3), dtype=np.uint8)
+    scale, thickness = width / 1500, max(2, width // 800)
+    for i, line in enumerate(lines):
+        y = int(height * (0.16 + i * 0.11))
+        cv2.putText(card, line, (int(width * 0.32), y), cv2.FONT_HERSHEY_SIMPLEX, scale, (25, 25, 25), thickness, cv2.LINE_AA)
+    if rng.random() < 0.5:
+        card = cv2.GaussianBlur(card, (0, 0), rng.uniform(0.5, 1.5))
+    expected = {"name": name, "dob": dob, "address": " ".join(f"{street} {state}, {pin}".split())}
+    return card, expected
+
+
+def make_fixtures(directory, count, seed):
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    labels = {}
+    for i in range(count):
+        card, expected = make_card(rng, rng.choice([2400, 3200, 4000]))
+        name = f"card{i:03d}.jpg"
+        cv2.imwrite(os.path.join(directory, name), card, [cv2.IMWRITE_JPEG_QUALITY, rng.randint(70, 95)])
+        labels[name] = expected
+    with open(os.path.join(directory, "labels.json"), "w") as f:
+        json.dump(labels, f, indent=2)
+    print(f"Wrote {count} synthetic cards to {directory}")
+
+
+# --- 2. Benchmark ---
+
+def normalize(value):
+    return " ".join(str(value).lower().replace(" ,", ",").split())
+
+
+def read(engine, image):
+    if engine == "roi":
+        return document_ocr.get_engine().read_fields(image)
+    fields = document_ocr.read_document_fields(image, text_regions_only=engine == "page-text", engine="page")
+    return fields, {"tesseract_calls": 1, "early_stop": False}
+
+
+def run(args):
+    with open(os.path.join(args.fixtures, "labels.json")) as f:
+        labels = json.load(f)
+    images = {name: downscale(cv2.imread(os.path.join(args.fixtures, name)), args.max_side)[0] for name in sorted(labels)}
+    print(f"{len(images)} cards, downscaled to {args.max_side} px, {document_ocr.OCR_WORKERS} ROI OCR workers\n")
+
+    results = {}
+    for engine in args.engines:
+        latencies, correct, calls, early, complete = [], {field: 0 for field in FIELDS}, [], 0, 0
+        for name, image in images.items():
+            start = time.perf_counter()
+            fields, report = read(engine, image)
+            latencies.append((time.perf_counter() - start) * 1000)
+            calls.append(report["tesseract_calls"])
+            early += report["early_stop"]
+            right = [normalize(fields[field]) == normalize(labels[name][field]) for field in FIELDS]
+            for field, ok in zip(FIELDS, right):
+                correct[field] += ok
+            complete += all(right)
+        results[engine] = {
+            "mean_ms": float(np.mean(latencies)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "accuracy": {field: correct[field] / len(images) for field in FIELDS},
+            "all_fields": complete / len(images),
+            "tesseract_calls": float(np.mean(calls)),
+            "early_stops": early,
+        }
+
+    print(f"{'engine':<10} {'mean ms':>9} {'p95 ms':>9} {'name':>6} {'dob':>6} {'address':>8} {'all':>6} {'calls':>6} {'early':>6}")
+    for engine, r in results.items():
+        a = r["accuracy"]
+        print(f"{engine:<10} {r['mean_ms']:>9.1f} {r['p95_ms']:>9.1f} {a['name']:>6.0%} {a['dob']:>6.0%} "
+              f"{a['address']:>8.0%} {r['all_fields']:>6.0%} {r['tesseract_calls']:>6.1f} {r['early_stops']:>6}")
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the Aadhaar OCR engines on synthetic cards.")
+    parser.add_argument("--fixtures", default="ocr_fixtures", help="Folder of card images with labels.json.")
+    parser.add_argument("--make", type=int, metavar="N", help="Generate N synthetic cards into --fixtures first.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--max-side", type=int, default=1600, help="Working resolution, as in face_reco.")
+    parser.add_argument("--output", help="Write the results as JSON here.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.make:
+        make_fixtures(args.fixtures, args.make, args.seed)
+    results = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to: {args.output}")
@@ -0,0 +1,172 @@
+"""
+Benchmark of the fast preprocessing path (see image_preprocessing.py) against
+the original one, on a folder of document photos.
+
+For every image both paths are timed stage by stage: OCR + parsing and the
+face embedding. Accuracy is compared three ways:
+
+  * fields:    parsed name / DOB / address against --labels (a JSON object of
+               {"file name": {"name": ..., "dob": ..., "address": ...}}), or
+               against what the original path parsed when there are no labels;
+  * embedding: cosine similarity between the two paths' embeddings of the
+               same face;
+  * matching:  with --pairs (a CSV of document,live_face,same), each path's
+               match rate over same-person pairs and false-match rate over
+               different-person pairs at SIMILARITY_THRESHOLD.
+
+The fast path is off by default (FAST_PREPROCESSING=1 turns it on); enable
+it only once a run over real document / selfie pairs shows both rates hold.
+
+    python benchmark_preprocessing.py --documents samples/ --labels samples/labels.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+
+import numpy as np
+
+import face_reco
+from face_reco import CONFIG
+
+PATHS = {"original": False, "fast": True}
+FIELDS = ("name", "dob", "address")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def load_image(path):
+    with open(path, "rb") as f:
+        return face_reco.decode_image(f.read())
+
+
+def normalize(value):
+    return " ".join(str(value).lower().replace(",", " ").split())
+
+
+def cosine(a, b):
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def run_path(image, fast, repeats):
+    """Runs one path on a decoded image; returns (fields, embedding, timings in ms)."""
+    CONFIG["FAST_PREPROCESSING"] = fast
+    timings = {"downscale": [], "ocr": [], "embedding": []}
+    for _ in range(repeats):
+        start = time.perf_counter()
+        working = face_reco.working_image(image)
+        timings["downscale"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        fields = face_reco.read_document_fields(working)
+        timings["ocr"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        embedding = face_reco.face_embedding(working)
+        timings["embedding"].append(time.perf_counter() - start)
+    return fields, embedding, {stage: min(times) * 1000 for stage, times in timings.items()}
+
+
+def benchmark_documents(directory, labels, repeats):
+    names = sorted(n for n in os.listdir(directory) if n.lower().endswith(IMAGE_EXTENSIONS))
+    results = {path: {"timings": [], "fields_correct": 0, "fields_total": 0, "faces": 0} for path in PATHS}
+    embedding_similarity = []
+    for name in names:
+        image = load_image(os.path.join(directory, name))
+        if image is None:
+            print(f"Skipping {name}: not an image.")
+            continue
+        outputs = {path: run_path(image, fast, repeats) for path, fast in PATHS.items()}
+        expected = labels.get(name) or outputs["original"][0]
+        for path, (fields, embedding, timings) in outputs.items():
+            result = results[path]
+            result["timings"].append(timings)
+            result["faces"] += embedding is not None
+            for field in FIELDS:
+                if field in expected:
+                    result["fields_total"] += 1
+                    result["fields_correct"] += normalize(fields[field]) == normalize(expected[field])
+        if outputs["original"][1] is not None and outputs["fast"][1] is not None:
+            embedding_similarity.append(cosine(outputs["original"][1], outputs["fast"][1]))
+        print(f"{name}: {image.shape[1]}x{image.shape[0]}  "
+              + "  ".join(f"{path} {sum(outputs[path][2].values()):.0f} ms" for path in PATHS))
+    return len(names), results, embedding_similarity
+
+
+def benchmark_pairs(pairs_path, directory):
+    """Match rate over same-person pairs and false-match rate over different-person pairs, per path."""
+    with open(pairs_path, newline="") as f:
+        pairs = [(row["document"], row["live_face"], row["same"].strip().lower() in ("1", "true", "yes"))
+                 for row in csv.DictReader(f)]
+    same_count = sum(same for _, _, same in pairs)
+    rates = {}
+    for path, fast in PATHS.items():
+        CONFIG["FAST_PREPROCESSING"] = fast
+        matched = {True: 0, False: 0}
+        for document, live_face, same in pairs:
+            embeddings = [face_reco.face_embedding(face_reco.working_image(load_image(os.path.join(directory, name))))
+                          for name in (document, live_face)]
+            # No face means "Not Verified", i.e. no match.
+            matched[same] += None not in embeddings and cosine(*embeddings) > CONFIG["SIMILARITY_THRESHOLD"]
+        rates[path] = {
+            "match_rate": matched[True] / same_count if same_count else 0.0,
+            "false_match_rate": matched[False] / (len(pairs) - same_count) if len(pairs) > same_count else 0.0,
+        }
+    return len(pairs), rates
+
+
+def report(count, results, embedding_similarity, pair_count=0, pair_rates=None):
+    print(f"\n{count} documents, working resolution {CONFIG['WORKING_MAX_SIDE']} px, "
+          f"face cascade {'on' if face_reco.face_locator.available else 'unavailable'}")
+    print(f"{'path':<10} {'downscale':>10} {'ocr':>9} {'embedding':>10} {'total':>9} {'p95 total':>10} "
+          f"{'faces':>6} {'fields':>7}" + (f" {'match':>6} {'false':>6}" if pair_rates else ""))
+    summary = {}
+    for path, result in results.items():
+        if not result["timings"]:
+            continue
+        mean = {stage: np.mean([t[stage] for t in result["timings"]]) for stage in result["timings"][0]}
+        totals = [sum(t.values()) for t in result["timings"]]
+        field_accuracy = result["fields_correct"] / result["fields_total"] if result["fields_total"] else 0.0
+        summary[path] = {"mean_ms": mean, "p95_total_ms": float(np.percentile(totals, 95)),
+                         "faces_found": result["faces"], "field_accuracy": field_accuracy}
+        line = (f"{path:<10} {mean['downscale']:>8.1f}ms {mean['ocr']:>7.1f}ms {mean['embedding']:>8.1f}ms "
+                f"{sum(mean.values()):>7.1f}ms {summary[path]['p95_total_ms']:>8.1f}ms "
+                f"{result['faces']:>6} {field_accuracy:>7.0%}")
+        if pair_rates:
+            summary[path].update(pair_rates[path])
+            line += f" {pair_rates[path]['match_rate']:>6.1%} {pair_rates[path]['false_match_rate']:>6.1%}"
+        print(line)
+    if embedding_similarity:
+        print(f"Embedding cosine, original vs fast: mean {np.mean(embedding_similarity):.3f}, "
+              f"min {np.min(embedding_similarity):.3f}")
+    if pair_rates:
+        print(f"Match and false-match rates over {pair_count} pairs at threshold {CONFIG['SIMILARITY_THRESHOLD']}.")
+    return summary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare the fast preprocessing path with the original one.")
+    parser.add_argument("--documents", required=True, help="Folder of document photos.")
+    parser.add_argument("--labels", help="JSON file of expected fields per image file name.")
+    parser.add_argument("--pairs", help="CSV of document,live_face,same (file names in --documents).")
+    parser.add_argument("--max-side", type=int, default=CONFIG["WORKING_MAX_SIDE"], help="Working resolution.")
+    parser.add_argument("--repeats", type=int, default=1, help="Timing runs per image (fastest is kept).")
+    parser.add_argument("--output", help="Write the summary as JSON here.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    CONFIG["WORKING_MAX_SIDE"] = args.max_side
+    labels = {}
+    if args.labels:
+        with open(args.labels) as f:
+            labels = json.load(f)
+    count, results, embedding_similarity = benchmark_documents(args.documents, labels, args.repeats)
+    pair_count, pair_rates = benchmark_pairs(args.pairs, args.documents) if args.pairs else (0, None)
+    summary = report(count, results, embedding_similarity, pair_count, pair_rates)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Summary written to: {args.output}")
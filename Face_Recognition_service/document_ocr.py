@@ -0,0 +1,107 @@
+"""
+OCR of Aadhaar card photos.
+
+This is kept apart from face_reco.py so it can run in worker processes
+(see CPU_PROCESSES there) without loading DeepFace and TensorFlow. Tesseract
+is found on the PATH, or at TESSERACT_CMD if that is set; on Windows the
+default install location is used when it exists.
+
+Two engines are available: 'page' (one Tesseract pass over the whole card,
+the default) and 'roi' (ocr_engine.OcrEngine, the card's text lines read in
+parallel with per-field settings). 'roi' starts one Tesseract process per
+line, each loading the language model, so it only pays off with several
+cores per request; compare them with benchmark_ocr.py before switching.
+"""
+
+import logging
+import os
+import re
+import sys
+import threading
+
+import cv2
+import pytesseract
+
+from image_preprocessing import find_text_regions, text_image
+from ocr_engine import OcrEngine
+
+WINDOWS_TESSERACT = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+if os.environ.get("TESSERACT_CMD"):
+    pytesseract.pytesseract.tesseract_cmd = os.environ["TESSERACT_CMD"]
+elif sys.platform == "win32" and os.path.exists(WINDOWS_TESSERACT):
+    pytesseract.pytesseract.tesseract_cmd = WINDOWS_TESSERACT
+
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", 4)) # Tesseract processes the 'roi' engine runs at once
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = OcrEngine(parse_aadhar_data, workers=OCR_WORKERS)
+    return _engine
+
+
+def extract_text_with_ocr(image, text_regions_only=True):
+    """Enhances image and extracts text using Pytesseract."""
+    try:
+        thresh = None
+        if text_regions_only:
+            # Only the printed lines, not the photo, QR code and emblem.
+            thresh = text_image(image, find_text_regions(image))
+        if thresh is None:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        text = pytesseract.image_to_string(thresh, lang='eng')
+        logging.info(f"--- OCR Raw Text ---\n{text}\n--------------------")
+        return text
+    except Exception as e:
+        logging.error(f"Error during OCR extraction: {e}")
+        return ""
+
+def parse_aadhar_data(text):
+    """Parses raw OCR text to find Name, DOB, and Address."""
+    data = {"name": "Not Found", "dob": "Not Found", "address": "Not Found"}
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+
+    # DOB Extraction
+    dob_match = re.search(r'(\d{4}-\d{2}-\d{2})|(\d{2}/\d{2}/\d{4})', text)
+    if dob_match:
+        dob_str = dob_match.group(0)
+        if '-' in dob_str:
+            parts = dob_str.split('-')
+            data["dob"] = f"{parts[2]}/{parts[1]}/{parts[0]}"
+        else:
+            data["dob"] = dob_str
+    
+        # Name Extraction (usually the line above DOB)
+        for i, line in enumerate(lines):
+            if dob_str in line and i > 0:
+                potential_name = lines[i-1]
+                if not any(char.isdigit() for char in potential_name) and len(potential_name) > 2:
+                    data["name"] = potential_name
+                    break
+
+    # Address Extraction
+    address_match = re.search(r'Address\s*:([\s\S]*?)(\d{6})', text, re.IGNORECASE)
+    if address_match:
+        address_text = address_match.group(1).replace('\n', ' ').strip()
+        pin_code = address_match.group(2)
+        full_address = f"{address_text}, {pin_code}"
+        data["address"] = ' '.join(full_address.split())
+
+    logging.info(f"Parsed OCR Data: {data}")
+    return data
+
+def read_document_fields(image, text_regions_only=True, engine="page"):
+    """OCR stage of /upload: the Aadhaar fields found on the decoded document image."""
+    if engine == "roi":
+        try:
+            fields, report = get_engine().read_fields(image)
+            logging.info(f"ROI OCR: {report}")
+            return fields
+        except Exception as e:
+            logging.error(f"Error during ROI OCR, falling back to a full-page pass: {e}")
+    return parse_aadhar_data(extract_text_with_ocr(image, text_regions_only))
@@ -0,0 +1,129 @@
+"""
+Micro-batched face-embedding worker for the verification service.
+
+Every /upload request needs two Facenet embeddings. Running one forward pass
+per face means concurrent requests queue up on the same model, each paying
+the full per-call overhead of the framework. EmbeddingBatcher instead owns
+the model: request threads hand it aligned face crops and get a Future
+back, and a single worker thread collects whatever has arrived, up to
+`max_batch_size` faces or `max_wait_ms` after the first one, and runs them
+through the model as one batch.
+
+Face detection and alignment stay in the request threads (they are per
+image anyway); only the forward pass is batched.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+
+_STOP = object()  # tells the worker thread to exit
+
+
+def fit_to_input(face, size=(160, 160)):
+    """Resizes a face crop to the model's input size (h, w), keeping its aspect ratio.
+
+    The crop is scaled to fit and zero-padded, and pixel values end up in
+    [0, 1], the way DeepFace prepares faces for Facenet.
+    """
+    face = np.asarray(face, dtype=np.float32)
+    if face.max() > 1:
+        face = face / 255.0
+    height, width = face.shape[:2]
+    factor = min(size[0] / height, size[1] / width)
+    resized = cv2.resize(face, (max(1, int(width * factor)), max(1, int(height * factor))))
+    pad_h, pad_w = size[0] - resized.shape[0], size[1] - resized.shape[1]
+    return np.pad(resized, ((pad_h // 2, pad_h - pad_h // 2), (pad_w // 2, pad_w - pad_w // 2), (0, 0)))
+
+
+class EmbeddingBatcher:
+    """Runs `forward` on batches of faces submitted from many threads.
+
+    `forward` takes a float32 array of shape (n, h, w, 3) and returns n
+    embeddings. It is only ever called from the worker thread.
+    """
+
+    def __init__(self, forward, max_batch_size=16, max_wait_ms=10, input_size=(160, 160)):
+        self.forward = forward
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.input_size = input_size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._forward_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, face):
+        """Queues one face crop (h x w x 3); the Future resolves to its embedding as a list."""
+        future = Future()
+        self._queue.put((fit_to_input(face, self.input_size), future))
+        return future
+
+    def embed(self, face, timeout=None):
+        return self.submit(face).result(timeout)
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _collect(self):
+        """Blocks for the first face, then gathers more until the batch is full or the wait is over."""
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)  # finish this batch, then stop
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            faces, futures = zip(*batch)
+            start = time.perf_counter()
+            try:
+                embeddings = np.asarray(self.forward(np.stack(faces)), dtype=np.float32)
+            except Exception as e:
+                logging.error(f"Embedding batch of {len(batch)} failed: {e}")
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+                self._forward_seconds += time.perf_counter() - start
+            for future, embedding in zip(futures, embeddings):
+                future.set_result(embedding.tolist())
+
+    def stats(self):
+        with self._lock:
+            batches = sum(self._batch_sizes.values())
+            faces = sum(size * count for size, count in self._batch_sizes.items())
+            return {
+                "batches": batches,
+                "faces": faces,
+                "mean_batch_size": faces / batches if batches else 0.0,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "forward_ms_per_face": self._forward_seconds / faces * 1000 if faces else 0.0,
+                "queued": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            }
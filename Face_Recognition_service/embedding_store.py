@@ -0,0 +1,118 @@
+"""
+Face-embedding store for the verification service.
+
+Embeddings are keyed by a content hash of the uploaded image bytes, so when a
+user retries verification with the same Aadhaar image its Facenet embedding is
+reused instead of being decoded and run through DeepFace again.
+
+Vectors live in one preallocated float32 array (capacity x dim); a dict maps
+each key to its row and an OrderedDict keeps the least recently used key
+first for eviction. Optionally the store is saved to a .npz file and loaded
+again on start-up.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def image_key(image_bytes, model_name="Facenet"):
+    """Content hash of an uploaded image, per embedding model."""
+    digest = hashlib.sha256(image_bytes)
+    digest.update(model_name.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingStore:
+    """A thread-safe LRU store of float32 embeddings with optional persistence."""
+
+    def __init__(self, capacity=2048, dim=128, path=None):
+        self.capacity = capacity
+        self.dim = dim
+        self.path = path
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._slots = OrderedDict()  # key -> row in _vectors, least recently used first
+        self._free = list(range(capacity - 1, -1, -1))
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            self.load()
+
+    def get(self, key):
+        """Returns a copy of the stored embedding, or None."""
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                self.misses += 1
+                return None
+            self._slots.move_to_end(key)
+            self.hits += 1
+            return self._vectors[slot].copy()
+
+    def put(self, key, embedding):
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if vector.shape[0] != self.dim:
+            raise ValueError(f"Expected a {self.dim}-dimensional embedding, got {vector.shape[0]}.")
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                if self._free:
+                    slot = self._free.pop()
+                else:
+                    _, slot = self._slots.popitem(last=False)  # evict the least recently used
+                self._slots[key] = slot
+            else:
+                self._slots.move_to_end(key)
+            self._vectors[slot] = vector
+            self._unsaved += 1
+
+    def __len__(self):
+        return len(self._slots)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._slots),
+                "capacity": self.capacity,
+                "memory_bytes": self._vectors.nbytes,
+                "path": self.path,
+            }
+
+    def save(self, min_changes=1):
+        """Writes the store to `path` if at least `min_changes` puts happened since the last save."""
+        if not self.path:
+            return
+        with self._lock:
+            if self._unsaved < min_changes:
+                return
+            keys = list(self._slots)  # oldest first, so LRU order survives a reload
+            vectors = self._vectors[[self._slots[k] for k in keys]] if keys else np.zeros((0, self.dim), np.float32)
+            self._unsaved = 0
+        tmp_path = self.path + ".tmp.npz"
+        np.savez(tmp_path, keys=np.array(keys, dtype="U64"), vectors=vectors)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        try:
+            with np.load(self.path) as data:
+                keys, vectors = data["keys"], data["vectors"]
+        except Exception as e:
+            logging.warning(f"Could not load embedding store from {self.path}: {e}")
+            return
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            logging.warning(f"Ignoring embedding store {self.path}: expected {self.dim}-dimensional vectors.")
+            return
+        for key, vector in zip(keys[-self.capacity:], vectors[-self.capacity:]):
+            self.put(str(key), vector)
+        self._unsaved = 0
+        logging.info(f"Loaded {len(self)} face embeddings from {self.path}.")
@@ -1,5 +1,4 @@
 import cv2
-import mediapipe as mp
 import numpy as np
 from deepface import DeepFace
 from flask import Flask, request, jsonify, render_template
@@ -7,27 +6,80 @@ from flask_cors import CORS
 import os
 import json
 import uuid
-from threading import Thread
+from threading import Thread, Lock
 import random
+from collections import deque
 import logging
 import re
-import pytesseract
-
-# --- IMPORTANT: TESSERACT INSTALLATION PATH (For Windows Users) ---
-# If you are on Windows and Tesseract is not in your system's PATH,
-# you may need to uncomment and update the following line:
-# pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+import time
+import atexit
+import functools
+import multiprocessing
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+
+from admission import AdmissionLimiter
+from embedding_service import EmbeddingBatcher
+from embedding_store import EmbeddingStore, image_key
+from image_preprocessing import FaceLocator, downscale
+from landmark_pool import FaceMeshPool
+import document_ocr
+import liveness_engine
+from liveness_sessions import FRAME_BYTES, SessionStore, decode_frames
+
+try: # WebSocket streaming of liveness frames is optional
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
+
+# --- IMPORTANT: TESSERACT INSTALLATION PATH ---
+# Tesseract must be on the PATH. Otherwise set the TESSERACT_CMD environment
+# variable to the executable (on Windows, C:\Program Files\Tesseract-OCR is
+# picked up automatically; see document_ocr.py).
 
 
 # --- 1. INITIALIZATIONS AND CONFIGURATION ---
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 app = Flask(__name__)
 CORS(app) # Enable Cross-Origin Resource Sharing
+sock = Sock(app) if Sock else None
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 CONFIG = {
     "SIMILARITY_THRESHOLD": 0.55, # Stricter threshold for better accuracy
-    "NUM_LIVENESS_CHALLENGES": 2 # Number of random challenges to perform
+    "NUM_LIVENESS_CHALLENGES": 2, # Number of random challenges to perform
+    "EMBEDDING_STORE_SIZE": int(os.environ.get("EMBEDDING_STORE_SIZE", 2048)), # Document embeddings kept in memory
+    "EMBEDDING_STORE_PATH": os.environ.get("EMBEDDING_STORE_PATH"), # Optional .npz file to persist them
+    "EMBEDDING_STORE_SAVE_EVERY": 50, # Save after this many new embeddings (and at exit)
+    "VERIFICATION_WORKERS": int(os.environ.get("VERIFICATION_WORKERS", 4)), # Threads shared by /upload's OCR and embedding stages
+    "FAST_PREPROCESSING": os.environ.get("FAST_PREPROCESSING") == "1", # Downscale, crop to the face / text before DeepFace and Tesseract; off until benchmark_preprocessing.py shows match rates hold
+    "WORKING_MAX_SIDE": 1600, # Longest side of uploads after downscaling, in pixels
+    "FACE_CROP_MARGIN": 0.3, # Margin around the detected face, as a fraction of its size
+    "FACE_CASCADE_PATH": os.environ.get("FACE_CASCADE_PATH"), # Haar cascade for face cropping (default: the one bundled with OpenCV)
+    "EMBEDDING_BATCH_SIZE": int(os.environ.get("EMBEDDING_BATCH_SIZE", 16)), # Most faces per Facenet forward pass
+    "EMBEDDING_MAX_WAIT_MS": float(os.environ.get("EMBEDDING_MAX_WAIT_MS", 10)), # How long a face may wait for others to batch with
+    "EMBEDDING_CHECK_IMAGES": os.environ.get("EMBEDDING_CHECK_IMAGES"), # Folder of face photos; batching is used only if it matches DeepFace.represent on them
+    "EMBEDDING_CHECK_MIN_COSINE": float(os.environ.get("EMBEDDING_CHECK_MIN_COSINE", 0.999)), # Lowest batched-vs-represent cosine similarity the check accepts
+    "LIVENESS_WINDOW_FRAMES": 15, # Sliding window each streamed challenge is judged over
+    "LIVENESS_HOLD_FRAMES": 3, # Consecutive frames a pose must be held (a blink needs one)
+    "LIVENESS_NEUTRAL_FRAMES": 2, # Frames without the action required before it
+    "LIVENESS_MAX_FRAMES": 1800, # Frames accepted per session (~60 s at 30 fps)
+    "LIVENESS_SESSION_TTL": 120, # Seconds a liveness session stays open
+    "LEGACY_SINGLE_FRAME_LIVENESS": os.environ.get("LEGACY_SINGLE_FRAME_LIVENESS") == "1", # Re-enable /verify-liveness and /upload without a liveness session (spoofable)
+    "LANDMARK_WORKERS": int(os.environ.get("LANDMARK_WORKERS", 2)), # FaceMesh instances for server-side landmarks (0 disables)
+    "LANDMARK_DECODE_WORKERS": int(os.environ.get("LANDMARK_DECODE_WORKERS", 2)), # Threads decoding and downscaling video frames
+    "LANDMARK_MAX_SIDE": 480, # Longest side of video frames given to FaceMesh, in pixels
+    "LANDMARK_MAX_PENDING": 8, # Frames a WebSocket client may have in flight
+    "LANDMARK_TIMEOUT": float(os.environ.get("LANDMARK_TIMEOUT", 20)), # Seconds to wait for a request's landmarks before a 503
+    "BLINK_EYE_GAP": 0.025, # Blink: left-eye lid gap (landmarks 159/145) below this
+    "TURN_LEFT_RATIO": 0.5, # Turn left: nose-to-contour ratio (1-127 / 356-1) below this
+    "TURN_RIGHT_RATIO": 1.8, # Turn right: the same ratio above this
+    "NOD_UP_RATIO": 1.42, # Nod up: face height-to-width ratio (152-10 / 356-127) below this
+    "NOD_DOWN_RATIO": 1.60, # Nod down: the same ratio between NOD_UP_RATIO and this
+    "MAX_CONCURRENT_VERIFICATIONS": int(os.environ.get("MAX_CONCURRENT_VERIFICATIONS", 4)), # Heavy requests running at once, per process
+    "MAX_QUEUED_VERIFICATIONS": int(os.environ.get("MAX_QUEUED_VERIFICATIONS", 16)), # Heavy requests allowed to wait; more get a 429
+    "QUEUE_TIMEOUT": float(os.environ.get("QUEUE_TIMEOUT", 10)), # Seconds a queued request waits before a 429
+    "CPU_PROCESSES": int(os.environ.get("CPU_PROCESSES", 0)), # Processes for OCR (0 runs it on threads in this process)
+    "OCR_ENGINE": os.environ.get("OCR_ENGINE", "page"), # 'page': one whole-card pass; 'roi': text lines in parallel with per-field settings (see benchmark_ocr.py)
+    "DEFER_MODEL_LOADING": os.environ.get("DEFER_MODEL_LOADING") == "1" # Leave warm_up() to the caller (serve.py does, per worker)
 }
 
 # Folder setup
@@ -35,10 +87,6 @@ UPLOAD_FOLDER = "uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
-# MediaPipe setup for Liveness Detection
-mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(max_num_faces=1, min_detection_confidence=0.6, min_tracking_confidence=0.6)
-
 # Liveness Challenges Dictionary
 LIVENESS_CHALLENGES = {
     "blink": "Please blink your eyes.",
@@ -48,26 +96,114 @@ LIVENESS_CHALLENGES = {
     "nod_down": "Slowly tilt your head downwards."
 }
 
-# Pre-load DeepFace model for Face Recognition
-try:
-    logging.info("DeepFace Facenet model pre-loading...")
-    DeepFace.represent(np.zeros((160, 160, 3), dtype=np.uint8), model_name="Facenet", enforce_detection=False)
-    logging.info("DeepFace Facenet model pre-loaded successfully.")
-except Exception as e:
-    logging.error(f"Error pre-loading DeepFace Facenet model: {e}.")
+# Document-face embeddings, keyed by a hash of the uploaded image, so a user
+# retrying verification with the same document is not re-embedded.
+embedding_store = EmbeddingStore(capacity=CONFIG["EMBEDDING_STORE_SIZE"], dim=128, path=CONFIG["EMBEDDING_STORE_PATH"])
+atexit.register(embedding_store.save)
+
+# OCR, document-face and live-face embedding are independent, so /upload runs
+# them side by side. OpenCV, TensorFlow and the Tesseract subprocess all
+# release the GIL, so threads are enough.
+verification_pool = ThreadPoolExecutor(max_workers=CONFIG["VERIFICATION_WORKERS"], thread_name_prefix="verify")
+
+# Cheap face detector used to crop uploads before DeepFace sees them.
+face_locator = FaceLocator(CONFIG["FACE_CASCADE_PATH"])
+
+# Heavy endpoints (/upload, /landmarks) are admitted through this limiter.
+admission = AdmissionLimiter(CONFIG["MAX_CONCURRENT_VERIFICATIONS"], CONFIG["MAX_QUEUED_VERIFICATIONS"], CONFIG["QUEUE_TIMEOUT"])
+
+# Optional process pool for OCR. Workers are spawned, not forked, and only
+# import document_ocr, so they never load TensorFlow.
+cpu_pool = None
+cpu_pool_lock = Lock()
+
+def get_cpu_pool():
+    global cpu_pool
+    if CONFIG["CPU_PROCESSES"] <= 0:
+        return None
+    with cpu_pool_lock:
+        if cpu_pool is None:
+            cpu_pool = ProcessPoolExecutor(CONFIG["CPU_PROCESSES"], mp_context=multiprocessing.get_context("spawn"))
+    return cpu_pool
+
+def facenet_forward(faces):
+    """One Facenet forward pass over a (n, 160, 160, 3) batch of prepared faces."""
+    model = DeepFace.build_model("Facenet") # cached by DeepFace after the first call
+    model = getattr(model, "model", model) # newer DeepFace versions wrap the Keras model
+    return np.asarray(model(faces, training=False))
+
+# Embedding requests can share one Facenet instance through this worker,
+# which batches faces from concurrent requests into single forward passes.
+# It is started on first use, so that no thread is running before a fork.
+# The worker prepares faces itself instead of leaving it to DeepFace.represent,
+# so it is only used once verify_batched_embeddings() has shown both agree
+# with the installed DeepFace; until then every embedding goes through represent.
+embedding_worker = None
+use_batched_embeddings = False
+embedding_worker_lock = Lock()
+
+def get_embedding_worker():
+    global embedding_worker
+    with embedding_worker_lock:
+        if embedding_worker is None:
+            embedding_worker = EmbeddingBatcher(facenet_forward, CONFIG["EMBEDDING_BATCH_SIZE"], CONFIG["EMBEDDING_MAX_WAIT_MS"])
+    return embedding_worker
+
+def warm_up():
+    """Loads Facenet and runs it once, so the first request does not pay for it.
+
+    Runs at import unless DEFER_MODEL_LOADING=1. serve.py sets that and calls
+    this in each worker after the fork, since TensorFlow does not survive a fork.
+    """
+    # Pre-load DeepFace model for Face Recognition
+    try:
+        logging.info("DeepFace Facenet model pre-loading...")
+        DeepFace.represent(np.zeros((160, 160, 3), dtype=np.uint8), model_name="Facenet", enforce_detection=False)
+        logging.info("DeepFace Facenet model pre-loaded successfully.")
+    except Exception as e:
+        logging.error(f"Error pre-loading DeepFace Facenet model: {e}.")
+    if CONFIG["EMBEDDING_CHECK_IMAGES"]:
+        verify_batched_embeddings(CONFIG["EMBEDDING_CHECK_IMAGES"])
+
+def limited(**rejection):
+    """Admits the request through the admission limiter, answering 429 when the service is saturated.
+
+    `rejection` holds the fields besides "message" that the endpoint's other
+    error responses carry, so the 429 body has the same shape.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not admission.acquire():
+                response = jsonify({**rejection, "message": "The verification service is busy. Please try again shortly."})
+                response.headers["Retry-After"] = str(max(1, round(CONFIG["QUEUE_TIMEOUT"])))
+                return response, 429
+            try:
+                return view(*args, **kwargs)
+            finally:
+                admission.release()
+        return wrapper
+    return decorator
 
 
 # --- 2. IMAGE, FACE, AND OCR PROCESSING UTILITIES ---
 
-def preprocess_image_for_ocr(image_bytes):
-    """Decodes image bytes into an OpenCV image object for OCR."""
+def decode_image(image_bytes):
+    """Decodes uploaded image bytes once; the array is then shared read-only by every stage."""
     try:
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
     except Exception as e:
-        logging.error(f"Error decoding image for OCR: {e}")
+        logging.error(f"Error decoding image: {e}")
         return None
 
+def timed(timings, stage, func, *args):
+    """Runs func(*args), recording its duration in milliseconds under timings[stage]."""
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000, 1)
+
 def preprocess_image_for_face(image):
     """Prepares an image for DeepFace embedding generation."""
     if image is None or image.size == 0: return None
@@ -77,107 +213,181 @@ def preprocess_image_for_face(image):
     return image
 
 
+def represent_embedding(image):
+    """Embedding of the face in a prepared image, in one DeepFace.represent call."""
+    embedding_objs = DeepFace.represent(image, model_name='Facenet', detector_backend='opencv', enforce_detection=True, align=True)
+    return embedding_objs[0]['embedding'] if embedding_objs else None
+
+def batched_embedding(image):
+    """Embedding of the face in a prepared image, with the forward pass on the embedding worker.
+
+    DeepFace detects and aligns the face in the calling thread, as represent does.
+    """
+    face_objs = DeepFace.extract_faces(image, detector_backend='opencv', enforce_detection=True, align=True)
+    if not face_objs:
+        return None
+    # extract_faces returns RGB; flip back to the channel order DeepFace.represent feeds Facenet.
+    return get_embedding_worker().embed(face_objs[0]['face'][:, :, ::-1])
+
+def embedding_path_agreement(images):
+    """Cosine similarity between batched_embedding and represent_embedding, per image with a face."""
+    similarities = []
+    for image in images:
+        image = preprocess_image_for_face(image)
+        try:
+            expected, actual = represent_embedding(image), batched_embedding(image)
+        except ValueError: # no face found
+            continue
+        if expected is not None and actual is not None:
+            similarities.append(float(np.dot(expected, actual) / (np.linalg.norm(expected) * np.linalg.norm(actual))))
+    return similarities
+
+def load_check_images(directory):
+    images = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), 'rb') as f:
+            image = decode_image(f.read())
+        if image is not None:
+            images.append(image)
+    return images
+
+def verify_batched_embeddings(directory):
+    """Turns the embedding worker on if it matches DeepFace.represent on the face photos in directory."""
+    global use_batched_embeddings
+    try:
+        similarities = embedding_path_agreement(load_check_images(directory))
+    except Exception as e:
+        logging.error(f"Embedding check failed: {e}. Using DeepFace.represent.")
+        return False
+    if not similarities:
+        logging.error(f"Embedding check found no faces in {directory}. Using DeepFace.represent.")
+        return False
+    lowest = min(similarities)
+    use_batched_embeddings = lowest >= CONFIG["EMBEDDING_CHECK_MIN_COSINE"]
+    if use_batched_embeddings:
+        logging.info(f"Batched embeddings match DeepFace.represent on {len(similarities)} faces (lowest cosine {lowest:.5f}).")
+    else:
+        logging.error(f"Batched embeddings differ from DeepFace.represent (lowest cosine {lowest:.5f} over {len(similarities)} faces). Using DeepFace.represent.")
+    return use_batched_embeddings
+
 def generate_embedding(image):
-    """Generates a face embedding from an image using DeepFace."""
+    """Generates a face embedding from an image using DeepFace.
+
+    The forward pass runs batched on the embedding worker once
+    verify_batched_embeddings() has passed, and in DeepFace.represent otherwise.
+    """
     try:
         processed_image = preprocess_image_for_face(image)
-        embedding_objs = DeepFace.represent(processed_image, model_name='Facenet', enforce_detection=True)
-        if embedding_objs and len(embedding_objs) > 0:
-            return embedding_objs[0]['embedding']
+        embedding = (batched_embedding if use_batched_embeddings else represent_embedding)(processed_image)
+        if embedding is not None:
+            return embedding
         logging.warning("No face detected by DeepFace for embedding generation.")
         return None
     except Exception as e:
         logging.warning(f"Could not generate face embedding: {e}")
         return None
 
+def working_image(image):
+    """Bounds an uploaded image to the working resolution (when fast preprocessing is on)."""
+    if image is None or not CONFIG["FAST_PREPROCESSING"]:
+        return image
+    return downscale(image, CONFIG["WORKING_MAX_SIDE"])[0]
+
+def face_embedding(image):
+    """generate_embedding on just the face, when the Haar cascade can find it.
+
+    DeepFace then only searches a small crop. If the cascade misses the face,
+    or DeepFace rejects the crop, the whole (working) image is used instead.
+    """
+    if image is not None and CONFIG["FAST_PREPROCESSING"]:
+        face = face_locator.crop(image, CONFIG["FACE_CROP_MARGIN"])
+        if face is not None:
+            embedding = generate_embedding(face)
+            if embedding is not None:
+                return embedding
+    return generate_embedding(image)
+
+def cached_embedding(image_bytes, image):
+    """face_embedding, reusing the stored result for previously seen image bytes."""
+    # Cropped and full-image embeddings differ slightly, so they are stored apart.
+    key = image_key(image_bytes, "Facenet/crop" if CONFIG["FAST_PREPROCESSING"] else "Facenet")
+    embedding = embedding_store.get(key)
+    if embedding is not None:
+        logging.info("Reusing stored face embedding for this document.")
+        return embedding
+    embedding = face_embedding(image)
+    if embedding is not None:
+        embedding_store.put(key, embedding)
+        embedding_store.save(min_changes=CONFIG["EMBEDDING_STORE_SAVE_EVERY"])
+    return embedding
+
 def extract_text_with_ocr(image):
     """Enhances image and extracts text using Pytesseract."""
-    try:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-        text = pytesseract.image_to_string(thresh, lang='eng')
-        logging.info(f"--- OCR Raw Text ---\n{text}\n--------------------")
-        return text
-    except Exception as e:
-        logging.error(f"Error during OCR extraction: {e}")
-        return ""
-
-def parse_aadhar_data(text):
-    """Parses raw OCR text to find Name, DOB, and Address."""
-    data = {"name": "Not Found", "dob": "Not Found", "address": "Not Found"}
-    lines = [line.strip() for line in text.split('\n') if line.strip()]
-
-    # DOB Extraction
-    dob_match = re.search(r'(\d{4}-\d{2}-\d{2})|(\d{2}/\d{2}/\d{4})', text)
-    if dob_match:
-        dob_str = dob_match.group(0)
-        if '-' in dob_str:
-            parts = dob_str.split('-')
-            data["dob"] = f"{parts[2]}/{parts[1]}/{parts[0]}"
-        else:
-            data["dob"] = dob_str
-    
-        # Name Extraction (usually the line above DOB)
-        for i, line in enumerate(lines):
-            if dob_str in line and i > 0:
-                potential_name = lines[i-1]
-                if not any(char.isdigit() for char in potential_name) and len(potential_name) > 2:
-                    data["name"] = potential_name
-                    break
-
-    # Address Extraction
-    address_match = re.search(r'Address\s*:([\s\S]*?)(\d{6})', text, re.IGNORECASE)
-    if address_match:
-        address_text = address_match.group(1).replace('\n', ' ').strip()
-        pin_code = address_match.group(2)
-        full_address = f"{address_text}, {pin_code}"
-        data["address"] = ' '.join(full_address.split())
-
-    logging.info(f"Parsed OCR Data: {data}")
-    return data
+    return document_ocr.extract_text_with_ocr(image, CONFIG["FAST_PREPROCESSING"])
+
+def read_document_fields(image):
+    """OCR stage of /upload: the Aadhaar fields found on the decoded document image.
+
+    With CPU_PROCESSES set, it runs in the OCR process pool instead of this process.
+    """
+    pool = get_cpu_pool()
+    if pool is None:
+        return document_ocr.read_document_fields(image, CONFIG["FAST_PREPROCESSING"], CONFIG["OCR_ENGINE"])
+    return pool.submit(document_ocr.read_document_fields, image, CONFIG["FAST_PREPROCESSING"], CONFIG["OCR_ENGINE"]).result()
+
+# Needs the embedding helpers above, so it runs here rather than next to warm_up().
+if not CONFIG["DEFER_MODEL_LOADING"]:
+    warm_up()
 
 
 # --- 3. LIVENESS CHECKING LOGIC ---
 
-def check_blink(landmarks):
-    """Returns True if a blink is detected based on vertical eye distance."""
-    if not landmarks or len(landmarks) < 160: return False
-    # Landmarks 159 (lower eyelid) and 145 (upper eyelid) for the left eye
-    left_eye_dist = abs(landmarks[159][1] - landmarks[145][1])
-    return left_eye_dist < 0.025
-
-def check_head_turn(landmarks, direction):
-    """Returns True if a head turn is detected based on nose-to-contour ratio."""
-    if not landmarks or len(landmarks) < 468: return False
-    nose = landmarks[1]; left_contour = landmarks[127]; right_contour = landmarks[356]
-    dist_left = abs(nose[0] - left_contour[0]); dist_right = abs(right_contour[0] - nose[0])
-    if dist_right == 0: return False # Avoid division by zero
-    ratio = dist_left / dist_right
-    logging.info(f"[Liveness] Turn Ratio: {ratio:.2f}")
-    if direction == 'left': return ratio < 0.5
-    elif direction == 'right': return ratio > 1.8
-    return False
-
-def check_nod(landmarks, direction):
-    """Returns True if a nod is detected based on face height-to-width ratio."""
-    if not landmarks or len(landmarks) < 468: return False
-    forehead_top = landmarks[10]; chin = landmarks[152]; left_contour = landmarks[127]; right_contour = landmarks[356]
-    dist_vertical = abs(chin[1] - forehead_top[1]); dist_horizontal = abs(right_contour[0] - left_contour[0])
-    if dist_horizontal == 0: return False # Avoid division by zero
-    ratio = dist_vertical / dist_horizontal
-    logging.info(f"[Liveness] Nod Ratio: {ratio:.2f}")
-    if direction == 'up': return ratio < 1.42
-    elif direction == 'down': return ratio > 1.42 and ratio < 1.60
-    return False
+def liveness_thresholds():
+    return {key: CONFIG[key] for key in liveness_engine.DEFAULT_THRESHOLDS}
 
 def perform_liveness_check(landmarks, challenge):
-    """Dispatcher function to call the correct liveness check."""
-    if challenge == "blink": return check_blink(landmarks)
-    elif challenge == "turn_left": return check_head_turn(landmarks, 'left')
-    elif challenge == "turn_right": return check_head_turn(landmarks, 'right')
-    elif challenge == "nod_up": return check_nod(landmarks, 'up')
-    elif challenge == "nod_down": return check_nod(landmarks, 'down')
-    return False
+    """Returns True if a single frame of landmarks meets the challenge."""
+    try:
+        frames = liveness_engine.to_frames(landmarks, challenge)
+    except ValueError:
+        return False
+    return bool(liveness_engine.check(frames, challenge, liveness_thresholds())[0])
+
+def check_frames(frames, challenge):
+    """The challenge judged for each frame of a (frames, 468, 3) array, in one vectorized pass."""
+    return liveness_engine.check(frames, challenge, liveness_thresholds())
+
+# Server-side landmark extraction: one FaceMesh per pool worker, started on first use.
+landmark_pool = None
+landmark_pool_lock = Lock()
+
+def get_landmark_pool():
+    global landmark_pool
+    with landmark_pool_lock:
+        if landmark_pool is None:
+            landmark_pool = FaceMeshPool(CONFIG["LANDMARK_WORKERS"], CONFIG["LANDMARK_DECODE_WORKERS"], CONFIG["LANDMARK_MAX_SIDE"],
+                                         timeout=CONFIG["LANDMARK_TIMEOUT"])
+    return landmark_pool
+
+def feed_found_faces(session, landmarks, images):
+    """Feeds the frames where a face was found to a liveness session; returns its status.
+
+    `images` are the compressed frames the landmarks came from. The session
+    remembers those with a face, for /upload to check the live face against.
+    """
+    found = [i for i, frame in enumerate(landmarks) if frame is not None]
+    session.remember_images(images[i] for i in found)
+    return session.feed(np.stack([landmarks[i] for i in found])) if found else session.status()
+
+# Streamed liveness sessions, each bound to the sequence /get-challenge-sequence handed out.
+liveness_sessions = SessionStore(
+    check_frames,
+    ttl=CONFIG["LIVENESS_SESSION_TTL"],
+    window_frames=CONFIG["LIVENESS_WINDOW_FRAMES"],
+    hold_frames=CONFIG["LIVENESS_HOLD_FRAMES"],
+    neutral_frames=CONFIG["LIVENESS_NEUTRAL_FRAMES"],
+    max_frames=CONFIG["LIVENESS_MAX_FRAMES"]
+)
 
 # --- 4. FLASK API ROUTES ---
 
@@ -192,12 +402,19 @@ def get_challenge_sequence():
     all_challenges = list(LIVENESS_CHALLENGES.keys())
     challenge_sequence = random.sample(all_challenges, k=CONFIG["NUM_LIVENESS_CHALLENGES"])
     instructions_sequence = [LIVENESS_CHALLENGES[key] for key in challenge_sequence]
-    logging.info(f"Generated new challenge sequence: {challenge_sequence}")
-    return jsonify({"sequence": challenge_sequence, "instructions": instructions_sequence})
+    session = liveness_sessions.create(challenge_sequence)
+    logging.info(f"Generated new challenge sequence: {challenge_sequence} (session {session.id})")
+    return jsonify({"sequence": challenge_sequence, "instructions": instructions_sequence, "session_id": session.id})
 
 @app.route('/verify-liveness', methods=['POST'])
 def verify_liveness():
-    """Verifies a single liveness challenge step."""
+    """Verifies a single liveness challenge step (legacy mode only).
+
+    One client-supplied frame is easy to forge, so this is off unless
+    LEGACY_SINGLE_FRAME_LIVENESS is set; use a liveness session instead.
+    """
+    if not CONFIG["LEGACY_SINGLE_FRAME_LIVENESS"]:
+        return jsonify({"success": False, "message": "Single-frame liveness has been retired. Stream frames to a liveness session from /get-challenge-sequence."}), 410
     try:
         data = request.form
         if 'landmarks' not in data or 'challenge' not in data:
@@ -217,7 +434,172 @@ def verify_liveness():
         logging.error(f"Error during liveness verification: {e}")
         return jsonify({"success": False, "message": "An error occurred during liveness check."}), 500
 
+@app.route('/liveness/<session_id>', methods=['GET'])
+def liveness_status(session_id):
+    """Progress of a streamed liveness session."""
+    session = liveness_sessions.get(session_id)
+    if session is None:
+        return jsonify({"success": False, "message": "Unknown or expired liveness session."}), 404
+    return jsonify(session.status())
+
+@app.route('/liveness/<session_id>/frames', methods=['POST'])
+def liveness_frames(session_id):
+    """Feeds landmark frames to a session over HTTP.
+
+    The body is either JSON (one frame, a list of frames, or {"frames": [...]})
+    or application/octet-stream float32 frames. Binary bodies are read frame
+    by frame as they arrive, so a client can stream a chunked upload.
+    """
+    session = liveness_sessions.get(session_id)
+    if session is None:
+        return jsonify({"success": False, "message": "Unknown or expired liveness session."}), 404
+    try:
+        if request.mimetype == 'application/octet-stream':
+            status, pending = session.status(), b""
+            while not status["done"]:
+                chunk = request.stream.read(FRAME_BYTES * 8)
+                if not chunk: break
+                pending += chunk
+                usable = len(pending) - len(pending) % FRAME_BYTES
+                status = session.feed(decode_frames(pending[:usable]))
+                pending = pending[usable:]
+            if pending and not status["done"]:
+                raise ValueError(f"Binary frames must be a multiple of {FRAME_BYTES} bytes.")
+        else:
+            status = session.feed(decode_frames(request.get_data(as_text=True)))
+    except ValueError as e:
+        return jsonify({"success": False, "message": f"Invalid landmark frames: {e}"}), 400
+    return jsonify({"success": status["done"], **status})
+
+@app.route('/landmarks', methods=['POST'])
+@limited(success=False)
+def landmarks():
+    """Extracts FaceMesh landmarks server-side from compressed video frames.
+
+    Frames are uploaded as one or more 'frames' files (JPEG, PNG, WebP...).
+    With a 'session_id' field they are fed, in order, to that liveness
+    session, so the client never supplies landmarks itself. Frames sent
+    after the session is done are not judged, but a face found in them
+    still makes them usable as the /upload live face. Without a session,
+    each frame is read as a separate still image. Add ?include=landmarks
+    to get the (468, 3) points back.
+    """
+    if CONFIG["LANDMARK_WORKERS"] <= 0:
+        return jsonify({"success": False, "message": "Server-side landmark extraction is disabled."}), 404
+    frames = [f.read() for f in request.files.getlist('frames')]
+    if not frames:
+        return jsonify({"success": False, "message": "No frames uploaded."}), 400
+    session_id = request.form.get('session_id')
+    session = liveness_sessions.get(session_id) if session_id else None
+    if session_id and session is None:
+        return jsonify({"success": False, "message": "Unknown or expired liveness session."}), 404
+
+    start = time.perf_counter()
+    try:
+        results = get_landmark_pool().extract(frames, stream=session_id)
+    except ValueError as e:
+        return jsonify({"success": False, "message": f"Invalid frame: {e}"}), 400
+    except (TimeoutError, BrokenExecutor) as e:
+        logging.error(f"Landmark extraction unavailable: {e}")
+        response = jsonify({"success": False, "message": "Landmark extraction is unavailable. Please try again shortly."})
+        response.headers["Retry-After"] = str(max(1, round(CONFIG["LANDMARK_TIMEOUT"])))
+        return response, 503
+    except Exception as e:
+        logging.error(f"Landmark extraction failed: {e}")
+        return jsonify({"success": False, "message": "An error occurred during landmark extraction."}), 500
+    elapsed = time.perf_counter() - start
+    response = {
+        "success": True,
+        "frames": len(frames),
+        "faces_found": sum(r is not None for r in results),
+        "fps": round(len(frames) / elapsed, 1) if elapsed else None
+    }
+    if 'landmarks' in request.args.get('include', ''):
+        response["landmarks"] = [r.tolist() if r is not None else None for r in results]
+    if session:
+        response["session"] = feed_found_faces(session, results, frames)
+    return jsonify(response)
+
+@app.route('/landmarks/stats', methods=['GET'])
+def landmark_stats():
+    """Frames per second and per-frame cost of the FaceMesh pool, for capacity planning."""
+    if CONFIG["LANDMARK_WORKERS"] <= 0 or landmark_pool is None:
+        return jsonify({"workers": CONFIG["LANDMARK_WORKERS"], "frames": 0, "fps": 0.0})
+    return jsonify(landmark_pool.stats())
+
+if sock:
+    @sock.route('/liveness/<session_id>/video')
+    def liveness_video(ws, session_id):
+        """Feeds compressed video frames (one per binary message) to a session over a WebSocket.
+
+        Frames keep arriving while earlier ones are still being processed; the
+        session status is sent back as each frame's landmarks are judged.
+        """
+        session = liveness_sessions.get(session_id)
+        if session is None or CONFIG["LANDMARK_WORKERS"] <= 0:
+            ws.send(json.dumps({"success": False, "message": "Unknown or expired liveness session."}))
+            return
+        pool, pending, status = get_landmark_pool(), deque(), session.status()
+        while not status["done"] and not status["frame_limit_reached"]:
+            # While frames are in flight, poll briefly so results go out even if the client pauses.
+            message = ws.receive(timeout=0.02 if pending else CONFIG["LIVENESS_SESSION_TTL"])
+            if message is None and not pending: break
+            if isinstance(message, (bytes, bytearray)): # only binary image frames are expected
+                pending.append((message, pool.submit(message, stream=session_id)))
+            while pending and (pending[0][1].done() or message is None or len(pending) >= CONFIG["LANDMARK_MAX_PENDING"]):
+                frame, future = pending.popleft()
+                try:
+                    status = feed_found_faces(session, [future.result(CONFIG["LANDMARK_TIMEOUT"])], [frame])
+                except ValueError as e:
+                    ws.send(json.dumps({"success": False, "message": f"Invalid frame: {e}"}))
+                    continue
+                except Exception as e:
+                    logging.error(f"Landmark extraction failed for liveness session {session_id}: {e}")
+                    for _, future in pending:
+                        future.cancel()
+                    ws.send(json.dumps({"success": False, "message": "An error occurred during landmark extraction."}))
+                    return
+                ws.send(json.dumps({"success": status["done"], **status}))
+
+    @sock.route('/liveness/<session_id>/stream')
+    def liveness_stream(ws, session_id):
+        """Feeds landmark frames to a session over a WebSocket.
+
+        Each message holds one or more frames, as binary float32 or JSON; the
+        session status is sent back after every message.
+        """
+        session = liveness_sessions.get(session_id)
+        if session is None:
+            ws.send(json.dumps({"success": False, "message": "Unknown or expired liveness session."}))
+            return
+        status = session.status()
+        while not status["done"] and not status["frame_limit_reached"]:
+            message = ws.receive(timeout=CONFIG["LIVENESS_SESSION_TTL"])
+            if message is None: break
+            try:
+                status = session.feed(decode_frames(message))
+            except ValueError as e:
+                ws.send(json.dumps({"success": False, "message": f"Invalid landmark frames: {e}"}))
+                continue
+            ws.send(json.dumps({"success": status["done"], **status}))
+
+@app.route('/embedding-store/stats', methods=['GET'])
+def embedding_store_stats():
+    """Hit rate and size of the document embedding store."""
+    return jsonify(embedding_store.stats())
+
+@app.route('/embedding-worker/stats', methods=['GET'])
+def embedding_worker_stats():
+    """Batch sizes and forward-pass cost of the embedding worker."""
+    return jsonify({"enabled": use_batched_embeddings, **get_embedding_worker().stats()})
+
+@app.route('/admission/stats', methods=['GET'])
+def admission_stats():
+    """Requests running, queued and turned away (429) by this worker process."""
+    return jsonify({"pid": os.getpid(), **admission.stats()})
+
 @app.route('/upload', methods=['POST'])
+@limited(verification_status="Not Verified")
 def upload():
     """
     Final endpoint for OCR and Face Matching after liveness is confirmed.
@@ -228,25 +610,44 @@ def upload():
     doc_file = request.files['document']
     live_file = request.files['live_face']
 
-    # --- OCR Processing ---
+    # A completed, unexpired liveness session is required (unless legacy mode
+    # is on). It is used up here, and the live face must be one of the video
+    # frames it was completed with (see /landmarks).
+    live_face_bytes = live_file.read()
+    session_id = request.form.get('liveness_session')
+    if session_id or not CONFIG["LEGACY_SINGLE_FRAME_LIVENESS"]:
+        session = liveness_sessions.pop(session_id) if session_id else None
+        if session is None or not session.done:
+            return jsonify({"verification_status": "Not Verified", "message": "Liveness check has not been completed."}), 403
+        if not session.saw_image(live_face_bytes):
+            return jsonify({"verification_status": "Not Verified", "message": "The live face was not captured during the liveness check."}), 403
+
+    # Each image is decoded once. OCR and both face embeddings then run
+    # concurrently on the verification pool, so the request takes about as
+    # long as the slowest of them. Per-stage timings are returned in milliseconds.
+    timings = {}
+    request_start = time.perf_counter()
     doc_img_bytes = doc_file.read()
-    doc_img_for_ocr = preprocess_image_for_ocr(doc_img_bytes)
-    if doc_img_for_ocr is None: return jsonify({"message": "Cannot process document image for OCR."}), 400
-    
-    extracted_text = extract_text_with_ocr(doc_img_for_ocr)
-    ocr_data = parse_aadhar_data(extracted_text)
+    doc_img = timed(timings, "decode_document", decode_image, doc_img_bytes)
+    if doc_img is None: return jsonify({"message": "Cannot process document image for OCR."}), 400
+    doc_img = timed(timings, "downscale_document", working_image, doc_img)
+
+    ocr_future = verification_pool.submit(timed, timings, "ocr", read_document_fields, doc_img)
+    doc_embedding_future = verification_pool.submit(timed, timings, "document_embedding", cached_embedding, doc_img_bytes, doc_img)
+    live_face_img = timed(timings, "decode_live_face", decode_image, live_face_bytes)
+    live_face_img = timed(timings, "downscale_live_face", working_image, live_face_img)
+    live_embedding_future = verification_pool.submit(timed, timings, "live_embedding", face_embedding, live_face_img)
+
+    ocr_data = ocr_future.result()
+    doc_embedding = doc_embedding_future.result()
+    live_embedding = live_embedding_future.result()
+    timings["total"] = round((time.perf_counter() - request_start) * 1000, 1)
 
     # --- Face Matching ---
-    # Use the same image bytes to create an image for face detection
-    doc_img_for_face = cv2.imdecode(np.frombuffer(doc_img_bytes, np.uint8), cv2.IMREAD_COLOR)
-    doc_embedding = generate_embedding(doc_img_for_face)
     if doc_embedding is None:
-        return jsonify({"verification_status": "Not Verified", "message": "Could not find a face in the document."}), 400
-
-    live_face_img = cv2.imdecode(np.frombuffer(live_file.read(), np.uint8), cv2.IMREAD_COLOR)
-    live_embedding = generate_embedding(live_face_img)
+        return jsonify({"verification_status": "Not Verified", "message": "Could not find a face in the document.", "timings_ms": timings}), 400
     if live_embedding is None:
-        return jsonify({"verification_status": "Not Verified", "message": "Could not detect a face from the camera."}), 400
+        return jsonify({"verification_status": "Not Verified", "message": "Could not detect a face from the camera.", "timings_ms": timings}), 400
     
     # Calculate Cosine Similarity
     similarity = np.dot(live_embedding, doc_embedding) / (np.linalg.norm(live_embedding) * np.linalg.norm(doc_embedding))
@@ -255,15 +656,18 @@ def upload():
         return jsonify({
             "verification_status": "Verified",
             "message": f"Identity Verified! (Similarity: {similarity:.2f})",
-            "extracted_data": ocr_data
+            "extracted_data": ocr_data,
+            "timings_ms": timings
         })
     else:
         return jsonify({
             "verification_status": "Not Verified",
             "message": f"Face does not match document (Similarity: {similarity:.2f}).",
-            "extracted_data": ocr_data # Return OCR data even if face doesn't match
+            "extracted_data": ocr_data, # Return OCR data even if face doesn't match
+            "timings_ms": timings
         })
 
 # --- 5. MAIN FUNCTION ---
+# Development server only; use serve.py for production.
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Fast preprocessing for the verification service.
+
+Phone uploads are often 12MP. Facenet only ever sees a 160x160 face, and
+Tesseract reads an Aadhaar card fine at ~1600 pixels across, so the heavy
+stages work on smaller, tighter images instead of the original:
+
+  * downscale() bounds an image to a working resolution (never upscales).
+  * FaceLocator finds the face once with OpenCV's Haar cascade, on a small
+    grayscale copy, and crops it (plus a margin) from the working image, so
+    DeepFace's own detector only has to search a small crop.
+  * find_text_regions() groups the card's printed lines into boxes with a few
+    morphological operations, and text_image() keeps just those boxes,
+    binarized, for Tesseract. The photo, QR code and emblem are left out.
+"""
+
+import logging
+import os
+import threading
+
+import cv2
+import numpy as np
+
+
+def downscale(image, max_side):
+    """Returns (image, scale) with the longer side at most max_side pixels."""
+    height, width = image.shape[:2]
+    scale = max_side / max(height, width)
+    if scale >= 1:
+        return image, 1.0
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA), scale
+
+
+def to_gray(image):
+    return image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+class FaceLocator:
+    """Finds the largest face in an image with a Haar cascade.
+
+    Cascade classifiers are not safe to share between threads, so each thread
+    gets its own. If the cascade file cannot be loaded, locate() always returns
+    None and callers fall back to the full image.
+    """
+
+    def __init__(self, cascade_path=None, detect_max_side=480, min_face_fraction=0.08):
+        if cascade_path is None and hasattr(cv2, "data"):
+            cascade_path = os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+        self.cascade_path = cascade_path
+        self.detect_max_side = detect_max_side
+        self.min_face_fraction = min_face_fraction
+        self._local = threading.local()
+        self.available = bool(cascade_path) and not cv2.CascadeClassifier(cascade_path).empty()
+        if not self.available:
+            logging.warning(f"Face cascade {cascade_path!r} could not be loaded; face cropping is disabled.")
+
+    def _cascade(self):
+        cascade = getattr(self._local, "cascade", None)
+        if cascade is None:
+            cascade = self._local.cascade = cv2.CascadeClassifier(self.cascade_path)
+        return cascade
+
+    def locate(self, image):
+        """(x, y, w, h) of the largest face, in image coordinates, or None."""
+        if not self.available:
+            return None
+        small, scale = downscale(image, self.detect_max_side)
+        gray = cv2.equalizeHist(to_gray(small))
+        min_side = max(20, int(min(gray.shape[:2]) * self.min_face_fraction))
+        faces = self._cascade().detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_side, min_side))
+        if len(faces) == 0:
+            return None
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        return tuple(int(round(v / scale)) for v in (x, y, w, h))
+
+    def crop(self, image, margin=0.3):
+        """The largest face plus `margin` (a fraction of its size) on every side, or None.
+
+        The crop is a view into `image`, not a copy.
+        """
+        box = self.locate(image)
+        if box is None:
+            return None
+        x, y, w, h = box
+        dx, dy = int(w * margin), int(h * margin)
+        height, width = image.shape[:2]
+        return image[max(0, y - dy):min(height, y + h + dy), max(0, x - dx):min(width, x + w + dx)]
+
+
+def find_text_regions(image, min_height_fraction=0.012, max_height_fraction=0.12):
+    """Bounding boxes (x, y, w, h) of the printed text lines in a document image.
+
+    Dark strokes are picked out with a black-hat transform, then smeared
+    horizontally so that the words of a line merge into one blob. Blobs that
+    are too short, too tall or not wide enough to be a line are dropped.
+    """
+    gray = to_gray(image)
+    height, width = gray.shape[:2]
+    unit = max(1, round(max(height, width) / 400))  # kernel sizes scale with the image
+    blackhat = cv2.morphologyEx(gray, cv2.MORPH_BLACKHAT, cv2.getStructuringElement(cv2.MORPH_RECT, (9 * unit, 5 * unit)))
+    _, strokes = cv2.threshold(blackhat, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    lines = cv2.morphologyEx(strokes, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (7 * unit, 2 * unit)))
+    lines = cv2.dilate(lines, cv2.getStructuringElement(cv2.MORPH_RECT, (3 * unit, unit)))
+    contours, _ = cv2.findContours(lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    regions = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if not min_height_fraction * height <= h <= max_height_fraction * height:
+            continue
+        if w < 2 * h:  # lone marks, photo texture and QR-code modules
+            continue
+        regions.append((x, y, w, h))
+    return sorted(regions, key=lambda r: (r[1], r[0]))
+
+
+def text_image(image, regions, padding=4):
+    """A binarized copy of image, white outside `regions` and cropped to them.
+
+    Lines stay in their original positions, so Tesseract still reads them in
+    order. Returns None when there are no regions.
+    """
+    if not regions:
+        return None
+    gray = to_gray(image)
+    height, width = gray.shape[:2]
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    page = np.full_like(binary, 255)
+    for x, y, w, h in regions:
+        x0, y0 = max(0, x - padding), max(0, y - padding)
+        x1, y1 = min(width, x + w + padding), min(height, y + h + padding)
+        page[y0:y1, x0:x1] = binary[y0:y1, x0:x1]
+    x0 = max(0, min(r[0] for r in regions) - padding)
+    y0 = max(0, min(r[1] for r in regions) - padding)
+    x1 = min(width, max(r[0] + r[2] for r in regions) + padding)
+    y1 = min(height, max(r[1] + r[3] for r in regions) + padding)
+    return page[y0:y1, x0:x1]
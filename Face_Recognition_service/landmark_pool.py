@@ -0,0 +1,219 @@
+"""
+Server-side FaceMesh landmark extraction.
+
+A MediaPipe FaceMesh instance is not thread-safe, and in tracking mode it
+expects the frames of one video in order. FaceMeshPool therefore runs a
+fixed set of mesh workers, each a thread owning its own FaceMesh and
+working through its own queue in order. All frames of a stream (e.g. one
+liveness session) go to the same worker, so tracking carries over between
+frames. Several streams can share a worker; its tracker is reset whenever
+the stream it is following changes, so one client's face is never tracked
+into another's frames. Frames without a stream are unrelated stills: they
+go to whichever worker is least busy and are read by a second,
+static-image FaceMesh that detects the face afresh every time.
+
+Frames are pipelined through two stages:
+
+  decode + downscale (thread pool) -> landmarks (the stream's mesh worker)
+
+Decoding runs ahead in parallel. JPEG decoding and resizing release the
+GIL, so the next frames are ready while a worker is still on the current
+one. stats() reports throughput in frames per second.
+
+A worker that stops (say, FaceMesh fails to start) fails its queued frames
+with BrokenExecutor, and later frames go to the workers still running.
+With a `timeout`, extract() gives up on frames that are not done in time.
+"""
+
+import logging
+import queue
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import BrokenExecutor, Future, ThreadPoolExecutor, TimeoutError
+
+import cv2
+import numpy as np
+
+from image_preprocessing import downscale
+
+_STOP = object()  # tells a mesh worker to exit
+
+
+def decode_frame(image_bytes, max_side):
+    """A compressed frame (JPEG, PNG, WebP...) as an RGB array no larger than max_side."""
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Frame is not a decodable image.")
+    return cv2.cvtColor(downscale(image, max_side)[0], cv2.COLOR_BGR2RGB)
+
+
+class _MeshWorker(threading.Thread):
+    def __init__(self, index, pool):
+        super().__init__(name=f"facemesh-{index}", daemon=True)
+        self.pool = pool
+        self.queue = queue.Queue(maxsize=pool.queue_size)
+        self.failure = None  # set once the worker has stopped
+
+    def run(self):
+        try:
+            self._process_frames()
+            self.failure = BrokenExecutor(f"{self.name} has been closed.")
+        except BaseException as e:
+            self.failure = BrokenExecutor(f"{self.name} stopped: {e}")
+            logging.error(f"FaceMesh worker {self.name} stopped: {e}")
+        finally:
+            self.fail_pending()
+
+    def fail_pending(self):
+        """Fails the frames still queued; called once the worker has stopped."""
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is _STOP:
+                continue
+            decoded, result, _ = item
+            decoded.cancel()
+            if result.set_running_or_notify_cancel():
+                result.set_exception(self.failure)
+
+    def _process_frames(self):
+        import mediapipe as mp
+        tracker = mp.solutions.face_mesh.FaceMesh(**self.pool.mesh_options)
+        still = None  # static-image FaceMesh for frames without a stream, created on first use
+        following = None  # the stream whose frames the tracker last saw
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                tracker.close()
+                if still is not None:
+                    still.close()
+                return
+            decoded, result, stream = item
+            if not result.set_running_or_notify_cancel():  # the caller gave up on this frame
+                decoded.cancel()
+                continue
+            try:
+                rgb = decoded.result()
+                start = time.perf_counter()
+                if stream is None:
+                    if still is None:
+                        still = mp.solutions.face_mesh.FaceMesh(static_image_mode=True, **self.pool.mesh_options)
+                    mesh = still
+                else:
+                    if following is not None and stream != following:
+                        tracker.reset()
+                        self.pool._record_reset()
+                    following, mesh = stream, tracker
+                faces = mesh.process(rgb).multi_face_landmarks
+                landmarks = None
+                if faces:
+                    landmarks = np.array([(p.x, p.y, p.z) for p in faces[0].landmark], dtype=np.float32)
+                self.pool._record(time.perf_counter() - start)
+                result.set_result(landmarks)
+            except Exception as e:
+                result.set_exception(e)
+
+
+class FaceMeshPool:
+    """Extracts FaceMesh landmarks from compressed frames on `workers` FaceMesh instances."""
+
+    def __init__(self, workers=2, decode_workers=2, max_side=480, queue_size=64, timeout=None, **mesh_options):
+        self.max_side = max_side
+        self.queue_size = queue_size
+        self.timeout = timeout  # seconds extract() waits for its frames (None: no limit)
+        self.mesh_options = {"max_num_faces": 1, "min_detection_confidence": 0.6, "min_tracking_confidence": 0.6,
+                             **mesh_options}
+        self._decode_pool = ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix="facemesh-decode")
+        self._workers = [_MeshWorker(i, self) for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._frames = 0
+        self._mesh_seconds = 0.0
+        self._tracker_resets = 0
+        self._recent = deque(maxlen=512)  # completion times, for the current frame rate
+        logging.info(f"FaceMesh pool started with {workers} workers.")
+
+    def submit(self, image_bytes, stream=None):
+        """Queues one compressed frame; the Future resolves to a (468, 3) array, or None if no face is found.
+
+        Frames with the same `stream` key are processed in order by one
+        worker, in tracking mode. Without a key, the frame is treated as a
+        still image and goes to the least busy worker. Blocks while that
+        worker's queue is full, for up to `timeout` seconds.
+        """
+        result = Future()
+        running = [w for w in self._workers if w.failure is None]
+        if not running:
+            result.set_exception(BrokenExecutor("No FaceMesh worker is running."))
+            return result
+        if stream is None:
+            worker = min(running, key=lambda w: w.queue.qsize())
+        else:
+            worker = running[zlib.crc32(str(stream).encode()) % len(running)]
+        decoded = self._decode_pool.submit(decode_frame, image_bytes, self.max_side)
+        try:
+            worker.queue.put((decoded, result, stream), timeout=self.timeout)
+        except queue.Full:
+            decoded.cancel()
+            result.set_exception(TimeoutError(f"FaceMesh worker {worker.name} is not keeping up."))
+            return result
+        if worker.failure is not None:  # it stopped while the frame was being queued
+            worker.fail_pending()
+        return result
+
+    def extract(self, frames, stream=None):
+        """Landmarks for a list of compressed frames, in order (None where no face was found).
+
+        Raises TimeoutError if they are not all done within `timeout` seconds,
+        and BrokenExecutor if no worker can take them.
+        """
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        futures = [self.submit(frame, stream) for frame in frames]
+        try:
+            return [future.result(None if deadline is None else max(0.0, deadline - time.monotonic()))
+                    for future in futures]
+        except TimeoutError:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def _record(self, mesh_seconds):
+        with self._lock:
+            self._frames += 1
+            self._mesh_seconds += mesh_seconds
+            self._recent.append(time.perf_counter())
+
+    def _record_reset(self):
+        with self._lock:
+            self._tracker_resets += 1
+
+    def stats(self):
+        with self._lock:
+            now = time.perf_counter()
+            recent = [t for t in self._recent if now - t <= 10]
+            window = now - recent[0] if len(recent) > 1 else 0.0
+            return {
+                "workers": len(self._workers),
+                "workers_stopped": sum(w.failure is not None for w in self._workers),
+                "frames": self._frames,
+                "fps": (len(recent) - 1) / window if window else 0.0,  # over the last 10 s
+                "fps_since_start": self._frames / (now - self._started),
+                "mesh_ms_per_frame": self._mesh_seconds / self._frames * 1000 if self._frames else 0.0,
+                "max_fps_estimate": len(self._workers) * self._frames / self._mesh_seconds if self._mesh_seconds else 0.0,
+                "tracker_resets": self._tracker_resets,  # a worker switching between streams
+                "queued": sum(w.queue.qsize() for w in self._workers),
+                "max_side": self.max_side,
+            }
+
+    def close(self):
+        for worker in self._workers:
+            worker.queue.put(_STOP)
+        for worker in self._workers:
+            worker.join()
+        self._decode_pool.shutdown()
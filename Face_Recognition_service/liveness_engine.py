@@ -0,0 +1,113 @@
+"""
+Vectorized liveness checks on FaceMesh landmarks.
+
+Landmarks are converted once into a float32 array: (468, 3) for one frame,
+or (frames, 468, 3) for a batch. Every geometric feature the challenges use
+is then computed for all frames in a few NumPy operations, and every
+challenge is judged from those features at once.
+
+Features (MediaPipe FaceMesh indices):
+  * eye gaps: |159.y - 145.y| (left eye) and |386.y - 374.y| (right eye),
+    and the eye aspect ratios (gap / eye-corner distance: 33-133, 362-263);
+  * yaw ratio: |1.x - 127.x| / |356.x - 1.x|, nose to each cheek contour;
+  * pitch ratio: |152.y - 10.y| / |356.x - 127.x|, face height to width.
+
+The decisions reproduce the original single-frame checks exactly: a blink
+is the left-eye gap under a threshold, and a ratio whose denominator is
+zero never counts as a turn or nod.
+
+Like those checks, a blink needs 160 points (up to index 159, the highest
+it reads) and a turn or nod needs the full 468. Shorter frames are padded
+with NaN, and a frame padded short of its challenge's points never meets it.
+"""
+
+import numpy as np
+
+NUM_LANDMARKS = 468
+LEFT_EYE = (159, 145, 33, 133)  # top, bottom, outer and inner corner
+RIGHT_EYE = (386, 374, 362, 263)
+NOSE_TIP, LEFT_CONTOUR, RIGHT_CONTOUR, FOREHEAD, CHIN = 1, 127, 356, 10, 152
+
+CHALLENGES = ("blink", "turn_left", "turn_right", "nod_up", "nod_down")
+# Points a frame must hold for each challenge, as the original checks required:
+# a blink up to the highest index it reads, a turn or nod the full mesh.
+REQUIRED_POINTS = {
+    "blink": max(LEFT_EYE[:2]) + 1,
+    "turn_left": NUM_LANDMARKS,
+    "turn_right": NUM_LANDMARKS,
+    "nod_up": NUM_LANDMARKS,
+    "nod_down": NUM_LANDMARKS,
+}
+MIN_POINTS = min(REQUIRED_POINTS.values())
+DEFAULT_THRESHOLDS = {
+    "BLINK_EYE_GAP": 0.025,
+    "TURN_LEFT_RATIO": 0.5,
+    "TURN_RIGHT_RATIO": 1.8,
+    "NOD_UP_RATIO": 1.42,
+    "NOD_DOWN_RATIO": 1.60,
+}
+
+
+def to_frames(landmarks, challenge=None):
+    """Landmarks (one frame or a batch, lists or arrays) as a (frames, 468, >=2) float32 array.
+
+    Frames must hold the points `challenge` reads (with no challenge, those
+    of a blink, the fewest); missing points after that are NaN.
+    """
+    frames = np.asarray(landmarks, dtype=np.float32)
+    if frames.ndim == 2:
+        frames = frames[np.newaxis]
+    required = REQUIRED_POINTS.get(challenge, MIN_POINTS)
+    if frames.ndim != 3 or frames.shape[1] < required or frames.shape[2] < 2:
+        raise ValueError(f"Expected frames of at least {required} [x, y(, z)] points "
+                         f"(FaceMesh indices 0-{required - 1}), got shape {frames.shape}.")
+    if frames.shape[1] < NUM_LANDMARKS:
+        missing = np.full((len(frames), NUM_LANDMARKS - frames.shape[1], frames.shape[2]), np.nan, np.float32)
+        frames = np.concatenate([frames, missing], axis=1)
+    return frames[:, :NUM_LANDMARKS]
+
+
+def _ratio(numerator, denominator):
+    """numerator / denominator, NaN where the denominator is zero (NaN fails every comparison)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator != 0, numerator / denominator, np.nan)
+
+
+def features(frames):
+    """All geometric features of a (frames, 468, >=2) array, one value per frame each."""
+    x, y = frames[:, :, 0], frames[:, :, 1]
+    left_gap = np.abs(y[:, LEFT_EYE[0]] - y[:, LEFT_EYE[1]])
+    right_gap = np.abs(y[:, RIGHT_EYE[0]] - y[:, RIGHT_EYE[1]])
+    nose_to_left = np.abs(x[:, NOSE_TIP] - x[:, LEFT_CONTOUR])
+    nose_to_right = np.abs(x[:, RIGHT_CONTOUR] - x[:, NOSE_TIP])
+    face_width = np.abs(x[:, RIGHT_CONTOUR] - x[:, LEFT_CONTOUR])
+    return {
+        "left_eye_gap": left_gap,
+        "right_eye_gap": right_gap,
+        "left_eye_ratio": _ratio(left_gap, np.abs(x[:, LEFT_EYE[2]] - x[:, LEFT_EYE[3]])),
+        "right_eye_ratio": _ratio(right_gap, np.abs(x[:, RIGHT_EYE[2]] - x[:, RIGHT_EYE[3]])),
+        "yaw_ratio": _ratio(nose_to_left, nose_to_right),
+        "pitch_ratio": _ratio(np.abs(y[:, CHIN] - y[:, FOREHEAD]), face_width),
+    }
+
+
+def evaluate(frames, thresholds=DEFAULT_THRESHOLDS):
+    """Every challenge for every frame: {challenge: bool array of length frames}."""
+    f = features(frames)
+    with np.errstate(invalid="ignore"):
+        met = {
+            "blink": f["left_eye_gap"] < thresholds["BLINK_EYE_GAP"],
+            "turn_left": f["yaw_ratio"] < thresholds["TURN_LEFT_RATIO"],
+            "turn_right": f["yaw_ratio"] > thresholds["TURN_RIGHT_RATIO"],
+            "nod_up": f["pitch_ratio"] < thresholds["NOD_UP_RATIO"],
+            "nod_down": (f["pitch_ratio"] > thresholds["NOD_UP_RATIO"]) & (f["pitch_ratio"] < thresholds["NOD_DOWN_RATIO"]),
+        }
+    # Padding is NaN, so a frame held a challenge's points if its last one is a number.
+    return {challenge: met[challenge] & ~np.isnan(frames[:, REQUIRED_POINTS[challenge] - 1, 0]) for challenge in met}
+
+
+def check(frames, challenge, thresholds=DEFAULT_THRESHOLDS):
+    """One challenge for every frame; an unknown challenge is never met."""
+    if challenge not in CHALLENGES:
+        return np.zeros(len(frames), dtype=bool)
+    return evaluate(frames, thresholds)[challenge]
@@ -0,0 +1,173 @@
+"""
+Streaming liveness sessions.
+
+/get-challenge-sequence opens a session on the server holding the challenge
+sequence it handed out. The client then streams FaceMesh landmark frames for
+that session, over a WebSocket or in batches over HTTP, instead of posting
+one JSON frame per request. Frames arrive either as raw float32 (468 x 3
+per frame, little-endian) or as JSON. JSON frames may hold fewer points;
+one short of what its challenge needs (liveness_engine.REQUIRED_POINTS)
+never meets it.
+
+A challenge is judged over a sliding window of recent frames, not a single
+one: it passes when at least `neutral_frames` frames without the action are
+followed by `hold_frames` frames with it. Momentary actions (a blink) need
+only one frame, but must also end inside the window. A still photo or one doctored frame cannot do
+that, and neither can a pose left over from the previous challenge.
+
+When the server extracts the landmarks from compressed video frames itself,
+the session also remembers which frames showed a face, so that /upload can
+insist its live face is one of them. A session is used up by /upload.
+"""
+
+import hashlib
+import itertools
+import json
+import threading
+import time
+import uuid
+from collections import deque
+
+import numpy as np
+
+from liveness_engine import NUM_LANDMARKS, to_frames
+
+FRAME_BYTES = NUM_LANDMARKS * 3 * 4  # one float32 frame
+MOMENTARY_CHALLENGES = ("blink",)
+
+
+def decode_frames(payload):
+    """Landmark frames from a binary or JSON payload, as a (frames, 468, 3) float32 array.
+
+    Binary payloads are concatenated float32 frames. JSON is one frame (a
+    list of [x, y, z] points), a list of frames, or {"frames": [...]}.
+    """
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        if len(payload) % FRAME_BYTES:
+            raise ValueError(f"Binary frames must be a multiple of {FRAME_BYTES} bytes.")
+        return np.frombuffer(payload, dtype="<f4").reshape(-1, NUM_LANDMARKS, 3)
+    data = json.loads(payload) if isinstance(payload, str) else payload
+    if isinstance(data, dict):
+        data = data.get("frames", [])
+    frames = to_frames(data)[:, :, :3]
+    if frames.shape[2] == 2:  # x, y only
+        frames = np.concatenate([frames, np.zeros(frames.shape[:2] + (1,), np.float32)], axis=2)
+    return frames
+
+
+class LivenessSession:
+    """Server-side state of one liveness run, bound to its challenge sequence."""
+
+    def __init__(self, sequence, check, window_frames=15, hold_frames=3, neutral_frames=2, max_frames=1800):
+        self.id = uuid.uuid4().hex
+        self.sequence = list(sequence)
+        self.check = check  # check(frames, challenge) -> one bool per frame
+        self.hold_frames = hold_frames
+        self.neutral_frames = neutral_frames
+        self.max_frames = max_frames
+        self.created = time.monotonic()
+        self.frames = 0
+        self.completed = []
+        self._images = set()  # digests of the video frames a face was found in
+        self._window = deque(maxlen=window_frames)
+        self._lock = threading.Lock()
+
+    @property
+    def challenge(self):
+        return self.sequence[len(self.completed)] if not self.done else None
+
+    @property
+    def done(self):
+        return len(self.completed) == len(self.sequence)
+
+    def _challenge_passed(self, momentary):
+        runs = [(detected, len(list(group))) for detected, group in itertools.groupby(self._window)]
+        hold_frames = 1 if momentary else self.hold_frames
+        for i, (detected, length) in enumerate(runs):
+            if not detected or i == 0 or length < hold_frames:
+                continue
+            if runs[i - 1][1] < self.neutral_frames:  # runs alternate, so runs[i - 1] is "not detected"
+                continue
+            if momentary and i == len(runs) - 1:  # e.g. the eyes have not opened again yet
+                continue
+            return True
+        return False
+
+    def feed(self, frames):
+        """Evaluates new frames against the current challenge; returns the session status."""
+        with self._lock:
+            pending = frames[:max(0, self.max_frames - self.frames)]
+            while len(pending) and not self.done:
+                challenge = self.challenge
+                detections = self.check(pending, challenge)
+                for i, detected in enumerate(detections):
+                    self.frames += 1
+                    self._window.append(bool(detected))
+                    if self._challenge_passed(challenge in MOMENTARY_CHALLENGES):
+                        self.completed.append(challenge)
+                        self._window.clear()  # the next challenge starts from scratch
+                        pending = pending[i + 1:]
+                        break
+                else:
+                    pending = pending[:0]
+            return self.status()
+
+    def remember_images(self, images):
+        """Records compressed video frames (bytes) in which a face was found."""
+        with self._lock:
+            for image in images:
+                if len(self._images) >= self.max_frames:
+                    break
+                self._images.add(hashlib.sha256(image).digest())
+
+    def saw_image(self, image):
+        """Whether `image` (bytes) is one of the video frames passed to remember_images."""
+        with self._lock:
+            return hashlib.sha256(image).digest() in self._images
+
+    def status(self):
+        return {
+            "session_id": self.id,
+            "challenge": self.challenge,
+            "completed": list(self.completed),
+            "done": self.done,
+            "frames": self.frames,
+            "frame_limit_reached": self.frames >= self.max_frames and not self.done,
+        }
+
+
+class SessionStore:
+    """Open liveness sessions, dropped `ttl` seconds after they were created."""
+
+    def __init__(self, check, ttl=120, **session_options):
+        self.check = check
+        self.ttl = ttl
+        self.session_options = session_options
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, sequence):
+        session = LivenessSession(sequence, self.check, **self.session_options)
+        with self._lock:
+            self._purge()
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id):
+        with self._lock:
+            self._purge()
+            return self._sessions.get(session_id)
+
+    def pop(self, session_id):
+        """Removes and returns a session, so that it can only be used once."""
+        with self._lock:
+            self._purge()
+            return self._sessions.pop(session_id, None)
+
+    def _purge(self):
+        now = time.monotonic()
+        for session_id in [s.id for s in self._sessions.values() if now - s.created > self.ttl]:
+            del self._sessions[session_id]
+
+    def __len__(self):
+        return len(self._sessions)
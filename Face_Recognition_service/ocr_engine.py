@@ -0,0 +1,204 @@
+"""
+Region-of-interest OCR for Aadhaar cards.
+
+Running Tesseract once over the whole card means one subprocess reading
+every pixel with generic settings, with its input and output written to
+temporary files by pytesseract. OcrEngine works on the card's text lines
+instead (see image_preprocessing.find_text_regions) and passes each crop
+to Tesseract through stdin, reading the result from stdout:
+
+  1. Every line is read in parallel as a single text line (--psm 7). If
+     parse_aadhar_data finds all fields in those lines, it stops there.
+  2. Otherwise the lines holding the missing fields are located from the
+     first pass (the DOB line, the line above it, the "Address:" block up
+     to the PIN code) and read again with field-specific settings: the DOB
+     alone with a digits-only whitelist, the name with letters only, and
+     the address as a block (--psm 6). If the DOB line was not recognized
+     at all, the end of every line is tried for a date, stopping at the
+     first one that parses.
+"""
+
+import os
+import re
+import string
+import subprocess
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import cv2
+import numpy as np
+import pytesseract
+
+from image_preprocessing import find_text_regions, to_gray
+
+FIELDS = ("name", "dob", "address")
+NOT_FOUND = "Not Found"
+
+# Tesseract settings per kind of region.
+PASSES = {
+    "page": {"psm": 3, "whitelist": None},
+    "line": {"psm": 7, "whitelist": None},
+    "name": {"psm": 7, "whitelist": string.ascii_letters + " .'"},
+    "dob": {"psm": 7, "whitelist": string.digits + "/-"},
+    "address": {"psm": 6, "whitelist": string.ascii_letters + string.digits + " ,.-/:#()'"},
+}
+
+DATE_RE = re.compile(r'(\d{4}-\d{2}-\d{2})|(\d{2}/\d{2}/\d{4})')
+DOB_LABEL_RE = re.compile(r'\b(DOB|D0B|Birth)\b|\d{2}/\d{2}/\d{4}', re.IGNORECASE)
+ADDRESS_LABEL_RE = re.compile(r'\bAddress\b', re.IGNORECASE)
+PIN_RE = re.compile(r'\d{6}')
+
+
+def tesseract(image, psm=7, whitelist=None, lang="eng", timeout=10):
+    """Runs Tesseract on an in-memory image (stdin to stdout, no temporary files)."""
+    ok, encoded = cv2.imencode(".png", image)
+    if not ok:
+        raise ValueError("Could not encode the image for Tesseract.")
+    args = [pytesseract.pytesseract.tesseract_cmd, "stdin", "stdout", "-l", lang, "--psm", str(psm)]
+    if whitelist:
+        args += ["-c", f"tessedit_char_whitelist={whitelist}"]
+    # One thread per Tesseract process: the parallelism comes from running several of them.
+    env = {**os.environ, "OMP_THREAD_LIMIT": "1"}
+    try:
+        result = subprocess.run(args, input=encoded.tobytes(), capture_output=True, timeout=timeout, env=env)
+    except FileNotFoundError:
+        raise pytesseract.TesseractNotFoundError()
+    if result.returncode:
+        raise pytesseract.TesseractError(result.returncode, result.stderr.decode(errors="replace"))
+    return result.stdout.decode("utf-8", errors="replace").strip()
+
+
+def binarize(image):
+    """Dark text on white, the way Tesseract reads best."""
+    _, binary = cv2.threshold(to_gray(image), 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def crop(binary, box, padding=4):
+    x, y, w, h = box
+    height, width = binary.shape[:2]
+    return binary[max(0, y - padding):min(height, y + h + padding), max(0, x - padding):min(width, x + w + padding)]
+
+
+def union(boxes):
+    x0, y0 = min(b[0] for b in boxes), min(b[1] for b in boxes)
+    x1, y1 = max(b[0] + b[2] for b in boxes), max(b[1] + b[3] for b in boxes)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def last_word(line_image):
+    """The last word of a binarized line crop (where a date sits on a 'DOB: ...' line)."""
+    ink = (line_image < 128).any(axis=0)
+    columns = np.flatnonzero(ink)
+    if columns.size == 0:
+        return line_image
+    min_gap = max(3, int(line_image.shape[0] * 0.5))
+    gaps = np.flatnonzero(np.diff(columns) > min_gap)
+    start = columns[gaps[-1] + 1] if gaps.size else columns[0]
+    return line_image[:, max(0, start - 4):]
+
+
+def normalize_date(text):
+    match = DATE_RE.search(text)
+    if not match:
+        return None
+    date = match.group(0)
+    if '-' in date:
+        year, month, day = date.split('-')
+        return f"{day}/{month}/{year}"
+    return date
+
+
+class OcrEngine:
+    """Parallel, field-aware OCR of a card image. Thread-safe."""
+
+    def __init__(self, parse, workers=4, timeout=10, lang="eng"):
+        self.parse = parse  # parse(text) -> {"name", "dob", "address"}, as document_ocr.parse_aadhar_data
+        self.timeout = timeout
+        self.lang = lang
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr")
+
+    def _ocr(self, image, kind):
+        return tesseract(image, PASSES[kind]["psm"], PASSES[kind]["whitelist"], self.lang, self.timeout)
+
+    def _ocr_all(self, images, kind):
+        return list(self._pool.map(lambda image: self._ocr(image, kind), images))
+
+    def _find_date(self, line_images):
+        """(index, date, Tesseract calls made) for the first line whose last word reads as a date."""
+        futures = {self._pool.submit(self._ocr, last_word(image), "dob"): i for i, image in enumerate(line_images)}
+        pending, found = set(futures), {}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                date = normalize_date(future.result()) if not future.exception() else None
+                if date:
+                    found[futures[future]] = date
+            # Stop as soon as the topmost candidate still running can no longer win.
+            if found and all(futures[f] > min(found) for f in pending):
+                cancelled = sum(future.cancel() for future in pending)
+                break
+        else:
+            cancelled = 0
+        calls = len(futures) - cancelled
+        if not found:
+            return None, None, calls
+        index = min(found)
+        return index, found[index], calls
+
+    def read_fields(self, image):
+        """Returns (fields, report): the parsed fields and what it took to get them."""
+        binary = binarize(image)
+        boxes = find_text_regions(image)
+        report = {"lines": len(boxes), "passes": 0, "tesseract_calls": 0, "early_stop": False}
+        if not boxes:
+            report["passes"], report["tesseract_calls"] = 1, 1
+            return self.parse(self._ocr(binary, "page")), report
+
+        # Pass 1: every line, in parallel.
+        line_images = [crop(binary, box) for box in boxes]
+        lines = self._ocr_all(line_images, "line")
+        report["passes"], report["tesseract_calls"] = 1, len(lines)
+        fields = self.parse("\n".join(lines))
+        missing = [field for field in FIELDS if fields[field] == NOT_FOUND]
+        if not missing:
+            report["early_stop"] = True
+            return fields, report
+
+        # Pass 2: re-read only the regions of the missing fields, with field-specific settings.
+        report["passes"] = 2
+        dob_index = next((i for i, text in enumerate(lines) if DOB_LABEL_RE.search(text)), None)
+        jobs = {}
+        if "dob" in missing and dob_index is not None:
+            jobs["dob"] = self._pool.submit(self._ocr, last_word(line_images[dob_index]), "dob")
+        if "name" in missing and dob_index:
+            jobs["name"] = self._pool.submit(self._ocr, line_images[dob_index - 1], "name")
+        address_start = next((i for i, text in enumerate(lines) if ADDRESS_LABEL_RE.search(text)), None)
+        if "address" in missing and address_start is not None:
+            address_end = next((i for i in range(address_start, len(lines)) if PIN_RE.search(lines[i])), len(lines) - 1)
+            block = crop(binary, union(boxes[address_start:address_end + 1]))
+            jobs["address"] = self._pool.submit(self._ocr, block, "address")
+        report["tesseract_calls"] += len(jobs)
+
+        results = {field: future.result() for field, future in jobs.items()}
+        if "dob" in results:
+            fields["dob"] = normalize_date(results["dob"]) or fields["dob"]
+        elif "dob" in missing:
+            dob_index, date, calls = self._find_date(line_images)
+            report["tesseract_calls"] += calls
+            if date:
+                fields["dob"] = date
+                if "name" in missing and dob_index:
+                    results["name"] = lines[dob_index - 1]
+        if results.get("name"):
+            name = " ".join(results["name"].split())
+            if len(name) > 2 and not any(char.isdigit() for char in name):
+                fields["name"] = name
+        if "address" in results:
+            address = self.parse(results["address"])["address"]
+            if address == NOT_FOUND:  # the label may have been misread; the PIN is enough
+                pin = PIN_RE.search(results["address"])
+                if pin:
+                    body = ADDRESS_LABEL_RE.split(results["address"][:pin.start()])[-1].lstrip(" :")
+                    address = " ".join(f"{body}, {pin.group(0)}".split())
+            fields["address"] = address
+        return fields, report
@@ -0,0 +1,119 @@
+"""
+Production entry point for the face verification service.
+
+    python serve.py --max-concurrent 4 --max-queued 16 --bind 0.0.0.0:5000
+
+Runs face_reco.app under gunicorn with pre-forked worker processes:
+
+  * The app is imported once in the master process (preload) before the
+    workers fork, so the Python code, OpenCV, NumPy and the rest are shared
+    copy-on-write. The Facenet weights are not: TensorFlow's runtime does
+    not survive a fork, so each worker loads and warms Facenet itself right
+    after forking and before it serves (face_reco.warm_up).
+  * The heavy endpoints go through face_reco's admission limiter
+    (MAX_CONCURRENT_VERIFICATIONS, MAX_QUEUED_VERIFICATIONS, QUEUE_TIMEOUT),
+    which answers 429 with Retry-After when a worker is saturated. It can
+    only do that for requests that reach Flask. Each worker therefore runs
+    max_concurrent + max_queued + --spare-threads request threads (gthread
+    workers), so a request beyond the queue is turned away rather than left
+    waiting, unbounded, among gunicorn's accepted connections. The spare
+    threads keep the light endpoints (stats, challenges, liveness) responsive
+    while the heavy ones are saturated.
+  * --cpu-processes gives every worker a small process pool for OCR.
+  * --backlog bounds the connections the kernel queues before gunicorn
+    accepts them.
+
+Liveness sessions live in the memory of the worker that created them, and
+sign-up needs every request of a session (/get-challenge-sequence, /landmarks,
+/upload) to reach that worker. serve.py therefore runs one worker by default;
+it scales through the request threads above. Only run more workers (--workers
+or WEB_CONCURRENCY) behind a load balancer that keeps each client on one
+worker (sticky sessions), or run one single-worker instance per port.
+
+gunicorn is not available on Windows; use `python face_reco.py` there.
+"""
+
+import argparse
+import logging
+import os
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve the face verification service with gunicorn.")
+    parser.add_argument("--bind", default=os.environ.get("BIND", "0.0.0.0:5000"))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", 1)),
+                        help="Worker processes (each loads its own Facenet, ~100 MB). "
+                             "More than one needs sticky sessions: liveness sessions are per worker.")
+    parser.add_argument("--threads", type=int,
+                        help="Request threads per worker (default: max concurrent + max queued + spare threads).")
+    parser.add_argument("--spare-threads", type=int, default=4,
+                        help="Threads per worker beyond those the admission limiter can hold, for light requests.")
+    parser.add_argument("--max-concurrent", type=int, help="Heavy requests running at once, per worker.")
+    parser.add_argument("--max-queued", type=int, help="Heavy requests allowed to wait, per worker; more get a 429.")
+    parser.add_argument("--queue-timeout", type=float, help="Seconds a queued request waits before a 429.")
+    parser.add_argument("--cpu-processes", type=int, help="OCR processes per worker (0 keeps OCR on threads).")
+    parser.add_argument("--backlog", type=int, default=256, help="Pending connections the socket holds.")
+    parser.add_argument("--timeout", type=int, default=120, help="Seconds before a stuck worker is restarted.")
+    return parser.parse_args()
+
+
+def gunicorn_options(args, max_concurrent, max_queued):
+    """gunicorn settings for the given admission limits (per worker)."""
+    admitted = max_concurrent + max_queued
+    threads = args.threads or admitted + args.spare_threads
+    if args.workers > 1:
+        logging.warning(f"{args.workers} workers: liveness sessions are kept per worker, so sign-up fails unless "
+                        f"the load balancer sends each client to the same worker (sticky sessions).")
+    if threads <= admitted:
+        logging.warning(f"{threads} threads per worker cannot fill the admission limiter ({max_concurrent} running + "
+                        f"{max_queued} queued): excess requests will wait in gunicorn instead of getting a 429.")
+    return {
+        "bind": args.bind,
+        "workers": args.workers,
+        "worker_class": "gthread",
+        "threads": threads,
+        "preload_app": True,
+        "backlog": args.backlog,
+        "timeout": args.timeout,
+    }
+
+
+def run(app_loader, options):
+    """Runs gunicorn with `options`, serving the WSGI app `app_loader()` returns."""
+    from gunicorn.app.base import BaseApplication
+
+    class VerificationService(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app_loader()
+
+    VerificationService().run()
+
+
+def main():
+    args = parse_args()
+    # face_reco reads these when the master imports it, so set them first.
+    os.environ["DEFER_MODEL_LOADING"] = "1"
+    for name, value in (("MAX_CONCURRENT_VERIFICATIONS", args.max_concurrent),
+                        ("MAX_QUEUED_VERIFICATIONS", args.max_queued),
+                        ("QUEUE_TIMEOUT", args.queue_timeout),
+                        ("CPU_PROCESSES", args.cpu_processes)):
+        if value is not None:
+            os.environ[name] = str(value)
+
+    import face_reco  # imported once here, before the workers fork (preload)
+
+    def post_worker_init(worker):
+        face_reco.warm_up()
+        logging.info(f"Worker {worker.pid} is warm.")
+
+    options = gunicorn_options(args, face_reco.admission.max_concurrent, face_reco.admission.max_queue)
+    options["post_worker_init"] = post_worker_init
+    run(lambda: face_reco.app, options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""The batched Facenet path (extract_faces + EmbeddingBatcher) must give the
+embeddings DeepFace.represent gives, on real face photos.
+
+Point EMBEDDING_CHECK_IMAGES at a folder of face photos to run it; the
+service runs the same check at start-up before it uses the batched path."""
+
+import os
+
+import pytest
+
+pytest.importorskip("deepface")
+
+IMAGES = os.environ.get("EMBEDDING_CHECK_IMAGES")
+pytestmark = pytest.mark.skipif(not IMAGES, reason="EMBEDDING_CHECK_IMAGES is not set")
+
+os.environ["DEFER_MODEL_LOADING"] = "1"
+import face_reco
+
+
+def test_batched_embeddings_match_represent():
+    similarities = face_reco.embedding_path_agreement(face_reco.load_check_images(IMAGES))
+    assert similarities, f"no faces found in {IMAGES}"
+    assert min(similarities) >= face_reco.CONFIG["EMBEDDING_CHECK_MIN_COSINE"]
@@ -0,0 +1,54 @@
+"""A FaceMesh worker that dies or hangs must not leave /landmarks waiting
+forever: its frames fail, or extract() gives up after the pool's timeout."""
+
+import threading
+import time
+from concurrent.futures import BrokenExecutor, TimeoutError
+
+import cv2
+import numpy as np
+import pytest
+
+import landmark_pool
+from landmark_pool import FaceMeshPool
+
+FRAME = cv2.imencode(".jpg", np.full((48, 64, 3), 128, np.uint8))[1].tobytes()
+
+
+def make_pool(monkeypatch, process_frames, **options):
+    monkeypatch.setattr(landmark_pool._MeshWorker, "_process_frames", process_frames)
+    return FaceMeshPool(**options)
+
+
+def test_frames_fail_when_every_worker_has_stopped(monkeypatch):
+    def crash(worker):
+        raise RuntimeError("FaceMesh could not start")
+    pool = make_pool(monkeypatch, crash, workers=2)
+    for worker in pool._workers:
+        worker.join(1)
+    with pytest.raises(BrokenExecutor):
+        pool.extract([FRAME, FRAME], stream="session")
+    assert pool.stats()["workers_stopped"] == 2
+
+
+def test_queued_frames_fail_when_their_worker_stops(monkeypatch):
+    release = threading.Event()
+    def crash_later(worker):
+        release.wait(5)
+        raise RuntimeError("FaceMesh graph died")
+    pool = make_pool(monkeypatch, crash_later, workers=1)
+    futures = [pool.submit(FRAME, stream="session") for _ in range(3)]
+    release.set()
+    for future in futures:
+        with pytest.raises(BrokenExecutor):
+            future.result(timeout=5)
+
+
+def test_extract_gives_up_on_a_hung_worker(monkeypatch):
+    hang = threading.Event()
+    pool = make_pool(monkeypatch, lambda worker: hang.wait(10), workers=1, timeout=0.2)
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        pool.extract([FRAME], stream="session")
+    assert time.monotonic() - start < 2
+    hang.set()
@@ -0,0 +1,37 @@
+"""Frames need as many FaceMesh points as the original single-frame checks
+required: 160 for a blink, all 468 for a turn or nod."""
+
+import numpy as np
+import pytest
+
+import liveness_engine
+from liveness_engine import NUM_LANDMARKS
+from liveness_sessions import decode_frames
+
+# Points 0-159 alone are a closed left eye; with the rest, a face turned left and nodding up.
+FRAME = np.full((NUM_LANDMARKS, 3), 0.5, np.float32)
+FRAME[liveness_engine.LEFT_CONTOUR, 0] = 0.45
+FRAME[liveness_engine.RIGHT_CONTOUR, 0] = 0.9
+FRAME[liveness_engine.FOREHEAD, 1], FRAME[liveness_engine.CHIN, 1] = 0.2, 0.7
+BOUNDARY = {"blink": 160, "turn_left": 468, "nod_up": 468}
+
+
+@pytest.mark.parametrize("challenge, points", BOUNDARY.items())
+def test_single_frame_needs_the_original_number_of_points(challenge, points):
+    frames = liveness_engine.to_frames(FRAME[:points].tolist(), challenge)
+    assert liveness_engine.check(frames, challenge)[0]
+    with pytest.raises(ValueError):
+        liveness_engine.to_frames(FRAME[:points - 1].tolist(), challenge)
+
+
+@pytest.mark.parametrize("challenge", ["turn_left", "nod_up"])
+def test_streamed_frame_short_of_the_points_never_meets_the_challenge(challenge):
+    # Streamed frames are decoded before the challenge is known, so they are padded, not rejected.
+    assert liveness_engine.check(decode_frames([FRAME.tolist()]), challenge)[0]
+    assert not liveness_engine.check(decode_frames([FRAME[:NUM_LANDMARKS - 1].tolist()]), challenge)[0]
+
+
+def test_streamed_frame_without_a_blinks_points_is_rejected():
+    assert liveness_engine.check(decode_frames([FRAME[:160].tolist()]), "blink")[0]
+    with pytest.raises(ValueError):
+        decode_frames([FRAME[:159].tolist()])
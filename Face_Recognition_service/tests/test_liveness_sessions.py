@@ -0,0 +1,30 @@
+"""A liveness session is used up by /upload and only vouches for the video
+frames it was completed with."""
+
+from liveness_sessions import SessionStore
+
+
+def make_store():
+    return SessionStore(lambda frames, challenge: [True] * len(frames))
+
+
+def test_pop_uses_a_session_up():
+    store = make_store()
+    session = store.create(["blink"])
+    assert store.pop(session.id) is session
+    assert store.pop(session.id) is None
+    assert store.get(session.id) is None
+
+
+def test_session_only_vouches_for_remembered_frames():
+    session = make_store().create(["blink"])
+    session.remember_images([b"frame-1", b"frame-2"])
+    assert session.saw_image(b"frame-2")
+    assert not session.saw_image(b"frame-3")
+
+
+def test_remembered_frames_are_bounded():
+    session = SessionStore(lambda frames, challenge: [], max_frames=2).create(["blink"])
+    session.remember_images([b"a", b"b", b"c"])
+    assert session.saw_image(b"b")
+    assert not session.saw_image(b"c")
@@ -0,0 +1,93 @@
+"""serve.py sizes gunicorn so that requests beyond the admission limiter's
+queue reach it and get a 429, rather than waiting inside gunicorn."""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+pytest.importorskip("gunicorn")
+
+import serve
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# More than fit in gunicorn's old fixed 8 threads, as with the default limits (4 + 16).
+MAX_CONCURRENT, MAX_QUEUED = 2, 8
+
+# A stand-in for face_reco: one slow endpoint behind an AdmissionLimiter, served by serve.run.
+APP = textwrap.dedent(f"""
+    import sys, time
+    sys.path.insert(0, {SERVICE_DIR!r})
+    from flask import Flask, jsonify
+    import serve
+    from admission import AdmissionLimiter
+
+    limiter = AdmissionLimiter({MAX_CONCURRENT}, {MAX_QUEUED}, queue_timeout=30)
+    app = Flask(__name__)
+
+    @app.route("/ping")
+    def ping():
+        return "ok"
+
+    @app.route("/slow")
+    def slow():
+        if not limiter.acquire():
+            return jsonify({{"success": False, "message": "busy"}}), 429
+        try:
+            time.sleep(1)
+            return "ok"
+        finally:
+            limiter.release()
+
+    args = serve.parse_args()
+    serve.run(lambda: app, serve.gunicorn_options(args, {MAX_CONCURRENT}, {MAX_QUEUED}))
+""")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def server(tmp_path):
+    script = tmp_path / "app.py"
+    script.write_text(APP)
+    port = free_port()
+    process = subprocess.Popen([sys.executable, str(script), "--bind", f"127.0.0.1:{port}", "--workers", "1"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                requests.get(f"{url}/ping", timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        else:
+            pytest.fail("gunicorn did not start")
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def test_threads_leave_room_beyond_the_admission_queue():
+    args = argparse.Namespace(threads=None, spare_threads=4, bind="127.0.0.1:0", workers=1, backlog=64, timeout=30)
+    assert serve.gunicorn_options(args, 4, 16)["threads"] == 24
+
+
+def test_requests_beyond_the_queue_get_429(server):
+    total = MAX_CONCURRENT + MAX_QUEUED + 4
+    with ThreadPoolExecutor(total) as pool:
+        statuses = sorted(pool.map(lambda _: requests.get(f"{server}/slow", timeout=30).status_code, range(total)))
+    assert statuses.count(200) == MAX_CONCURRENT + MAX_QUEUED
+    assert statuses.count(429) == total - MAX_CONCURRENT - MAX_QUEUED
@@ -141,6 +141,54 @@ const AuthPage = () => {
         setFormData(prev => ({ ...prev, [name]: value }));
     };
 
+    // Grabs the current webcam frame as a JPEG blob.
+    const captureFrame = (canvas, video, quality = 0.7) => {
+        canvas.width = video.videoWidth;
+        canvas.height = video.videoHeight;
+        canvas.getContext('2d').drawImage(video, 0, 0, canvas.width, canvas.height);
+        return new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', quality));
+    };
+
+    // Liveness runs on the server: it hands out a challenge sequence, and the
+    // webcam frames sent to /landmarks are judged against it. /upload only
+    // accepts a session that has been completed this way, once, and only with
+    // a live face the session has seen; the selfie is therefore sent through
+    // the finished session before it is uploaded.
+    const runLivenessCheck = async (canvas, video) => {
+        const challengeResponse = await fetch('http://127.0.0.1:5000/get-challenge-sequence');
+        const { session_id: sessionId, instructions } = await challengeResponse.json();
+        let status = { done: false, completed: [] };
+        const deadline = Date.now() + 60000;
+        while (!status.done && Date.now() < deadline) {
+            setVerificationMessage(instructions[status.completed.length] || "Hold still...");
+            const frames = new FormData();
+            frames.append('session_id', sessionId);
+            for (let i = 0; i < 4; i++) {
+                const frame = await captureFrame(canvas, video);
+                if (frame) frames.append('frames', frame, `frame${i}.jpg`);
+                await new Promise(resolve => setTimeout(resolve, 80));
+            }
+            const response = await fetch('http://127.0.0.1:5000/landmarks', { method: 'POST', body: frames });
+            const data = await response.json();
+            if (!response.ok) throw new Error(data.message || "Liveness check failed.");
+            status = data.session;
+            if (status.frame_limit_reached) break;
+        }
+        if (!status.done) throw new Error("Liveness check timed out. Please try again.");
+        for (let attempt = 0; attempt < 5; attempt++) {
+            const liveFace = await captureFrame(canvas, video, 0.92);
+            if (!liveFace) continue;
+            const frames = new FormData();
+            frames.append('session_id', sessionId);
+            frames.append('frames', liveFace, 'live_face.jpg');
+            const response = await fetch('http://127.0.0.1:5000/landmarks', { method: 'POST', body: frames });
+            const data = await response.json();
+            if (!response.ok) throw new Error(data.message || "Liveness check failed.");
+            if (data.faces_found) return { sessionId, liveFace };
+        }
+        throw new Error("Failed to capture face. Please try again.");
+    };
+
     const handleVerification = async () => {
         if (!docImage || !videoRef.current?.srcObject?.active || videoRef.current.videoWidth === 0) {
             setVerificationMessage("Camera not ready. Please wait a moment and try again.");
@@ -148,62 +196,62 @@ const AuthPage = () => {
         }
 
         setIsVerifying(true);
-        setVerificationMessage("Analyzing ID and face... Please hold still.");
-
         const canvas = canvasRef.current;
         const video = videoRef.current;
-        canvas.width = video.videoWidth;
-        canvas.height = video.videoHeight;
-        canvas.getContext('2d').drawImage(video, 0, 0, canvas.width, canvas.height);
 
-        canvas.toBlob(async (blob) => {
-            if (!blob) {
-                setIsVerifying(false);
-                setVerificationMessage("Failed to capture face. Please try again.");
-                return;
-            }
+        let livenessSession, blob;
+        try {
+            ({ sessionId: livenessSession, liveFace: blob } = await runLivenessCheck(canvas, video));
+        } catch (error) {
+            console.error("Liveness Error:", error);
+            setVerificationMessage(error.message || "Liveness check failed. Please try again.");
+            setIsVerifying(false);
+            return;
+        }
 
-            const reader = new FileReader();
-            reader.onloadend = () => {
-                const base64String = reader.result.split(',')[1];
-                setSelfieBase64(base64String);
-            };
-            reader.readAsDataURL(blob);
+        setVerificationMessage("Analyzing ID and face... Please hold still.");
+
+        const reader = new FileReader();
+        reader.onloadend = () => {
+            const base64String = reader.result.split(',')[1];
+            setSelfieBase64(base64String);
+        };
+        reader.readAsDataURL(blob);
 
-            const apiFormData = new FormData();
-            apiFormData.append('document', docImage);
-            apiFormData.append('live_face', blob, 'live_face.jpg');
+        const apiFormData = new FormData();
+        apiFormData.append('document', docImage);
+        apiFormData.append('live_face', blob, 'live_face.jpg');
+        apiFormData.append('liveness_session', livenessSession);
 
-            try {
-                const response = await fetch('http://127.0.0.1:5000/upload', {
-                    method: 'POST',
-                    body: apiFormData,
-                });
+        try {
+            const response = await fetch('http://127.0.0.1:5000/upload', {
+                method: 'POST',
+                body: apiFormData,
+            });
 
-                const data = await response.json();
+            const data = await response.json();
 
-                if (response.ok && data.verification_status === "Verified") {
-                    setVerificationMessage(data.message || "Verification successful!");
-                    setIsVerified(true);
-                    setShowWebcam(false);
-                    stopWebcam();
-                    setFormData(prev => ({
-                        ...prev,
-                        fullName: data.extracted_data.name || '',
-                        dob: data.extracted_data.dob || '',
-                        address: data.extracted_data.address || ''
-                    }));
-                } else {
-                    setVerificationMessage(data.message || "Verification failed. The face may not match the ID.");
-                    setIsVerified(false);
-                }
-            } catch (error) {
-                console.error("Verification API Error:", error);
-                setVerificationMessage("Verification failed. The server might be offline.");
-            } finally {
-                setIsVerifying(false);
+            if (response.ok && data.verification_status === "Verified") {
+                setVerificationMessage(data.message || "Verification successful!");
+                setIsVerified(true);
+                setShowWebcam(false);
+                stopWebcam();
+                setFormData(prev => ({
+                    ...prev,
+                    fullName: data.extracted_data.name || '',
+                    dob: data.extracted_data.dob || '',
+                    address: data.extracted_data.address || ''
+                }));
+            } else {
+                setVerificationMessage(data.message || "Verification failed. The face may not match the ID.");
+                setIsVerified(false);
             }
-        }, 'image/jpeg');
+        } catch (error) {
+            console.error("Verification API Error:", error);
+            setVerificationMessage("Verification failed. The server might be offline.");
+        } finally {
+            setIsVerifying(false);
+        }
     };
 
     const handleAuthSubmit = async (e) => {
@@ -1,56 +1,222 @@
-# In app/app.py
-
-import os
-import joblib
-from flask import Flask, request, jsonify # No longer importing render_template
-from flask_cors import CORS
-
-# --- 1. Setup ---
-app = Flask(__name__)
-# This enables Cross-Origin Resource Sharing for your API
-CORS(app) 
-
-# --- 2. Load the Best Model ---
-MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
-MODEL_PATH = os.path.join(MODELS_DIR, 'best_model.pkl')
-
-if not os.path.exists(MODEL_PATH):
-    print(f"Error: The model file 'best_model.pkl' was not found in the '{MODELS_DIR}' directory.")
-    pipeline = None
-else:
-    pipeline = joblib.load(MODEL_PATH)
-    print("✅ Best model pipeline loaded successfully.")
-
-# --- 3. Define Routes ---
-@app.route('/')
-def home():
-    # This route is useful for quickly checking if the server is up.
-    return "AI Agent for Daan is active!"
-
-@app.route('/predict', methods=['POST'])
-def predict():
-    if pipeline is None:
-        return jsonify({'error': 'Model is not loaded'}), 500
-
-    # Get data from the JSON request body
-    req_data = request.get_json()
-    if not req_data or 'description' not in req_data:
-        return jsonify({'error': 'Description not found in request body.'}), 400
-
-    description = req_data['description']
-    if not description:
-        return jsonify({'error': 'Please provide a campaign description.'}), 400
-
-    # The pipeline handles the prediction
-    prediction = pipeline.predict([description])
-    
-    # Return a clean JSON response instead of rendering a template
-    if prediction[0] == 1:
-        result = "Genuine"
-    else:
-        result = "Requires Review"
-
-    return jsonify({'prediction': result})
-
-if __name__ == '__main__':
+# In app/app.py
+
+import os
+import json
+import logging
+from flask import Flask, Response, request, jsonify, stream_with_context # No longer importing render_template
+from flask_cors import CORS
+from prediction_cache import PredictionCache, make_key
+from model_registry import ModelRegistry
+from compact_model import is_compact_model
+
+# --- 1. Setup ---
+app = Flask(__name__)
+# This enables Cross-Origin Resource Sharing for your API
+CORS(app) 
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Upper bound on descriptions per /predict/batch call. The whole batch becomes
+# one sparse TF-IDF matrix, so this is what keeps memory use bounded.
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 1000))
+
+# Results of /predict, keyed on the cleaned description and the model version.
+# Set PREDICTION_CACHE_DB to a file path to share results between processes;
+# PREDICTION_CACHE_DB_SIZE caps the rows kept in it.
+PREDICTION_CACHE = PredictionCache(
+    maxsize=int(os.environ.get('PREDICTION_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 3600)),
+    db_path=os.environ.get('PREDICTION_CACHE_DB'),
+    disk_maxsize=int(os.environ.get('PREDICTION_CACHE_DB_SIZE', 100000)),
+)
+
+# --- 2. Load the Best Model ---
+MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
+# Prefer the compact export (models/best_model/, written by trainmodel.py): it
+# loads without scikit-learn and scores identically. MODEL_PATH overrides.
+COMPACT_MODEL_PATH = os.path.join(MODELS_DIR, 'best_model')
+MODEL_PATH = os.environ.get('MODEL_PATH') or (
+    COMPACT_MODEL_PATH if is_compact_model(COMPACT_MODEL_PATH) else os.path.join(MODELS_DIR, 'best_model.pkl')
+)
+
+# The registry hot-swaps the model when the model file changes (polled every
+# MODEL_WATCH_INTERVAL seconds, 0 to disable) or when /admin/reload is called.
+# Cached results belong to the old model, so a swap empties the cache.
+registry = ModelRegistry(MODEL_PATH, on_swap=lambda old, new: PREDICTION_CACHE.clear())
+
+if not os.path.exists(MODEL_PATH):
+    print(f"Error: The model '{os.path.basename(MODEL_PATH)}' was not found in the '{MODELS_DIR}' directory.")
+else:
+    registry.load()
+    print(f"✅ Best model pipeline loaded successfully (version {registry.current.version}).")
+
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 5))
+if MODEL_WATCH_INTERVAL > 0:
+    registry.watch(MODEL_WATCH_INTERVAL)
+
+# /admin endpoints need this token in the X-Admin-Token header. Without one
+# configured they are only reachable from localhost.
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# --- 3. Helpers ---
+def label_name(prediction):
+    """Maps the model's 0/1 output to the label shown to users."""
+    return "Genuine" if prediction == 1 else "Requires Review"
+
+def score_batch(model, descriptions):
+    """Runs many descriptions through the model's pipeline as one sparse matrix.
+
+    Returns (labels, scores). Labels are derived from the decision scores so
+    the text is only vectorized once; scores is None for models without a
+    decision_function.
+    """
+    pipeline = model.pipeline
+    descriptions = model.prepare(descriptions)
+    if hasattr(pipeline, 'decision_function'):
+        scores = pipeline.decision_function(descriptions)
+        if scores.ndim == 1:
+            labels = pipeline.classes_[(scores > 0).astype(int)]
+            return labels, scores
+    return pipeline.predict(descriptions), None
+
+def read_batch_items():
+    """Parses a /predict/batch body into a list of (id, description) pairs.
+
+    Accepts either JSON ({"descriptions": [...]} or a bare list) or NDJSON,
+    one string or {"id": ..., "description": ...} object per line. Returns
+    None if the body is malformed and raises OverflowError once more than
+    MAX_BATCH_SIZE items are seen, without reading the rest of the body.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        entries = []
+        for line in request.stream:
+            if not line.strip():
+                continue
+            if len(entries) >= MAX_BATCH_SIZE:
+                raise OverflowError
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                return None
+    else:
+        req_data = request.get_json(silent=True)
+        entries = req_data.get('descriptions') if isinstance(req_data, dict) else req_data
+        if not isinstance(entries, list):
+            return None
+        if len(entries) > MAX_BATCH_SIZE:
+            raise OverflowError
+
+    items = []
+    for index, entry in enumerate(entries):
+        if isinstance(entry, dict):
+            items.append((entry.get('id', index), entry.get('description')))
+        else:
+            items.append((index, entry))
+    return items
+
+def is_admin_request():
+    if ADMIN_TOKEN:
+        return request.headers.get('X-Admin-Token') == ADMIN_TOKEN
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+# --- 4. Define Routes ---
+@app.route('/')
+def home():
+    # This route is useful for quickly checking if the server is up.
+    return "AI Agent for Daan is active!"
+
+@app.route('/predict', methods=['POST'])
+def predict():
+    # Take one reference to the model so a concurrent reload cannot swap it
+    # out half-way through this request.
+    model = registry.current
+    if model is None:
+        return jsonify({'error': 'Model is not loaded'}), 500
+
+    # Get data from the JSON request body
+    req_data = request.get_json()
+    if not req_data or 'description' not in req_data:
+        return jsonify({'error': 'Description not found in request body.'}), 400
+
+    description = req_data['description']
+    if not description:
+        return jsonify({'error': 'Please provide a campaign description.'}), 400
+
+    # Identical cleaned text under the same model always gets the same answer,
+    # so serve repeats from the cache.
+    key = make_key(model.normalize(description), model.version)
+    result = PREDICTION_CACHE.get(key)
+    if result is None:
+        # The pipeline handles the prediction
+        labels, scores = score_batch(model, [description])
+        result = {'label': int(labels[0]), 'score': None if scores is None else float(scores[0])}
+        PREDICTION_CACHE.set(key, result)
+    
+    # Return a clean JSON response instead of rendering a template
+    return jsonify({'prediction': label_name(result['label']), 'model_version': model.version})
+
+@app.route('/cache/stats')
+def cache_stats():
+    """Hit/miss counters for the /predict result cache."""
+    return jsonify(PREDICTION_CACHE.stats())
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Scores many descriptions in one call and streams back NDJSON results."""
+    model = registry.current
+    if model is None:
+        return jsonify({'error': 'Model is not loaded'}), 500
+
+    try:
+        items = read_batch_items()
+    except OverflowError:
+        return jsonify({'error': f'Batch is larger than the maximum of {MAX_BATCH_SIZE} descriptions.'}), 413
+    if items is None:
+        return jsonify({'error': 'Expected a JSON list of descriptions or NDJSON lines.'}), 400
+
+    # Only valid descriptions go into the matrix; the rest get a per-item error.
+    valid = [i for i, (_, desc) in enumerate(items) if isinstance(desc, str) and desc.strip()]
+    labels, scores = score_batch(model, [items[i][1] for i in valid]) if valid else ([], None)
+    results = dict(zip(valid, range(len(valid))))
+
+    def generate():
+        for i, (item_id, _) in enumerate(items):
+            row = results.get(i)
+            if row is None:
+                line = {'id': item_id, 'error': 'Please provide a campaign description.'}
+            else:
+                line = {'id': item_id, 'prediction': label_name(labels[row]), 'model_version': model.version}
+                if scores is not None:
+                    line['score'] = float(scores[row])
+            yield json.dumps(line) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'X-Model-Version': model.version})
+
+@app.route('/admin/model')
+def model_status():
+    """Reports which model version is serving and the outcome of the last reload."""
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify(registry.status())
+
+@app.route('/admin/reload', methods=['POST'])
+def reload_model():
+    """Loads a model from the models directory in the background and swaps it in.
+
+    The optional JSON body {"model": "<file name>"} picks another file in
+    MODELS_DIR; by default the current model file is reloaded.
+    """
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden'}), 403
+    req_data = request.get_json(silent=True) or {}
+    path = registry.path
+    if req_data.get('model'):
+        # Only file names are accepted so callers cannot point us at arbitrary pickles.
+        path = os.path.join(MODELS_DIR, os.path.basename(req_data['model']))
+        if not os.path.exists(path):
+            return jsonify({'error': f"Model file '{req_data['model']}' not found."}), 404
+    registry.reload(path)
+    return jsonify({'status': 'reloading', 'path': path, 'current': registry.status()}), 202
+
+if __name__ == '__main__':
     app.run(debug=True, port=5001)
\ No newline at end of file
@@ -0,0 +1,214 @@
+# compact_model.py
+#
+# A TF-IDF + linear classifier pipeline stored as plain NumPy arrays, and a
+# scorer that serves it without importing scikit-learn. Unpickling
+# best_model.pkl imports all of sklearn and rebuilds the vocabulary dict in
+# every worker; the arrays here are memory-mapped instead, so workers start
+# faster and share the pages through the OS page cache.
+#
+# The scorer reproduces sklearn's arithmetic step for step (same token
+# pattern and n-grams, counts -> idf -> l2 norm -> sparse dot), so its
+# decision scores are bit-identical to the pickled pipeline's.
+#
+# Layout of an exported model directory:
+#   manifest.json   vectorizer settings, class labels, whether to clean text
+#   stop_words.txt  stopwords of the cleaner the model was trained with
+#   terms.npy       vocabulary, sorted, fixed-width unicode
+#   term_index.npy  feature column of each entry in terms.npy
+#   idf.npy         idf weight per feature column
+#   coef.npy        classifier weight per feature column
+#   intercept.npy   classifier intercept
+
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+import scipy.sparse as sp
+
+from preprocessing import TextCleaner, default_cleaner
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+
+def export_compact(pipeline, out_dir):
+    """Writes a fitted [clean ->] tfidf -> clf pipeline to out_dir.
+
+    The directory is written next to out_dir first and then renamed into
+    place, so a server watching out_dir never sees a half-written model.
+    Raises ValueError for pipelines this format cannot reproduce exactly.
+    """
+    steps = dict(pipeline.named_steps)
+    tfidf, clf = steps.get('tfidf'), steps.get('clf')
+    if tfidf is None or clf is None or set(steps) - {'clean', 'tfidf', 'clf'}:
+        raise ValueError("Expected a pipeline of 'tfidf' and 'clf' steps, optionally after 'clean'.")
+    unsupported = {
+        'analyzer': tfidf.analyzer != 'word',
+        'tokenizer': tfidf.tokenizer is not None,
+        'preprocessor': tfidf.preprocessor is not None,
+        'strip_accents': tfidf.strip_accents is not None,
+        'stop_words': tfidf.stop_words is not None,
+        'dtype': np.dtype(tfidf.dtype) != np.float64,
+        'norm': tfidf.norm not in ('l2', None),
+    }
+    if any(unsupported.values()):
+        raise ValueError(f"Unsupported TfidfVectorizer settings: {[k for k, v in unsupported.items() if v]}")
+    if clf.coef_.shape[0] != 1 or len(clf.classes_) != 2:
+        raise ValueError("Only binary linear classifiers can be exported.")
+    clean_func = getattr(steps.get('clean'), 'func', None)
+    if 'clean' in steps and getattr(clean_func, '__name__', None) != 'clean_batch':
+        raise ValueError("The 'clean' step must be preprocessing.clean_batch.")
+
+    vocabulary = tfidf.vocabulary_
+    terms = sorted(vocabulary)
+    manifest = {
+        'format': FORMAT_VERSION,
+        'clean': 'clean' in steps,
+        'lowercase': bool(tfidf.lowercase),
+        'token_pattern': tfidf.token_pattern,
+        'ngram_range': list(tfidf.ngram_range),
+        'binary': bool(tfidf.binary),
+        'sublinear_tf': bool(tfidf.sublinear_tf),
+        'use_idf': bool(tfidf.use_idf),
+        'norm': tfidf.norm,
+        'classes': clf.classes_.tolist(),
+        'n_features': len(vocabulary),
+    }
+
+    tmp_dir = out_dir.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, 'terms.npy'), np.array(terms, dtype=str))
+    np.save(os.path.join(tmp_dir, 'term_index.npy'), np.array([vocabulary[t] for t in terms], dtype=np.int64))
+    if tfidf.use_idf:
+        np.save(os.path.join(tmp_dir, 'idf.npy'), np.asarray(tfidf.idf_, dtype=np.float64))
+    np.save(os.path.join(tmp_dir, 'coef.npy'), np.ascontiguousarray(clf.coef_[0], dtype=np.float64))
+    np.save(os.path.join(tmp_dir, 'intercept.npy'), np.asarray(clf.intercept_, dtype=np.float64))
+    # The stopword list travels with the model, so serving neither imports
+    # NLTK nor depends on which NLTK data happens to be installed.
+    with open(os.path.join(tmp_dir, 'stop_words.txt'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(sorted(default_cleaner().stop_words)))
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    old_dir = out_dir.rstrip(os.sep) + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def is_compact_model(path):
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+class CompactModel:
+    """Scores text with an exported model; a drop-in for the pickled pipeline."""
+
+    def __init__(self, path, mmap=True):
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        if manifest['format'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact model format {manifest['format']}.")
+        mmap_mode = 'r' if mmap else None
+
+        def load(name):
+            # A plain ndarray view of the mapping: indexing np.memmap objects
+            # directly is several times slower.
+            return np.load(os.path.join(path, name), mmap_mode=mmap_mode).view(np.ndarray)
+
+        self.manifest = manifest
+        self.terms = load('terms.npy')
+        self.term_index = load('term_index.npy')
+        self.idf = load('idf.npy') if manifest['use_idf'] else None
+        self.coef = load('coef.npy')
+        self.intercept = load('intercept.npy')
+        self.classes_ = np.array(manifest['classes'])
+        self.n_features = manifest['n_features']
+        with open(os.path.join(path, 'stop_words.txt'), encoding='utf-8') as f:
+            self.cleaner = TextCleaner(f.read().split())
+        # Mirrors the pipeline: only models trained with a 'clean' step clean
+        # their own input; for the rest the caller is expected to (with
+        # self.cleaner).
+        self.needs_cleaning = not manifest['clean']
+        self._lowercase = manifest['lowercase']
+        self._token_re = re.compile(manifest['token_pattern'])
+        self._min_n, self._max_n = manifest['ngram_range']
+
+    def _analyze(self, doc):
+        # Same tokens as TfidfVectorizer's word analyzer. Their order differs,
+        # which is harmless: only the per-document counts are used.
+        if self._lowercase:
+            doc = doc.lower()
+        tokens = self._token_re.findall(doc)
+        if self._max_n == 1:
+            return tokens
+        original = tokens
+        tokens = list(original) if self._min_n == 1 else []
+        for n in range(max(self._min_n, 2), min(self._max_n, len(original)) + 1):
+            tokens.extend(map(' '.join, zip(*[original[k:] for k in range(n)])))
+        return tokens
+
+    def transform(self, descriptions):
+        """Returns the TF-IDF matrix, as a CSR matrix with sorted indices."""
+        if self.manifest['clean']:
+            descriptions = self.cleaner.clean_batch(descriptions)
+        n_docs = len(descriptions)
+        tokens, lengths = [], np.empty(n_docs, dtype=np.int64)
+        analyze, extend = self._analyze, tokens.extend
+        for i, doc in enumerate(descriptions):
+            doc_tokens = analyze(doc)
+            extend(doc_tokens)
+            lengths[i] = len(doc_tokens)
+
+        # One vectorized vocabulary lookup for the whole batch.
+        tokens = np.array(tokens, dtype=str)
+        rows = np.repeat(np.arange(n_docs), lengths)
+        if len(tokens) and len(self.terms):
+            pos = np.searchsorted(self.terms, tokens)
+            pos[pos == len(self.terms)] = 0
+            found = self.terms[pos] == tokens
+            rows, cols = rows[found], self.term_index[pos[found]]
+        else:
+            rows, cols = rows[:0], np.empty(0, dtype=np.int64)
+
+        # COO -> CSR sums duplicate (row, col) pairs into counts and sorts
+        # the column indices, which is the layout CountVectorizer produces.
+        X = sp.coo_matrix((np.ones(len(cols)), (rows, cols)), shape=(n_docs, self.n_features)).tocsr()
+        X.sum_duplicates()
+        if self.manifest['binary']:
+            X.data.fill(1)
+        if self.manifest['sublinear_tf']:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        if self.idf is not None:
+            X.data *= self.idf[X.indices]
+        if self.manifest['norm'] == 'l2':
+            # Row sums through a sparse mat-vec accumulate left to right,
+            # exactly like sklearn's inplace_csr_row_normalize_l2.
+            norms = np.sqrt(X.multiply(X).tocsr() @ np.ones(self.n_features))
+            row_norms = np.repeat(norms, np.diff(X.indptr))
+            nonzero = row_norms != 0.0
+            X.data[nonzero] /= row_norms[nonzero]
+        return X
+
+    def decision_function(self, descriptions):
+        return self.transform(descriptions) @ self.coef + self.intercept
+
+    def predict(self, descriptions):
+        return self.classes_[(self.decision_function(descriptions) > 0).astype(int)]
+
+
+if __name__ == '__main__':
+    import argparse
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Export a saved pipeline to the compact format.")
+    parser.add_argument('pickle', help="Path to a joblib pipeline, e.g. models/best_model.pkl")
+    parser.add_argument('out_dir', help="Directory to write, e.g. models/best_model")
+    args = parser.parse_args()
+    export_compact(joblib.load(args.pickle), args.out_dir)
+    print(f"✅ Compact model written to: {args.out_dir}")
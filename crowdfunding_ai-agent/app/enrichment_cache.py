@@ -0,0 +1,182 @@
+# enrichment_cache.py
+#
+# Remembers Google searches (query -> links) and scraped pages (URL ->
+# extracted text) for web_enricher.py, so campaigns that mention the same
+# hospital or NGO do not repeat the search or re-download the page. Both
+# layers live in one SQLite file that any number of processes can share.
+#
+# Pages past their TTL are not thrown away: if the server sent an ETag or
+# Last-Modified header, the next fetch revalidates with a conditional GET and
+# a 304 keeps the stored text. Each layer is capped in size and evicts its
+# least recently used entries.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'daan', 'enrichment.sqlite3')
+
+
+class CachedPage:
+    """A stored page: its text, validators and whether it is still fresh."""
+
+    def __init__(self, text, etag, last_modified, fresh):
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fresh = fresh
+
+    def revalidation_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class EnrichmentCache:
+    """SQLite-backed cache of search results and page text with LRU eviction."""
+
+    def __init__(self, db_path=DEFAULT_PATH, search_ttl=7 * 24 * 3600, page_ttl=24 * 3600,
+                 max_searches=50000, max_page_bytes=500 * 1024 * 1024):
+        self.db_path = db_path
+        self.search_ttl = search_ttl
+        self.page_ttl = page_ttl
+        self.max_searches = max_searches
+        self.max_page_bytes = max_page_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counts = {'search_hits': 0, 'search_misses': 0,
+                        'page_hits': 0, 'page_stale': 0, 'page_revalidated': 0, 'page_misses': 0}
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS searches ("
+                "query TEXT PRIMARY KEY, links TEXT NOT NULL, created REAL NOT NULL, used REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, text TEXT NOT NULL, etag TEXT, last_modified TEXT, "
+                "fetched REAL NOT NULL, used REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS searches_used ON searches (used)")
+            conn.execute("CREATE INDEX IF NOT EXISTS pages_used ON pages (used)")
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared between threads, so keep one each.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    # --- Searches ---
+
+    def get_links(self, query):
+        """Returns the cached links for query, or None if missing or expired."""
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT links FROM searches WHERE query = ? AND created > ?", (query, now - self.search_ttl)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE searches SET used = ? WHERE query = ?", (now, query))
+        self._count('search_hits' if row is not None else 'search_misses')
+        return json.loads(row[0]) if row is not None else None
+
+    def set_links(self, query, links):
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO searches (query, links, created, used) VALUES (?, ?, ?, ?)",
+                (query, json.dumps(links), now, now),
+            )
+            conn.execute(
+                "DELETE FROM searches WHERE query IN ("
+                "SELECT query FROM searches ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.max_searches,),
+            )
+
+    # --- Pages ---
+
+    def get_page(self, url):
+        """Returns a CachedPage for url, or None.
+
+        Stale pages are only returned if they can be revalidated; the caller
+        then sends `revalidation_headers()` and calls `refresh_page` on a 304.
+        """
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT text, etag, last_modified, fetched FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE pages SET used = ? WHERE url = ?", (now, url))
+        if row is None:
+            self._count('page_misses')
+            return None
+        text, etag, last_modified, fetched = row
+        fresh = fetched > now - self.page_ttl
+        if not fresh and not (etag or last_modified):
+            self._count('page_misses')
+            return None
+        self._count('page_hits' if fresh else 'page_stale')
+        return CachedPage(text, etag, last_modified, fresh)
+
+    def refresh_page(self, url):
+        """Marks a stale page as fresh again after a 304 Not Modified."""
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute("UPDATE pages SET fetched = ?, used = ? WHERE url = ?", (now, now, url))
+        self._count('page_revalidated')
+
+    def set_page(self, url, text, etag=None, last_modified=None):
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (url, text, etag, last_modified, fetched, used, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, text, etag, last_modified, now, now, len(text.encode('utf-8'))),
+            )
+            self._evict_pages(conn)
+
+    def _evict_pages(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_page_bytes:
+            return
+        # Drop least recently used pages until the total is under the cap.
+        excess, doomed = total - self.max_page_bytes, []
+        for url, size in conn.execute("SELECT url, size FROM pages ORDER BY used"):
+            doomed.append((url,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM pages WHERE url = ?", doomed)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        search_lookups = counts['search_hits'] + counts['search_misses']
+        page_lookups = counts['page_hits'] + counts['page_stale'] + counts['page_misses']
+        conn = self._connection()
+        searches = conn.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+        pages, page_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        return {
+            **counts,
+            'search_hit_rate': counts['search_hits'] / search_lookups if search_lookups else 0.0,
+            'page_hit_rate': (counts['page_hits'] + counts['page_revalidated']) / page_lookups if page_lookups else 0.0,
+            'searches': searches,
+            'pages': pages,
+            'page_bytes': page_bytes,
+            'path': self.db_path,
+        }
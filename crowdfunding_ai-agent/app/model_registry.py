@@ -0,0 +1,151 @@
+# model_registry.py
+#
+# Holds the model app.py serves and swaps in new ones without a restart.
+# A reload loads and warms the new pipeline on a background thread, then
+# replaces the current model with a single reference assignment. Requests
+# grab `registry.current` once, so anything already in flight finishes on
+# the model it started with.
+
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from compact_model import CompactModel, is_compact_model
+from preprocessing import default_cleaner
+
+WARMUP_TEXT = "Help us fund life-saving surgery for my father."
+
+
+def file_version(path):
+    """Short content hash of a model file or directory, used as its version string."""
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        paths = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+    else:
+        paths = [path]
+    for file_path in paths:
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def load_model(path):
+    """Loads a compact model directory or a joblib-pickled pipeline.
+
+    joblib (and with it scikit-learn) is only imported for pickles.
+    """
+    if is_compact_model(path):
+        return CompactModel(path)
+    import joblib
+    return joblib.load(path)
+
+
+class LoadedModel:
+    """A loaded pipeline together with where it came from."""
+
+    def __init__(self, pipeline, path, version):
+        self.pipeline = pipeline
+        self.path = path
+        self.version = version
+        self.loaded_at = time.time()
+        # Pipelines saved before cleaning became their first step expect the
+        # caller to clean the text. Compact models say so themselves.
+        self.needs_cleaning = getattr(pipeline, 'needs_cleaning', 'clean' not in getattr(pipeline, 'named_steps', {}))
+        self.cleaner = getattr(pipeline, 'cleaner', None)
+
+    def _cleaner(self):
+        return self.cleaner or default_cleaner()
+
+    def prepare(self, descriptions):
+        return self._cleaner().clean_batch(descriptions) if self.needs_cleaning else descriptions
+
+    def normalize(self, description):
+        """Cleaned form of a description, as the model sees it."""
+        return self._cleaner().clean_text(description)
+
+
+class ModelRegistry:
+    """Serves one model at a time and hot-swaps it on reload."""
+
+    def __init__(self, path, on_swap=None):
+        self.path = path
+        self.on_swap = on_swap
+        self.current = None
+        self.last_error = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._seen_signature = None  # stat of the file last loaded or tried
+
+    def load(self, path=None):
+        """Loads, warms and swaps in a model synchronously.
+
+        Returns the new LoadedModel. On failure the current model is kept,
+        the error is recorded in last_error and the exception re-raised.
+        """
+        path = path or self.path
+        with self._reload_lock:
+            self._seen_signature = _stat_signature(path)
+            try:
+                model = LoadedModel(load_model(path), path, file_version(path))
+                model.pipeline.predict(model.prepare([WARMUP_TEXT]))
+            except Exception as e:
+                self.last_error = f"{path}: {e}"
+                logging.error(f"Could not load model from {path}: {e}")
+                raise
+            previous, self.current = self.current, model
+            self.path = path
+            self.last_error = None
+        logging.info(f"Model {model.version} is now serving (from {path}).")
+        if self.on_swap is not None:
+            self.on_swap(previous, model)
+        return model
+
+    def reload(self, path=None):
+        """Starts a background load of path (default: the current path)."""
+        thread = threading.Thread(target=self._reload_quietly, args=(path,), daemon=True)
+        thread.start()
+        return thread
+
+    def _reload_quietly(self, path):
+        try:
+            self.load(path)
+        except Exception:
+            pass  # already logged and kept in last_error
+
+    def watch(self, interval=5.0):
+        """Polls the model file and reloads it whenever it changes."""
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch_loop, args=(interval,), daemon=True)
+        self._watcher.start()
+
+    def _watch_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            current = _stat_signature(self.path)
+            if current is None or current == self._seen_signature:
+                continue
+            # trainmodel.py may still be writing the file; give it a moment.
+            time.sleep(min(interval, 1.0))
+            self._reload_quietly(self.path)
+
+    def status(self):
+        model = self.current
+        return {
+            'version': model.version if model else None,
+            'path': model.path if model else self.path,
+            'loaded_at': model.loaded_at if model else None,
+            'last_error': self.last_error,
+            'watching': self._watcher is not None,
+        }
+
+
+def _stat_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
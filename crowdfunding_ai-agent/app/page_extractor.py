@@ -0,0 +1,133 @@
+# page_extractor.py
+#
+# Turns a downloaded HTML page into the visible text web_enricher.py
+# summarizes. The page is parsed incrementally as chunks arrive, with lxml's
+# C parser driving a small target that throws away script, style, navigation
+# and other boilerplate as it goes, so no document tree is ever built and
+# memory stays proportional to the text kept rather than the page size.
+# If a page has a <main> or <article> with real content, only that is kept.
+#
+# Without lxml the chunks are buffered and handed to BeautifulSoup's
+# pure-Python parser at the end, as web_enricher always did.
+
+import re
+import time
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# Elements whose text is never article content.
+SKIPPED_TAGS = frozenset({
+    'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'object',
+    'nav', 'header', 'footer', 'aside', 'form', 'button', 'select',
+})
+MAIN_TAGS = frozenset({'main', 'article'})
+MAIN_MIN_CHARS = 200  # shorter <main>/<article> text is ignored in favour of the whole page
+
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+def sniff_encoding(content_type, head):
+    """Encoding from the Content-Type header or a <meta charset> in the first bytes.
+
+    Defaults to UTF-8: libxml2 would otherwise assume Latin-1 and garble it.
+    """
+    match = re.search(r'charset=["\']?([\w.:-]+)', content_type or '', re.IGNORECASE)
+    if match:
+        return match.group(1)
+    match = _META_CHARSET_RE.search(head[:4096])
+    return match.group(1).decode('ascii') if match else 'utf-8'
+
+
+class _TextCollector:
+    """lxml parser target that keeps visible text and drops boilerplate while streaming."""
+
+    def __init__(self):
+        self.pieces = []
+        self.main_pieces = []
+        self._buffer = []
+        self._skip_depth = 0
+        self._main_depth = 0
+
+    def _flush(self):
+        # lxml may split one text node across several data() calls (e.g. at
+        # chunk boundaries), so text is only committed at tag boundaries.
+        if self._buffer:
+            text = ''.join(self._buffer).strip()
+            self._buffer = []
+            if text:
+                self.pieces.append(text)
+                if self._main_depth:
+                    self.main_pieces.append(text)
+
+    def start(self, tag, attrib):
+        self._flush()
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in MAIN_TAGS and not self._skip_depth:
+            self._main_depth += 1
+
+    def end(self, tag):
+        self._flush()
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag in MAIN_TAGS and not self._skip_depth:
+            self._main_depth = max(self._main_depth - 1, 0)
+
+    def data(self, data):
+        if not self._skip_depth:
+            self._buffer.append(data)
+
+    def close(self):
+        self._flush()
+        main = ' '.join(self.main_pieces)
+        return main if len(main) >= MAIN_MIN_CHARS else ' '.join(self.pieces)
+
+
+class PageExtractor:
+    """Feed it a page's bytes chunk by chunk, then `close()` for the text.
+
+    `parse_seconds` accumulates the time spent parsing, for tuning limits.
+    """
+
+    def __init__(self, content_type=''):
+        self.content_type = content_type
+        self.parse_seconds = 0.0
+        self._parser = None
+        self._chunks = []
+
+    def feed(self, chunk):
+        start = time.perf_counter()
+        if etree is None:
+            self._chunks.append(chunk)
+        else:
+            if self._parser is None:
+                encoding = sniff_encoding(self.content_type, chunk)
+                self._parser = etree.HTMLParser(target=_TextCollector(), encoding=encoding,
+                                                remove_comments=True, remove_pis=True)
+            self._parser.feed(chunk)
+        self.parse_seconds += time.perf_counter() - start
+
+    def close(self):
+        start = time.perf_counter()
+        if etree is None:
+            from bs4 import BeautifulSoup
+            soup = BeautifulSoup(b''.join(self._chunks), 'html.parser')
+            for tag in soup(list(SKIPPED_TAGS)):
+                tag.decompose()
+            text = soup.get_text(separator=' ', strip=True)
+        elif self._parser is None:
+            text = ''
+        else:
+            text = self._parser.close()
+        self.parse_seconds += time.perf_counter() - start
+        return text
+
+
+def extract_text(html, content_type=''):
+    """Visible main-content text of a complete page given as bytes."""
+    extractor = PageExtractor(content_type)
+    extractor.feed(html)
+    return extractor.close()
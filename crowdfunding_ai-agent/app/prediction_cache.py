@@ -0,0 +1,147 @@
+# prediction_cache.py
+#
+# Caches /predict results so the keystroke-driven calls the frontend makes
+# while a creator edits their story do not re-run TF-IDF and the SVM for text
+# the model has already seen. Entries live in an in-process LRU with a TTL and,
+# optionally, in a SQLite file that several worker processes can share. The
+# file is bounded too: expired rows, and the oldest rows beyond disk_maxsize,
+# are deleted as new ones are written.
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_key(normalized_text, model_version):
+    """Cache key for a cleaned description scored by a given model version."""
+    return hashlib.sha256(f"{model_version}\0{normalized_text}".encode('utf-8')).hexdigest()
+
+
+class PredictionCache:
+    """LRU + TTL cache of prediction results with an optional on-disk layer.
+
+    Values must be JSON-serializable. The disk layer is only consulted on an
+    in-memory miss; hits from it are promoted back into memory. It is pruned
+    every `prune_every` writes, so it can briefly exceed `disk_maxsize` by
+    that many rows per process.
+    """
+
+    def __init__(self, maxsize=10000, ttl=3600, db_path=None, disk_maxsize=100000, prune_every=100):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.db_path = db_path
+        self.disk_maxsize = disk_maxsize
+        self.prune_every = prune_every
+        self._writes = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if db_path:
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS predictions ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS predictions_created ON predictions (created)")
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared between threads, so keep one each.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """Returns the cached value for key, or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+        if self.db_path:
+            row = self._connection().execute(
+                "SELECT value FROM predictions WHERE key = ? AND created > ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+            if row is not None:
+                value = json.loads(row[0])
+                self._remember(key, value)
+                with self._lock:
+                    self.disk_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        self._remember(key, value)
+        if self.db_path:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO predictions (key, value, created) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), time.time()),
+                )
+            with self._lock:
+                self._writes += 1
+                prune = self._writes % self.prune_every == 0
+            if prune:
+                self.prune()
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def prune(self):
+        """Deletes expired rows and the oldest rows beyond disk_maxsize from the disk layer."""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM predictions WHERE created <= ?", (time.time() - self.ttl,))
+            conn.execute(
+                "DELETE FROM predictions WHERE key IN "
+                "(SELECT key FROM predictions ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.disk_maxsize,),
+            )
+
+    def clear(self):
+        """Drops every in-memory entry and prunes the disk layer (see prune).
+
+        Disk rows for other model versions are left alone: they can never
+        match a key for the current version, and another worker process may
+        still be serving the model they belong to. They age out via the TTL.
+        """
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            self.prune()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'disk': self.db_path,
+                'disk_maxsize': self.disk_maxsize if self.db_path else None,
+            }
+
@@ -0,0 +1,70 @@
+# preprocessing.py
+#
+# The one text-cleaning code path shared by training (scripts/trainmodel.py),
+# evaluation (scripts/testmodel.py) and serving (app.py). Saved pipelines embed
+# `clean_batch` as their first step, so the model always sees text cleaned the
+# same way it was trained on.
+
+import re
+from itertools import filterfalse
+
+# `re.sub(r'[^\w\s]', '', text)` is what training has always used. For ASCII
+# text the same characters are deleted with a precompiled bytes translation,
+# which is much cheaper than the regex; anything else falls back to the regex
+# so Unicode punctuation is handled exactly as before.
+_PUNCT_RE = re.compile(r'[^\w\s]')
+_PUNCT_BYTES = bytes(c for c in range(128) if _PUNCT_RE.match(chr(c)))
+
+_default_cleaner = None
+
+
+class TextCleaner:
+    """Lowercases, strips punctuation and removes the given stopwords."""
+
+    def __init__(self, stop_words):
+        self.stop_words = frozenset(stop_words)
+        self._is_stop_word = self.stop_words.__contains__
+
+    def clean_text(self, text):
+        text = str(text).lower()
+        if text.isascii():
+            text = text.encode('ascii').translate(None, _PUNCT_BYTES).decode('ascii')
+        else:
+            text = _PUNCT_RE.sub('', text)
+        return ' '.join(filterfalse(self._is_stop_word, text.split()))
+
+    def clean_batch(self, texts):
+        """Cleans a list, array or pandas Series of texts, returning a list."""
+        return list(map(self.clean_text, texts))
+
+
+def default_cleaner():
+    """The cleaner using NLTK's English stopwords, as training always has.
+
+    NLTK is imported on first use rather than at import time: it takes over a
+    second to import, and the compact serving path never needs it.
+    """
+    global _default_cleaner
+    if _default_cleaner is None:
+        import nltk
+        from nltk.corpus import stopwords
+        try:
+            stopwords.words('english')
+        except LookupError:
+            nltk.download('stopwords')
+        _default_cleaner = TextCleaner(stopwords.words('english'))
+    return _default_cleaner
+
+
+def clean_text(text):
+    """Cleans one text with the default (NLTK stopwords) cleaner."""
+    return default_cleaner().clean_text(text)
+
+
+def clean_batch(texts):
+    """Cleans many texts with the default cleaner, returning a list.
+
+    This is the function embedded in saved pipelines as the 'clean' step
+    (via sklearn's FunctionTransformer), so keep its name and module stable.
+    """
+    return default_cleaner().clean_batch(texts)
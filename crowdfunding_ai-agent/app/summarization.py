@@ -0,0 +1,125 @@
+# summarization.py
+#
+# Extractive summarizers for scraped pages (used by web_enricher.py).
+#
+# sumy's LsaSummarizer runs an SVD over a term x sentence matrix, so its cost
+# climbs steeply with page length. Two things keep that in check here:
+#
+#   * Candidate sentences are capped first: pages longer than `max_sentences`
+#     are sampled evenly across their length (always keeping the opening
+#     sentences, where pages usually say what they are about).
+#   * Besides 'lsa', two cheaper methods work on a sparse TF-IDF matrix built
+#     directly with SciPy: 'textrank' (PageRank over sentence cosine
+#     similarity) and 'centroid' (similarity to the page's mean TF-IDF
+#     vector).
+#
+# All methods return the chosen sentences in page order, like sumy does.
+
+import re
+
+import numpy as np
+import scipy.sparse as sp
+
+METHODS = ('lsa', 'textrank', 'centroid')
+MAX_SENTENCES = 200  # candidate sentences considered per page
+LEAD_SENTENCES = 20  # opening sentences always kept when sampling
+
+_WORD_RE = re.compile(r"[^\W\d_]+")
+_stop_words = None
+_lsa_summarizer = None
+
+
+def _get_stop_words():
+    global _stop_words
+    if _stop_words is None:
+        from sumy.utils import get_stop_words
+        _stop_words = frozenset(get_stop_words('english'))
+    return _stop_words
+
+
+def cap_sentences(sentences, max_sentences=MAX_SENTENCES, lead=LEAD_SENTENCES):
+    """At most max_sentences of sentences, in order: the lead plus an even sample of the rest."""
+    if max_sentences is None or len(sentences) <= max_sentences:
+        return list(sentences)
+    lead = min(lead, max_sentences)
+    rest = np.linspace(lead, len(sentences) - 1, max_sentences - lead).round().astype(int)
+    keep = list(range(lead)) + sorted(set(rest.tolist()))
+    return [sentences[i] for i in keep]
+
+
+def tfidf_matrix(sentences):
+    """L2-normalized TF-IDF rows for the sentences, as a CSR matrix."""
+    stop_words = _get_stop_words()
+    vocabulary, indices, indptr = {}, [], [0]
+    for sentence in sentences:
+        for word in _WORD_RE.findall(sentence.lower()):
+            if word not in stop_words:
+                indices.append(vocabulary.setdefault(word, len(vocabulary)))
+        indptr.append(len(indices))
+    X = sp.csr_matrix((np.ones(len(indices)), indices, indptr), shape=(len(sentences), len(vocabulary)))
+    X.sum_duplicates()
+    document_frequency = np.bincount(X.indices, minlength=len(vocabulary))
+    idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1
+    X.data *= idf[X.indices]
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sp.csr_matrix(sp.diags(1.0 / norms) @ X)
+
+
+def textrank_scores(X, damping=0.85, iterations=50, tol=1e-6):
+    """PageRank over the cosine-similarity graph of the TF-IDF rows."""
+    n = X.shape[0]
+    similarity = sp.csr_matrix(X @ X.T)
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+    out_weight = np.asarray(similarity.sum(axis=1)).ravel()
+    out_weight[out_weight == 0] = 1.0
+    transition = sp.csr_matrix(sp.diags(1.0 / out_weight) @ similarity).T.tocsr()
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition @ scores)
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+
+def centroid_scores(X):
+    """Cosine similarity of each row to the mean row."""
+    centroid = np.asarray(X.mean(axis=0)).ravel()
+    norm = np.linalg.norm(centroid)
+    return X @ centroid / norm if norm else np.zeros(X.shape[0])
+
+
+def _lsa(sentences, num_sentences, tokenizer):
+    global _lsa_summarizer
+    from sumy.parsers.plaintext import PlaintextParser
+    if _lsa_summarizer is None:
+        from sumy.summarizers.lsa import LsaSummarizer
+        _lsa_summarizer = LsaSummarizer()  # keeps no state between calls
+    document = PlaintextParser.from_string(" ".join(sentences), tokenizer).document
+    return [str(s) for s in _lsa_summarizer(document, num_sentences)]
+
+
+def summarize(text, num_sentences=3, method='textrank', max_sentences=MAX_SENTENCES, tokenizer=None):
+    """The num_sentences most central sentences of text, joined in page order.
+
+    `tokenizer` is a sumy Tokenizer, used to split sentences (and by 'lsa');
+    one for English is created if none is given.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown summarizer {method!r}; choose from {METHODS}.")
+    if tokenizer is None:
+        from sumy.nlp.tokenizers import Tokenizer
+        tokenizer = Tokenizer("english")
+    sentences = cap_sentences([s for s in tokenizer.to_sentences(text) if s], max_sentences)
+    if len(sentences) <= num_sentences:
+        return " ".join(sentences)
+    if method == 'lsa':
+        return " ".join(_lsa(sentences, num_sentences, tokenizer))
+
+    X = tfidf_matrix(sentences)
+    scores = textrank_scores(X) if method == 'textrank' else centroid_scores(X)
+    # Highest scores first; ties go to the earlier sentence.
+    best = np.argsort(-scores, kind='stable')[:num_sentences]
+    return " ".join(sentences[i] for i in sorted(best))
@@ -1,98 +1,378 @@
 # web_enricher.py
 
 # --- Step 1: All imports at the top ---
-import spacy
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+
 import requests
-from bs4 import BeautifulSoup
+import requests.adapters
 from googlesearch import search
-from sumy.parsers.plaintext import PlaintextParser
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.summarizers.lsa import LsaSummarizer
-import nltk
 
-# --- Step 2: Ensure necessary NLTK data is available for the summarizer ---
-# This is a small "setup" step to make sure `sumy` works correctly.
-try:
-    nltk.data.find('tokenizers/punkt')
-except nltk.downloader.DownloadError:
-    print("Downloading NLTK 'punkt' model for summarization...")
-    nltk.download('punkt')
+from enrichment_cache import DEFAULT_PATH, EnrichmentCache
+from page_extractor import PageExtractor
+from summarization import MAX_SENTENCES, summarize
 
+# --- Step 2: NLP resources, loaded on first use and then shared ---
+# spaCy, sumy and NLTK take seconds to import and load, so nothing is loaded
+# until a function needs it; after that every call (and thread) reuses the
+# same objects. NLTK's 'punkt' data is downloaded then if it is missing.
 
-# --- Step 3: Your functions remain mostly the same, as they are correct ---
+# find_clues only reads noun_chunks (tagger, attribute_ruler, parser) and
+# entities (ner); the lemmatizer is never loaded.
+SPACY_MODEL = "en_core_web_sm"
+SPACY_EXCLUDE = ["lemmatizer"]
 
-# Load the spaCy model once when the module is loaded
-nlp = spacy.load("en_core_web_sm")
+_nlp = None
+_tokenizer = None
+_nlp_lock = threading.Lock()
 
-def find_clues(description):
-    """This function takes a description and pulls out the important keywords."""
-    doc = nlp(description)
+
+def get_nlp():
+    """The shared spaCy pipeline."""
+    global _nlp
+    with _nlp_lock:
+        if _nlp is None:
+            import spacy
+            _nlp = spacy.load(SPACY_MODEL, exclude=SPACY_EXCLUDE)
+    return _nlp
+
+
+def get_tokenizer():
+    """The shared sumy tokenizer for English."""
+    global _tokenizer
+    with _nlp_lock:
+        if _tokenizer is None:
+            from sumy.nlp.tokenizers import Tokenizer
+            try:
+                _tokenizer = Tokenizer("english")
+            except LookupError:
+                import nltk
+                print("Downloading NLTK 'punkt' model for summarization...")
+                nltk.download('punkt')
+                nltk.download('punkt_tab')  # what newer NLTK releases load instead
+                _tokenizer = Tokenizer("english")
+    return _tokenizer
+
+
+# Search and fetch limits. Links are fetched concurrently (see Step 4), so
+# enrichment is bounded by ENRICHMENT_DEADLINE rather than SEARCH_RESULTS * PAGE_TIMEOUT.
+SEARCH_RESULTS = 5
+PAGE_TIMEOUT = 10          # seconds allowed for any one page
+ENRICHMENT_DEADLINE = 20   # seconds allowed for fetching all of them
+# Adding a user-agent header can help avoid being blocked by some websites
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
+ERROR_PREFIXES = ("Could not retrieve", "An error occurred", "The webpage contained no text")
+# Pages are parsed as they stream in and cut off at MAX_PAGE_BYTES; anything
+# that is not HTML or plain text is refused before its body is downloaded.
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+TEXT_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+# Size and parse time of recently read pages, for tuning the limits above.
+PAGE_STATS = deque(maxlen=1000)
+
+# How pages are summarized (see summarization.py): 'lsa' (sumy, as before) or
+# the much cheaper 'textrank' / 'centroid', over at most SUMMARY_MAX_SENTENCES
+# sentences. scripts/benchmark_summarizer.py compares them.
+SUMMARIZER = os.environ.get('ENRICHMENT_SUMMARIZER', 'lsa')
+SUMMARY_MAX_SENTENCES = MAX_SENTENCES
+
+# Searches and page text are cached on disk (see enrichment_cache.py); set
+# ENRICHMENT_CACHE_DB to another file to move it, or to '' to turn it off.
+ENRICHMENT_CACHE_DB = os.environ.get('ENRICHMENT_CACHE_DB', DEFAULT_PATH)
+
+_session = None
+_session_lock = threading.Lock()
+_cache = None
+
+
+# --- Step 3: Your functions remain mostly the same, as they are correct ---
+
+def _clues_from_doc(doc):
     keywords = []
     for chunk in doc.noun_chunks:
         keywords.append(chunk.text)
     for ent in doc.ents:
         if ent.label_ in ["GPE", "ORG"]:
             keywords.append(ent.text)
-    return " ".join(list(set(keywords)))
+    # Deduplicated in first-seen order, so the same description always gives
+    # the same query (and hits the search cache).
+    return " ".join(dict.fromkeys(keywords))
+
+def find_clues(description):
+    """This function takes a description and pulls out the important keywords."""
+    return _clues_from_doc(get_nlp()(description))
+
+def iter_clues(descriptions, n_process=1, batch_size=64):
+    """Lazily yields find_clues for each description, in order.
+
+    Runs spaCy's batched `nlp.pipe`, optionally across `n_process` worker
+    processes, which is far cheaper per description than calling find_clues
+    in a loop. `descriptions` may be any iterable, including a generator.
+    """
+    for doc in get_nlp().pipe(descriptions, n_process=n_process, batch_size=batch_size):
+        yield _clues_from_doc(doc)
+
+def find_clues_many(descriptions, n_process=1, batch_size=64):
+    """find_clues for many descriptions at once, returning the queries in order."""
+    return list(iter_clues(descriptions, n_process, batch_size))
 
 def perform_search(query):
     """This function takes a query and returns the top 5 Google search result links."""
     print(f"Searching Google for: '{query}'")
     try:
         links = []
-        for link in search(query, tld="co.in", num=5, stop=5, pause=2, lang='en'):
+        for link in search(query, tld="co.in", num=SEARCH_RESULTS, stop=SEARCH_RESULTS, pause=2, lang='en'):
             links.append(link)
         return links
     except Exception as e:
         print(f"An error occurred during Google search: {e}")
         return []
 
-def read_webpage(url):
-    """This function visits a URL and scrapes all its text."""
+
+# --- Step 4: Fetching pages concurrently ---
+# All links from the search are fetched at once over one pooled session, so
+# enrichment takes as long as the slowest useful page rather than the sum of
+# all of them. Each page has its own time budget and the whole fetch has an
+# overall deadline; pages still downloading when it passes are dropped.
+
+def make_session(concurrent_fetches=SEARCH_RESULTS):
+    """A requests session keeping connections alive per host, for up to
+    `concurrent_fetches` pages downloading at once."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrent_fetches, pool_maxsize=concurrent_fetches)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+def get_session():
+    """The session shared by all fetches of one enrichment at a time.
+
+    Callers fetching for several descriptions at once (scripts/enrich_backlog.py)
+    should size their own with make_session.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = make_session()
+    return _session
+
+
+def get_cache():
+    """The shared on-disk enrichment cache, or None if it is turned off."""
+    global _cache
+    if _cache is None and ENRICHMENT_CACHE_DB:
+        _cache = EnrichmentCache(ENRICHMENT_CACHE_DB)
+    return _cache
+
+
+def is_error(text):
+    return text.startswith(ERROR_PREFIXES)
+
+
+def _iter_body(response, chunk_size=64 * 1024):
+    """Yields the response body as it arrives rather than in full-size chunks."""
+    read1 = getattr(response.raw, 'read1', None)  # urllib3 >= 2
+    if read1 is None:
+        yield from response.iter_content(chunk_size=16 * 1024)
+        return
+    while True:
+        chunk = read1(chunk_size, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_webpage(url, session=None, timeout=PAGE_TIMEOUT, cache=None, max_bytes=MAX_PAGE_BYTES):
+    """This function visits a URL and scrapes all its text.
+
+    The body is streamed into an incremental parser (see page_extractor.py)
+    and cut off after `max_bytes`. A page that is still trickling in once
+    `timeout` seconds have passed is abandoned, not just one that stalls.
+    With a cache, fresh pages are served from it and stale ones revalidated
+    with a conditional GET; only successfully read pages are stored.
+    """
+    cached = cache.get_page(url) if cache else None
+    if cached is not None and cached.fresh:
+        return cached.text
     print(f"\nReading content from: {url}")
+    session = session or get_session()
+    deadline = time.monotonic() + timeout
+    headers = cached.revalidation_headers() if cached is not None else None
     try:
-        # Adding a user-agent header can help avoid being blocked by some websites
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
-        response = requests.get(url, timeout=10, headers=headers)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            text = soup.get_text(separator=' ', strip=True)
-            return text
-        else:
-            return f"Could not retrieve the webpage. Status code: {response.status_code}"
+        with session.get(url, timeout=timeout, stream=True, headers=headers) as response:
+            if response.status_code == 304 and cached is not None:
+                cache.refresh_page(url)
+                return cached.text
+            if response.status_code != 200:
+                return f"Could not retrieve the webpage. Status code: {response.status_code}"
+            content_type = response.headers.get('Content-Type', '')
+            mime_type = content_type.split(';')[0].strip().lower()
+            if mime_type and mime_type not in TEXT_CONTENT_TYPES:
+                return f"Could not retrieve the webpage. Unsupported content type: {mime_type}"
+            validators = response.headers.get('ETag'), response.headers.get('Last-Modified')
+            extractor = PageExtractor(content_type)
+            received = 0
+            for chunk in _iter_body(response):
+                if not received and b'\x00' in chunk[:1024]:
+                    return "Could not retrieve the webpage. The response is binary, not text."
+                chunk = chunk[:max_bytes - received]
+                received += len(chunk)
+                extractor.feed(chunk)
+                if received >= max_bytes:
+                    break
+                if time.monotonic() > deadline:
+                    return f"Could not retrieve the webpage. Timed out after {timeout}s"
+        text = extractor.close()
+        PAGE_STATS.append({
+            'url': url,
+            'bytes': received,
+            'truncated': received >= max_bytes,
+            'text_chars': len(text),
+            'parse_ms': extractor.parse_seconds * 1000,
+        })
+        print(f"Read {url}: {received} bytes{' (truncated)' if received >= max_bytes else ''}, "
+              f"{len(text)} chars of text, parsed in {extractor.parse_seconds * 1000:.1f} ms")
+        if cache:
+            cache.set_page(url, text, *validators)
+        return text
     except Exception as e:
         return f"An error occurred while reading the webpage: {e}"
 
-def summarize_text(full_text, num_sentences=3):
+
+def summarize_text(full_text, num_sentences=3, method=None):
     """This function takes a long text and summarizes it."""
     # --- Improvement: Check if there's any text to summarize ---
     if not full_text or full_text.isspace():
         return "The webpage contained no text to summarize."
         
     print("\nSummarizing the text...")
-    parser = PlaintextParser.from_string(full_text, Tokenizer("english"))
-    summarizer = LsaSummarizer()
-    summary_sentences = summarizer(parser.document, num_sentences)
-    summary = " ".join([str(sentence) for sentence in summary_sentences])
-    return summary
+    return summarize(full_text, num_sentences, method or SUMMARIZER, SUMMARY_MAX_SENTENCES, get_tokenizer())
+
+
+def fetch_pages(links, session=None, page_timeout=PAGE_TIMEOUT, deadline=ENRICHMENT_DEADLINE, cache=None):
+    """Fetches every link concurrently.
+
+    Returns {url: page text or error message} for the pages that finished
+    before the deadline.
+    """
+    session = session or get_session()
+    results = {}
+    fetch_pool = ThreadPoolExecutor(max_workers=max(len(links), 1), thread_name_prefix='fetch')
+    try:
+        pages = {fetch_pool.submit(read_webpage, url, session, page_timeout, cache): url for url in links}
+        for page in as_completed(pages, timeout=deadline):
+            results[pages[page]] = page.result()
+    except FuturesTimeout:
+        slow = [pages[page] for page in pages if not page.done()]
+        print(f"Enrichment deadline of {deadline}s reached; skipping {len(slow)} slow page(s).")
+    finally:
+        fetch_pool.shutdown(wait=False, cancel_futures=True)
+    return results
 
-def get_web_enrichment(description):
-    """The main function that runs the whole detective process."""
+
+def fetch_and_summarize(links, session=None, page_timeout=PAGE_TIMEOUT, deadline=ENRICHMENT_DEADLINE, cache=None):
+    """Fetches every link concurrently and summarizes each page as soon as it arrives.
+
+    Returns {url: summary or error message} for the pages that were fetched
+    and summarized before the deadline.
+    """
+    session = session or get_session()
+    results = {}
+    end = time.monotonic() + deadline
+    fetch_pool = ThreadPoolExecutor(max_workers=max(len(links), 1), thread_name_prefix='fetch')
+    summarize_pool = ThreadPoolExecutor(max_workers=max(len(links), 1), thread_name_prefix='summarize')
+    try:
+        pages = {fetch_pool.submit(read_webpage, url, session, page_timeout, cache): url for url in links}
+        summaries = {}
+        try:
+            for page in as_completed(pages, timeout=deadline):
+                url, text = pages[page], page.result()
+                if is_error(text):
+                    results[url] = text
+                else:
+                    summaries[summarize_pool.submit(summarize_text, text)] = url
+        except FuturesTimeout:
+            slow = [pages[page] for page in pages if not page.done()]
+            print(f"Enrichment deadline of {deadline}s reached; skipping {len(slow)} slow page(s).")
+        try:
+            for summary in as_completed(summaries, timeout=max(end - time.monotonic(), 0)):
+                try:
+                    results[summaries[summary]] = summary.result()
+                except Exception as e:
+                    results[summaries[summary]] = f"An error occurred while summarizing the webpage: {e}"
+        except FuturesTimeout:
+            slow = [summaries[summary] for summary in summaries if not summary.done()]
+            print(f"Enrichment deadline of {deadline}s reached; skipping {len(slow)} page(s) still being summarized.")
+    finally:
+        # Threads still fetching give up on their own once their page timeout passes;
+        # a summary already running finishes in the background and is discarded.
+        fetch_pool.shutdown(wait=False, cancel_futures=True)
+        summarize_pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def merge_summaries(links, results):
+    """Joins the page summaries in search-rank order, dropping repeated sentences."""
+    from sumy.parsers.plaintext import PlaintextParser
+    seen, merged = set(), []
+    for url in links:
+        summary = results.get(url)
+        if summary is None or is_error(summary):
+            continue
+        for sentence in PlaintextParser.from_string(summary, get_tokenizer()).document.sentences:
+            sentence = str(sentence)
+            if sentence not in seen:
+                seen.add(sentence)
+                merged.append(sentence)
+    return " ".join(merged)
+
+
+def combine_results(links, results, deadline=ENRICHMENT_DEADLINE):
+    """The merged summary, or if no page was usable, what went wrong with the top-ranked one."""
+    summary = merge_summaries(links, results)
+    if summary:
+        return summary
+    for url in links:
+        if url in results:
+            return results[url]
+    return f"Could not retrieve any webpage within {deadline}s."
+
+
+def search_cached(query, search_fn=None, cache=None):
+    """Links for query, from the cache if possible. Empty results are not cached."""
+    links = cache.get_links(query) if cache else None
+    if links is None:
+        links = (search_fn or perform_search)(query)
+        if cache and links:
+            cache.set_links(query, links)
+    return links
+
+
+def get_web_enrichment(description, search_fn=None, session=None, page_timeout=PAGE_TIMEOUT,
+                       deadline=ENRICHMENT_DEADLINE, cache=None):
+    """The main function that runs the whole detective process.
+
+    `search_fn` (query -> list of links) and `session` default to Google and
+    the shared pooled session; pass stand-ins to run against local servers.
+    `cache` defaults to the shared enrichment cache; pass False to bypass it.
+    """
+    cache = get_cache() if cache is None else cache
     print("--- Starting Web Enrichment Process ---")
     query = find_clues(description)
     if not query:
         return "Could not find specific keywords to search."
         
-    links = perform_search(query)
+    links = search_cached(query, search_fn, cache)
     if not links:
         return "No relevant web pages found for the keywords."
         
-    text = read_webpage(links[0])
+    results = fetch_and_summarize(links, session, page_timeout, deadline, cache)
     # --- Improvement: Better checking of the scraped text before summarizing ---
-    if text.startswith("Could not retrieve") or text.startswith("An error occurred") or text.startswith("The webpage contained no text"):
-        return text # Return the error message directly
-        
-    summary = summarize_text(text)
+    summary = combine_results(links, results, deadline)
     print("--- Web Enrichment Process Finished ---")
     return summary
 
@@ -106,4 +386,6 @@ if __name__ == '__main__':
     print("\n--------------------------------")
     print(f"ENRICHMENT FOR CAMPAIGN: {campaign}")
     print(f"GENERATED INFO: {final_result}")
-    print("--------------------------------")
\ No newline at end of file
+    print("--------------------------------")
+    if get_cache():
+        print(f"CACHE: {get_cache().stats()}")
\ No newline at end of file
@@ -0,0 +1,232 @@
+# benchmark_model.py
+#
+# Reproducible performance numbers for the campaign classifier: cold-start
+# load time, single-item latency percentiles, batch throughput, the cost of
+# text cleaning, the HTTP endpoints and peak memory. Results are written as
+# JSON, one entry per model, so runs can be diffed across model versions:
+#
+#   python benchmark_model.py --model ../models/best_model.pkl --model ../models/best_model \
+#       --output results.json
+#   python benchmark_model.py --baseline results.json   # compare against an earlier run
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource  # Unix only; used for peak RSS
+except ImportError:
+    resource = None
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+sys.path.insert(0, APP_DIR)
+from model_registry import LoadedModel, file_version, load_model
+from preprocessing import default_cleaner
+from generate_dataset import generate_frame
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
+TEST_DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'test_dataset.csv')
+
+# Runs in a fresh interpreter so imports are not already warm.
+COLD_START_CODE = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {app_dir!r})
+from model_registry import LoadedModel, load_model
+model = LoadedModel(load_model({path!r}), {path!r}, None)
+loaded = time.perf_counter()
+model.pipeline.predict(model.prepare(["Help us fund life-saving surgery for my father."]))
+first = time.perf_counter()
+try:
+    import resource
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform == 'darwin' else 1)
+except ImportError:
+    peak_kb = None
+print(json.dumps({{'load_s': loaded - start, 'first_prediction_s': first - start, 'peak_rss_mb': peak_kb and peak_kb / 1024}}))
+"""
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform == 'darwin' else 1) / 1024
+
+
+def percentiles(samples_s):
+    ms = np.asarray(samples_s) * 1000
+    return {'p50_ms': float(np.percentile(ms, 50)), 'p90_ms': float(np.percentile(ms, 90)),
+            'p99_ms': float(np.percentile(ms, 99)), 'mean_ms': float(ms.mean())}
+
+
+def bench_cold_start(path, repeats):
+    runs = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', COLD_START_CODE.format(app_dir=APP_DIR, path=path)],
+                             capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {key: float(np.median([r[key] for r in runs])) if runs[0][key] is not None else None for key in runs[0]}
+
+
+def bench_single(model, texts, n):
+    samples = []
+    for text in texts[:n]:
+        start = time.perf_counter()
+        model.pipeline.predict(model.prepare([text]))
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def bench_batches(model, texts, sizes, min_seconds):
+    results = {}
+    for size in sizes:
+        batch = texts[:size]
+        runs, elapsed = 0, 0.0
+        while elapsed < min_seconds or runs < 3:
+            start = time.perf_counter()
+            model.pipeline.decision_function(model.prepare(batch))
+            elapsed += time.perf_counter() - start
+            runs += 1
+        results[str(size)] = {'items_per_s': size * runs / elapsed, 'batch_ms': elapsed / runs * 1000}
+    return results
+
+
+def bench_cleaning(texts):
+    cleaner = default_cleaner()
+    samples = []
+    for text in texts:
+        start = time.perf_counter()
+        cleaner.clean_text(text)
+        samples.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    cleaner.clean_batch(texts)
+    batch_s = time.perf_counter() - start
+    return {'per_row_us': float(np.mean(samples) * 1e6), 'batch_rows_per_s': len(texts) / batch_s}
+
+
+def bench_http(path, texts, n, batch_size):
+    """Drives the Flask app in-process (no network) to measure endpoint overhead."""
+    os.environ['MODEL_PATH'] = path
+    os.environ['MODEL_WATCH_INTERVAL'] = '0'
+    import app as app_module
+    if app_module.registry.current is None or app_module.registry.current.path != path:
+        app_module.registry.load(path)
+    client = app_module.app.test_client()
+
+    def timed_posts(payloads):
+        samples = []
+        for payload in payloads:
+            start = time.perf_counter()
+            client.post('/predict', json={'description': payload}).get_data()
+            samples.append(time.perf_counter() - start)
+        return percentiles(samples)
+
+    app_module.PREDICTION_CACHE.clear()
+    unique = [f"{text} #{i}" for i, text in enumerate(texts[:n])]  # never repeats, so always a cache miss
+    results = {'predict_miss': timed_posts(unique), 'predict_hit': timed_posts([unique[0]] * n)}
+    body = {'descriptions': texts[:batch_size]}
+    start = time.perf_counter()
+    client.post('/predict/batch', json=body).get_data()
+    results['batch'] = {'size': batch_size, 'items_per_s': batch_size / (time.perf_counter() - start)}
+    return results
+
+
+def run(args):
+    test_texts = pd.read_csv(args.test_data)['description'].astype(str).tolist()
+    synthetic = generate_frame(max(args.batch_sizes), seed=args.seed)['description'].tolist()
+    results = []
+    for path in args.model:
+        print(f"⏱️ Benchmarking {path}...", file=sys.stderr)
+        model = LoadedModel(load_model(path), path, file_version(path))
+        entry = {
+            'model': path,
+            'version': model.version,
+            'cold_start': bench_cold_start(path, args.cold_repeats),
+            'single_latency_test_set': bench_single(model, test_texts, args.single_n),
+            'single_latency_synthetic': bench_single(model, synthetic, args.single_n),
+            'batch_throughput': bench_batches(model, synthetic, args.batch_sizes, args.min_seconds),
+        }
+        if args.http:
+            entry['http'] = bench_http(path, test_texts, args.single_n, min(max(args.batch_sizes), 1000))
+        results.append(entry)
+
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': args.seed,
+        'clean_text': bench_cleaning(test_texts),
+        'models': results,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+# Metrics compared by --baseline, and whether bigger is better.
+KEY_METRICS = [
+    (('cold_start', 'load_s'), False),
+    (('single_latency_test_set', 'p50_ms'), False),
+    (('single_latency_test_set', 'p99_ms'), False),
+]
+
+
+def compare(current, baseline):
+    """Prints current vs baseline for models with matching paths."""
+    old_by_model = {m['model']: m for m in baseline['models']}
+    for entry in current['models']:
+        old = old_by_model.get(entry['model'])
+        if old is None:
+            continue
+        print(f"\n{entry['model']} ({old['version']} -> {entry['version']})")
+        metrics = list(KEY_METRICS) + [(('batch_throughput', size, 'items_per_s'), True) for size in entry['batch_throughput']]
+        for keys, higher_is_better in metrics:
+            try:
+                new_value, old_value = entry, old
+                for key in keys:
+                    new_value, old_value = new_value[key], old_value[key]
+            except KeyError:
+                continue
+            change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+            worse = change < 0 if higher_is_better else change > 0
+            flag = '⚠️' if worse and abs(change) > 10 else '  '
+            print(f"  {flag} {'.'.join(keys):<45} {old_value:12.3f} -> {new_value:12.3f} ({change:+.1f}%)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the campaign classifier.")
+    parser.add_argument('--model', action='append',
+                        help="Model file or compact directory; repeat to benchmark several versions. "
+                             "Default: models/best_model.pkl.")
+    parser.add_argument('--test-data', default=TEST_DATA_PATH)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 16, 128, 1024, 8192])
+    parser.add_argument('--single-n', type=int, default=500, help="Requests for the latency percentiles.")
+    parser.add_argument('--cold-repeats', type=int, default=3, help="Fresh-process loads (median is reported).")
+    parser.add_argument('--min-seconds', type=float, default=1.0, help="Minimum time spent per batch size.")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for the synthetic data.")
+    parser.add_argument('--http', action='store_true', help="Also measure /predict and /predict/batch.")
+    parser.add_argument('--output', help="Write the JSON results here (default: stdout).")
+    parser.add_argument('--baseline', help="Earlier results JSON to compare against.")
+    args = parser.parse_args()
+    args.model = args.model or [os.path.join(MODELS_DIR, 'best_model.pkl')]
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    current = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"✅ Results written to: {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(current, indent=2))
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(current, json.load(f))
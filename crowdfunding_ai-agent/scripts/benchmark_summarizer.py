@@ -0,0 +1,162 @@
+# benchmark_summarizer.py
+#
+# Compares the page summarizers in app/summarization.py against what
+# web_enricher always did (sumy LSA over every sentence of the page), on a
+# fixed corpus of saved pages: latency per page, and how much of the LSA
+# summary each method reproduces.
+#
+#   python benchmark_summarizer.py --pages saved_pages/
+#   python benchmark_summarizer.py --from-cache --save saved_pages/   # freeze cached pages as a corpus
+#
+# Pages are .html/.htm files (text extracted as web_enricher does) or .txt
+# files with the extracted text.
+
+import argparse
+import glob
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+from enrichment_cache import DEFAULT_PATH
+from page_extractor import extract_text
+from summarization import METHODS, summarize
+from web_enricher import get_tokenizer
+
+_WORD_RE = re.compile(r"[^\W\d_]+")
+
+
+# --- 1. The corpus ---
+
+def load_pages(directory):
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(directory, '*'))):
+        name = os.path.basename(path)
+        if name.endswith(('.html', '.htm')):
+            with open(path, 'rb') as f:
+                pages[name] = extract_text(f.read())
+        elif name.endswith('.txt'):
+            with open(path, encoding='utf-8') as f:
+                pages[name] = f.read()
+    return pages
+
+
+def load_cached_pages(db_path):
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT url, text FROM pages ORDER BY url").fetchall()
+    return {f"page{i:04d}.txt": text for i, (url, text) in enumerate(rows)}
+
+
+def save_pages(pages, directory):
+    os.makedirs(directory, exist_ok=True)
+    for name, text in pages.items():
+        with open(os.path.join(directory, os.path.splitext(name)[0] + '.txt'), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+# --- 2. Measurements ---
+
+def time_summary(text, method, max_sentences, num_sentences, repeats, tokenizer):
+    best, summary = float('inf'), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        summary = summarize(text, num_sentences, method, max_sentences, tokenizer)
+        best = min(best, time.perf_counter() - start)
+    return summary, best
+
+
+def sentence_overlap(summary, reference, tokenizer):
+    """Share of the reference summary's sentences that the summary also picked."""
+    ours, theirs = set(tokenizer.to_sentences(summary)), set(tokenizer.to_sentences(reference))
+    return len(ours & theirs) / len(theirs) if theirs else 1.0
+
+
+def word_recall(summary, reference):
+    """ROUGE-1 recall: share of the reference summary's words found in the summary."""
+    ours = set(_WORD_RE.findall(summary.lower()))
+    theirs = set(_WORD_RE.findall(reference.lower()))
+    return len(ours & theirs) / len(theirs) if theirs else 1.0
+
+
+def run(args, pages):
+    tokenizer = get_tokenizer()
+    sentence_counts = {name: len(tokenizer.to_sentences(text)) for name, text in pages.items()}
+    print(f"📚 {len(pages)} pages, {sum(sentence_counts.values())} sentences "
+          f"(median {np.median(list(sentence_counts.values())):.0f}, max {max(sentence_counts.values())})")
+
+    # The reference: LSA over the whole page, as web_enricher used to run it.
+    reference, reference_s = {}, {}
+    for name, text in pages.items():
+        reference[name], reference_s[name] = time_summary(text, 'lsa', None, args.num_sentences, 1, tokenizer)
+
+    results = {'pages': len(pages), 'reference': {'method': 'lsa', 'max_sentences': None,
+                                                  'total_s': sum(reference_s.values())}, 'methods': []}
+    for method in args.methods:
+        for max_sentences in args.max_sentences:
+            latencies, overlaps, recalls = [], [], []
+            for name, text in pages.items():
+                summary, seconds = time_summary(text, method, max_sentences, args.num_sentences,
+                                                args.repeats, tokenizer)
+                latencies.append(seconds)
+                overlaps.append(sentence_overlap(summary, reference[name], tokenizer))
+                recalls.append(word_recall(summary, reference[name]))
+            latencies_ms = np.array(latencies) * 1000
+            results['methods'].append({
+                'method': method,
+                'max_sentences': max_sentences,
+                'mean_ms': float(latencies_ms.mean()),
+                'p95_ms': float(np.percentile(latencies_ms, 95)),
+                'max_ms': float(latencies_ms.max()),
+                'speedup': sum(reference_s.values()) / sum(latencies) if sum(latencies) else float('inf'),
+                'sentence_overlap': float(np.mean(overlaps)),
+                'word_recall': float(np.mean(recalls)),
+            })
+
+    reference_ms = np.array(list(reference_s.values())) * 1000
+    print(f"\nReference (lsa, all sentences): mean {reference_ms.mean():.1f} ms, "
+          f"p95 {np.percentile(reference_ms, 95):.1f} ms, max {reference_ms.max():.1f} ms")
+    print(f"{'method':<10} {'cap':>5} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9} {'speedup':>8} "
+          f"{'sent. overlap':>14} {'word recall':>12}")
+    for r in results['methods']:
+        print(f"{r['method']:<10} {r['max_sentences'] or '-':>5} {r['mean_ms']:>9.1f} {r['p95_ms']:>9.1f} "
+              f"{r['max_ms']:>9.1f} {r['speedup']:>7.1f}x {r['sentence_overlap']:>14.2f} {r['word_recall']:>12.2f}")
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark page summarizers against sumy LSA.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--pages', help="Directory of saved .html/.htm/.txt pages.")
+    source.add_argument('--from-cache', nargs='?', const=DEFAULT_PATH, metavar='DB',
+                        help="Use the pages stored in the enrichment cache.")
+    parser.add_argument('--save', help="Also write the corpus as .txt files here, to rerun on later.")
+    parser.add_argument('--methods', nargs='+', choices=METHODS, default=list(METHODS))
+    parser.add_argument('--max-sentences', type=int, nargs='+', default=[100, 200],
+                        help="Sentence caps to try (0 means no cap).")
+    parser.add_argument('--num-sentences', type=int, default=3, help="Sentences per summary.")
+    parser.add_argument('--repeats', type=int, default=3, help="Timing runs per page (fastest is kept).")
+    parser.add_argument('--output', help="Write the results as JSON here.")
+    args = parser.parse_args()
+    args.max_sentences = [n or None for n in args.max_sentences]
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    pages = load_pages(args.pages) if args.pages else load_cached_pages(args.from_cache)
+    pages = {name: text for name, text in pages.items() if text.strip()}
+    if not pages:
+        sys.exit("No pages to summarize.")
+    if args.save:
+        save_pages(pages, args.save)
+        print(f"💾 Corpus saved to: {args.save}")
+    results = run(args, pages)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to: {args.output}")
@@ -0,0 +1,273 @@
+# enrich_backlog.py
+#
+# Runs web enrichment over a whole backlog of campaigns as a staged pipeline:
+#
+#   clues (spaCy, batched) -> search -> fetch -> summarize -> results file
+#
+# Every stage has its own worker pool and hands work on through a bounded
+# queue, so a slow stage holds the ones before it back instead of letting
+# work pile up in memory. Each finished campaign is appended to the output
+# JSONL file straight away; rerunning with the same output file skips those
+# campaigns, and the enrichment cache (see app/enrichment_cache.py) saves the
+# searches and pages of campaigns that were only half done.
+#
+#   python enrich_backlog.py campaigns.csv --output enrichment.jsonl
+#   python enrich_backlog.py getCampaigns.json --fetch-workers 16
+#
+# Input is a CSV with a 'description' column (and optionally 'id'), a JSON
+# or JSONL dump of getCampaigns() (Campaign structs as objects or as
+# [owner, title, description, ...] arrays), or a text file with one
+# description per line. Campaign ids default to the position in the input,
+# which for getCampaigns() is the on-chain campaign id.
+
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+import web_enricher
+from summarization import METHODS
+
+_DONE = object()  # end-of-stream marker passed down the queues
+
+
+# --- 1. Reading the backlog ---
+
+def _campaign_from_json(index, item):
+    if isinstance(item, list):  # a Campaign struct as returned by web3
+        return {'id': index, 'title': item[1], 'description': item[2]}
+    return {'id': item.get('id', index), 'title': item.get('title'), 'description': item.get('description')}
+
+
+def read_campaigns(path):
+    """Returns the campaigns in path as dicts with id, title and description."""
+    if path.endswith('.csv'):
+        df = pd.read_csv(path)
+        ids = df['id'] if 'id' in df else range(len(df))
+        titles = df['title'] if 'title' in df else [None] * len(df)
+        return [{'id': int(i), 'title': None if pd.isna(t) else t, 'description': str(d)}
+                for i, t, d in zip(ids, titles, df['description'])]
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.json'):
+            items = json.load(f)
+        elif path.endswith('.jsonl'):
+            items = [json.loads(line) for line in f if line.strip()]
+        else:
+            return [{'id': i, 'title': None, 'description': line.strip()}
+                    for i, line in enumerate(f) if line.strip()]
+    return [_campaign_from_json(i, item) for i, item in enumerate(items)]
+
+
+def completed_ids(output_path, retry_errors=False):
+    """Ids already in the output file; a line cut short by a crash is ignored.
+
+    With retry_errors, campaigns that ended in an error count as not done.
+    """
+    done = set()
+    if os.path.exists(output_path):
+        with open(output_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if 'id' in record and not (retry_errors and record.get('error')):
+                    done.add(record['id'])
+    return done
+
+
+# --- 2. Pipeline stages ---
+
+class Stage:
+    """A pool of worker threads applying `func` to items from `inbox`.
+
+    `func(item)` returns the item to pass on (to `outbox`, or to `finished`
+    when the campaign is already done, e.g. no keywords were found).
+    """
+
+    def __init__(self, name, func, workers, inbox, outbox, finished):
+        self.name = name
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.finished = finished
+        self.items = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True)
+                         for i in range(workers)]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        threading.Thread(target=self._close_when_done, daemon=True).start()
+
+    def _work(self):
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                self.inbox.put(_DONE)  # let the other workers see it too
+                return
+            start = time.perf_counter()
+            try:
+                item = self.func(item)
+            except Exception as e:
+                item['error'] = f"An error occurred in the {self.name} stage: {e}"
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.items += 1
+                self.busy_seconds += elapsed
+            (self.finished if 'error' in item or 'summary' in item else self.outbox).put(item)
+
+    def _close_when_done(self):
+        for thread in self._threads:
+            thread.join()
+        self.outbox.put(_DONE)
+
+    def report(self, wall_seconds):
+        workers = len(self._threads)
+        per_item = self.busy_seconds / self.items * 1000 if self.items else 0.0
+        utilization = self.busy_seconds / (wall_seconds * workers) if wall_seconds else 0.0
+        return (f"{self.name:<10} {workers:>3} workers {self.items:>7} items "
+                f"{self.items / wall_seconds if wall_seconds else 0:>8.2f}/s "
+                f"{per_item:>9.1f} ms/item {utilization:>6.0%} busy")
+
+
+def search_stage(args, cache):
+    def run(item):
+        item['links'] = web_enricher.search_cached(item['query'], cache=cache)
+        if not item['links']:
+            item['error'] = "No relevant web pages found for the keywords."
+        return item
+    return run
+
+
+def fetch_stage(args, cache):
+    # Every fetch worker downloads a campaign's links at once, all over this session.
+    session = web_enricher.make_session(args.fetch_workers * web_enricher.SEARCH_RESULTS)
+
+    def run(item):
+        item['pages'] = web_enricher.fetch_pages(item['links'], session, args.page_timeout, args.deadline, cache)
+        return item
+    return run
+
+
+def summarize_stage(args):
+    def run(item):
+        results = {url: text if web_enricher.is_error(text) else web_enricher.summarize_text(text, method=args.summarizer)
+                   for url, text in item.pop('pages').items()}
+        summary = web_enricher.combine_results(item['links'], results, args.deadline)
+        item['error' if web_enricher.is_error(summary) else 'summary'] = summary
+        return item
+    return run
+
+
+# --- 3. Running the pipeline ---
+
+def feed_clues(campaigns, args, outbox, finished, stats):
+    """First stage: batched keyword extraction, fed lazily into the search queue."""
+    clues = web_enricher.iter_clues((c['description'] for c in campaigns), args.nlp_processes, args.nlp_batch_size)
+    try:
+        for campaign in campaigns:
+            began = time.perf_counter()
+            campaign['query'] = next(clues)
+            stats['busy_seconds'] += time.perf_counter() - began
+            stats['items'] += 1
+            if campaign['query']:
+                outbox.put(campaign)
+            else:
+                campaign['error'] = "Could not find specific keywords to search."
+                finished.put(campaign)
+    finally:
+        # Even if spaCy fails, close the pipeline so the run ends (the rest
+        # of the campaigns are simply left for the next run).
+        outbox.put(_DONE)
+
+
+def run(args):
+    campaigns = read_campaigns(args.input)
+    done = completed_ids(args.output, args.retry_errors)
+    pending = [c for c in campaigns if c['id'] not in done]
+    if args.limit:
+        pending = pending[:args.limit]
+    print(f"📋 {len(campaigns)} campaigns, {len(done)} already enriched, {len(pending)} to do.")
+    if not pending:
+        return
+
+    cache = web_enricher.get_cache() or False
+    to_search, to_fetch, to_summarize, finished = (queue.Queue(maxsize=args.queue_size) for _ in range(4))
+    stages = [
+        Stage('search', search_stage(args, cache), args.search_workers, to_search, to_fetch, finished),
+        Stage('fetch', fetch_stage(args, cache), args.fetch_workers, to_fetch, to_summarize, finished),
+        Stage('summarize', summarize_stage(args), args.summarize_workers, to_summarize, finished, finished),
+    ]
+    clue_stats = {'items': 0, 'busy_seconds': 0.0}
+    start = time.perf_counter()
+    feeder = threading.Thread(target=feed_clues, args=(pending, args, to_search, finished, clue_stats), daemon=True)
+    feeder.start()
+    for stage in stages:
+        stage.start()
+
+    # The last stage's end marker arrives after everything before it has
+    # drained, since each stage only closes once its inbox is exhausted.
+    written, errors, last_progress = 0, 0, time.perf_counter()
+    with open(args.output, 'a', encoding='utf-8') as out:
+        while True:
+            item = finished.get()
+            if item is _DONE:
+                break
+            record = {key: item.get(key) for key in ('id', 'title', 'query', 'links', 'summary', 'error')}
+            out.write(json.dumps(record) + '\n')
+            out.flush()  # the checkpoint: this campaign will not be redone
+            written += 1
+            errors += 'error' in item
+            if time.perf_counter() - last_progress >= args.progress_every:
+                last_progress = time.perf_counter()
+                print(f"⏳ {written}/{len(pending)} done | queued: search {to_search.qsize()}, "
+                      f"fetch {to_fetch.qsize()}, summarize {to_summarize.qsize()}")
+    wall = time.perf_counter() - start
+
+    print(f"\n✅ Enriched {written} campaigns in {wall:.1f}s ({written - errors} summaries, {errors} errors).")
+    print(f"Results appended to: {args.output}")
+    print("\n--- Stage throughput ---")
+    clue_rate = clue_stats['items'] / wall if wall else 0.0
+    clue_ms = clue_stats['busy_seconds'] / clue_stats['items'] * 1000 if clue_stats['items'] else 0.0
+    print(f"{'clues':<10} {args.nlp_processes:>3} procs   {clue_stats['items']:>7} items "
+          f"{clue_rate:>8.2f}/s {clue_ms:>9.1f} ms/item")
+    for stage in stages:
+        print(stage.report(wall))
+    cache = web_enricher.get_cache()
+    if cache:
+        stats = cache.stats()
+        print(f"Cache: search hit rate {stats['search_hit_rate']:.0%}, page hit rate {stats['page_hit_rate']:.0%}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Enrich a backlog of campaigns with web search summaries.")
+    parser.add_argument('input', help="CSV, JSON/JSONL (getCampaigns output) or text file of descriptions.")
+    parser.add_argument('--output', default='enrichment.jsonl', help="JSONL results; also the resume checkpoint.")
+    parser.add_argument('--limit', type=int, help="Only enrich this many pending campaigns.")
+    parser.add_argument('--retry-errors', action='store_true', help="Redo campaigns that previously failed.")
+    parser.add_argument('--nlp-processes', type=int, default=1, help="Processes for spaCy's nlp.pipe.")
+    parser.add_argument('--nlp-batch-size', type=int, default=64)
+    parser.add_argument('--search-workers', type=int, default=2,
+                        help="Concurrent searches; keep low, Google rate-limits aggressively.")
+    parser.add_argument('--fetch-workers', type=int, default=8, help="Campaigns whose pages are fetched at once.")
+    parser.add_argument('--summarize-workers', type=int, default=4)
+    parser.add_argument('--summarizer', choices=METHODS, default=web_enricher.SUMMARIZER,
+                        help="Summarization method (see benchmark_summarizer.py).")
+    parser.add_argument('--queue-size', type=int, default=32, help="Capacity of each queue between stages.")
+    parser.add_argument('--page-timeout', type=float, default=web_enricher.PAGE_TIMEOUT)
+    parser.add_argument('--deadline', type=float, default=web_enricher.ENRICHMENT_DEADLINE)
+    parser.add_argument('--progress-every', type=float, default=10.0, help="Seconds between progress lines.")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    run(parse_args())
@@ -1,8 +1,10 @@
-import csv
-import random
+import argparse
+import itertools
 import os
+from multiprocessing import Pool
 
-print("🚀 Starting Dataset Generation...")
+import numpy as np
+import pandas as pd
 
 # --- Word Banks for Realistic Variety ---
 
@@ -28,65 +30,149 @@ family_members = ["father", "mother", "sister", "brother", "daughter", "son", "a
 locations = ["Northwood", "Springfield", "Oak Creek", "the coastal region", "our city", "the local community"]
 
 
+# --- Templates ---
+# Each template is a sequence of literal text and word banks. Picking one word
+# uniformly from every bank is the same as picking one of the template's fully
+# expanded sentences uniformly, so all sentences are rendered once up front
+# and generation only has to draw integers.
+
+GENUINE_TEMPLATES = {
+    'medical': [genuine_actions, " ", medical_needs, " for my ", family_members, ", ", names, "."],
+    'community': [genuine_actions, " ", community_projects, " in ", locations, "."],
+    'education': [genuine_actions, " ", education_goals, "."],
+    'animals': [genuine_actions, " ", animal_causes, "."],
+    'tech_creative': [genuine_actions, " ", tech_creative_products, "."],
+    'disaster': ["Urgent disaster relief for ", disaster_relief, "."],
+}
+NON_GENUINE_TEMPLATES = {
+    'frivolous': [bad_actions, " ", frivolous_wants, "."],
+    'policy_violation': ["Raising money for ", against_policy_items, "."],
+    'absurd': [bad_actions, " ", absurd_goals, "."],
+    'vague': ["I am seeking donations for ", vague_reasons, "."],
+}
+
+
+def render_template(parts):
+    """Every sentence a template can produce, one per combination of its slots."""
+    banks = [[part] if isinstance(part, str) else part for part in parts]
+    return [''.join(words) for words in itertools.product(*banks)]
+
+
+def build_tables():
+    """Rendered sentences of every template, with per-template offsets and sizes."""
+    sentences, offsets, sizes = [], [], []
+    for parts in itertools.chain(GENUINE_TEMPLATES.values(), NON_GENUINE_TEMPLATES.values()):
+        rendered = render_template(parts)
+        offsets.append(len(sentences))
+        sizes.append(len(rendered))
+        sentences.extend(rendered)
+    return np.array(sentences, dtype=object), np.array(offsets), np.array(sizes)
+
+
+SENTENCES, OFFSETS, SIZES = build_tables()
+
+
 # --- Generation Logic ---
 
-def generate_row():
-    """Generates a single row (description, is_genuine)"""
-    if random.random() > 0.5:
-        # Generate a GENUINE campaign (label 1)
-        label = 1
-        category = random.choice(['medical', 'community', 'education', 'animals', 'tech_creative', 'disaster'])
-        
-        if category == 'medical':
-            desc = f"{random.choice(genuine_actions)} {random.choice(medical_needs)} for my {random.choice(family_members)}, {random.choice(names)}."
-        elif category == 'community':
-            desc = f"{random.choice(genuine_actions)} {random.choice(community_projects)} in {random.choice(locations)}."
-        elif category == 'education':
-            desc = f"{random.choice(genuine_actions)} {random.choice(education_goals)}."
-        elif category == 'animals':
-            desc = f"{random.choice(genuine_actions)} {random.choice(animal_causes)}."
-        elif category == 'tech_creative':
-            desc = f"{random.choice(genuine_actions)} {random.choice(tech_creative_products)}."
-        else: # disaster
-            desc = f"Urgent disaster relief for {random.choice(disaster_relief)}."
-
-    else:
-        # Generate a NON-GENUINE campaign (label 0)
-        label = 0
-        category = random.choice(['frivolous', 'policy_violation', 'absurd', 'vague'])
-
-        if category == 'frivolous':
-            desc = f"{random.choice(bad_actions)} {random.choice(frivolous_wants)}."
-        elif category == 'policy_violation':
-            desc = f"Raising money for {random.choice(against_policy_items)}."
-        elif category == 'absurd':
-            desc = f"{random.choice(bad_actions)} {random.choice(absurd_goals)}."
-        else: # vague
-            desc = f"I am seeking donations for {random.choice(vague_reasons)}."
-            
-    return desc, label
+def generate_frame(num_rows, seed=None):
+    """Generates num_rows rows as a DataFrame with 'description' and 'is_genuine'.
+
+    Same distribution as the original row-at-a-time generator: a fair coin
+    picks the label, then a template of that label and its words are drawn
+    uniformly. Rows are independent, so no shuffling is needed.
+    """
+    rng = np.random.default_rng(seed)
+    n_genuine = len(GENUINE_TEMPLATES)
+    is_genuine = rng.random(num_rows) > 0.5
+    template = np.where(
+        is_genuine,
+        rng.integers(0, n_genuine, num_rows),
+        n_genuine + rng.integers(0, len(NON_GENUINE_TEMPLATES), num_rows),
+    )
+    choice = rng.integers(0, SIZES[template])
+    return pd.DataFrame({
+        'description': SENTENCES[OFFSETS[template] + choice],
+        'is_genuine': is_genuine.astype(np.int8),
+    })
+
+
+def generate_chunk(task):
+    """Worker entry point: builds one chunk and, for CSV, serializes it too.
+
+    Each chunk gets its own seed derived from (seed, chunk index), so the
+    output does not depend on how many workers produced it.
+    """
+    index, num_rows, seed, fmt = task
+    frame = generate_frame(num_rows, np.random.SeedSequence(seed, spawn_key=(index,)))
+    if fmt == 'csv':
+        return frame.to_csv(header=False, index=False).encode('utf-8')
+    return frame
+
+
+def chunk_tasks(args):
+    for index, start in enumerate(range(0, args.rows, args.chunk_size)):
+        yield index, min(args.chunk_size, args.rows - start), args.seed, args.format
+
+
+def write_dataset(args):
+    """Generates chunks on a process pool and streams them to the output in order.
+
+    imap keeps only a few chunks in flight, so memory stays bounded by
+    chunk size x workers however many rows are written.
+    """
+    with Pool(args.workers) as pool:
+        chunks = pool.imap(generate_chunk, chunk_tasks(args))
+        if args.format == 'csv':
+            with open(args.output, 'wb') as f:
+                f.write(b'description,is_genuine\n')  # Write header
+                for i, data in enumerate(chunks, 1):
+                    f.write(data)
+                    print(f"   - Wrote chunk {i} ({min(i * args.chunk_size, args.rows)}/{args.rows} rows)...")
+        else:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise SystemExit("❌ Parquet output needs pyarrow: pip install pyarrow")
+            writer = None
+            try:
+                for i, frame in enumerate(chunks, 1):
+                    table = pa.Table.from_pandas(frame, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(args.output, table.schema)
+                    writer.write_table(table)
+                    print(f"   - Wrote chunk {i} ({min(i * args.chunk_size, args.rows)}/{args.rows} rows)...")
+            finally:
+                if writer is not None:
+                    writer.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate a synthetic labelled campaign dataset.")
+    parser.add_argument('--rows', type=int, default=20000, help="Number of rows to generate.")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for reproducible output.")
+    parser.add_argument('--output', default='generated_dataset_20k.csv',
+                        help="Output path. A .parquet extension selects Parquet unless --format is given.")
+    parser.add_argument('--format', choices=['csv', 'parquet'], help="Output format (default: from --output).")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Generator processes.")
+    parser.add_argument('--chunk-size', type=int, default=200000, help="Rows per chunk.")
+    args = parser.parse_args()
+    if args.format is None:
+        args.format = 'parquet' if args.output.endswith('.parquet') else 'csv'
+    if args.seed is None:
+        # Still derive per-chunk seeds from one value so chunks never collide.
+        args.seed = np.random.SeedSequence().entropy
+    return args
+
 
 # --- Main Script Execution ---
 
-NUM_ROWS = 20000
-FILENAME = 'generated_dataset_20k.csv'
-dataset = []
-
-for i in range(NUM_ROWS):
-    if (i + 1) % 1000 == 0:
-        print(f"   - Generating row {i+1}/{NUM_ROWS}...")
-    dataset.append(generate_row())
-
-# Shuffle the dataset to mix genuine and non-genuine entries
-random.shuffle(dataset)
-
-# Write to CSV
-try:
-    with open(FILENAME, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(['description', 'is_genuine']) # Write header
-        writer.writerows(dataset)
-    print(f"\n✅ Successfully generated '{FILENAME}' with {NUM_ROWS} rows.")
-    print("Please rename this file to 'dataset.csv' and move it to your 'data/' folder.")
-except Exception as e:
-    print(f"\n❌ An error occurred: {e}")
\ No newline at end of file
+if __name__ == '__main__':
+    args = parse_args()
+    print("🚀 Starting Dataset Generation...")
+    try:
+        write_dataset(args)
+        print(f"\n✅ Successfully generated '{args.output}' with {args.rows} rows.")
+        print("Please rename this file to 'dataset.csv' and move it to your 'data/' folder.")
+    except OSError as e:
+        print(f"\n❌ An error occurred: {e}")
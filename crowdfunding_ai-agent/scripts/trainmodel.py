@@ -1,54 +1,38 @@
 # In scripts/tune_and_train_best_model.py
 
+import argparse
 import pandas as pd
-import re
+import numpy as np
 import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
 import joblib
-import nltk
-from nltk.corpus import stopwords
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy.stats import loguniform
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingGridSearchCV)
+from sklearn.model_selection import train_test_split, GridSearchCV, HalvingGridSearchCV, RandomizedSearchCV
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import SGDClassifier
 from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer
 from sklearn.svm import LinearSVC
 from sklearn.metrics import classification_report
 
-# --- 1. Setup and Data Loading ---
-print("⚙️ Setting up...")
 try:
-    stopwords.words('english')
-except LookupError:
-    nltk.download('stopwords')
+    import resource  # Unix only; used for the peak-memory report
+except ImportError:
+    resource = None
 
-print("📂 Loading and preprocessing data...")
+# The cleaning code lives in app/ so the saved pipeline can unpickle it there.
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+sys.path.insert(0, APP_DIR)
+from preprocessing import clean_batch
+from compact_model import CompactModel, export_compact
 
 DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'dataset.csv')
 MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
-os.makedirs(MODELS_DIR, exist_ok=True)
-
-df = pd.read_csv(DATA_PATH)
-
-stop_words = set(stopwords.words('english'))
-def clean_text(text):
-    text = str(text).lower()
-    text = re.sub(r'[^\w\s]', '', text)
-    return ' '.join([word for word in text.split() if word not in stop_words])
-
-df['description'] = df['description'].apply(clean_text)
-
-X = df['description']
-y = df['is_genuine']
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=y, random_state=42)
-print("Data loading complete.")
-
-
-# --- 2. Hyperparameter Tuning using GridSearchCV ---
-print("\n🚀 Starting Hyperparameter Tuning for the Champion Model (SVM)...")
-
-# Create the pipeline with our chosen model type
-pipeline = Pipeline([
-    ('tfidf', TfidfVectorizer()),
-    ('clf', LinearSVC(random_state=42, dual=True, max_iter=2000)),
-])
 
 # Define the "menu" of settings to try.
 # We will tune the vectorizer's settings and the SVM's 'C' parameter.
@@ -58,29 +42,228 @@ parameters = {
     'clf__C': [0.5, 1, 1.5],                  # SVM's regularization parameter
 }
 
-# The GridSearchCV tool will automatically test all combinations.
-# cv=5 means it uses 5-fold cross-validation for reliable scoring.
-# n_jobs=-1 uses all available CPU cores to speed up the process.
-grid_search = GridSearchCV(pipeline, parameters, cv=5, n_jobs=-1, verbose=2, scoring='f1_weighted')
+# Randomized search samples C from a continuous range instead of a fixed list.
+parameter_distributions = {
+    'tfidf__ngram_range': [(1, 1), (1, 2)],
+    'tfidf__max_df': [0.9, 0.95],
+    'clf__C': loguniform(0.1, 10),
+}
+
+# Wall time of each stage, printed as a summary at the end.
+stage_times = {}
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    yield
+    stage_times[name] = time.perf_counter() - start
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Tune and train the campaign classifier.")
+    parser.add_argument('--data', default=DATA_PATH, help="Labelled CSV with 'description' and 'is_genuine' columns.")
+    parser.add_argument('--mode', choices=['tune', 'streaming'], default='tune',
+                        help="tune: in-memory TF-IDF + SVM hyperparameter search (default). "
+                             "streaming: out-of-core training for datasets that do not fit in memory.")
+
+    streaming = parser.add_argument_group('streaming mode')
+    streaming.add_argument('--chunksize', type=int, default=50000, help="Rows read from the CSV at a time.")
+    streaming.add_argument('--epochs', type=int, default=1, help="Passes over the training rows.")
+    streaming.add_argument('--hash-bits', type=int, default=20, help="Hashing vectorizer size is 2**hash-bits features.")
+    streaming.add_argument('--holdout-every', type=int, default=5,
+                           help="Every Nth row is held out for evaluation instead of trained on.")
+    streaming.add_argument('--output', default=os.path.join(MODELS_DIR, 'streaming_model.pkl'),
+                           help="Where to save the pipeline. Serve it with MODEL_PATH or /admin/reload.")
+
+    tuning = parser.add_argument_group('tune mode')
+    tuning.add_argument('--search', choices=['grid', 'halving', 'random'], default='grid',
+                        help="grid: every combination (default). halving: successive halving, "
+                             "which discards weak candidates on small samples first. random: --n-iter samples.")
+    tuning.add_argument('--n-iter', type=int, default=10, help="Candidates to sample with --search random.")
+    tuning.add_argument('--cv', type=int, default=5, help="Cross-validation folds.")
+    tuning.add_argument('--n-jobs', type=int, default=-1, help="Parallel workers (-1 = all cores).")
+    tuning.add_argument('--cache-dir', help="Keep the fitted-vectorizer cache here and reuse it across runs. "
+                                            "By default a temporary cache is used and removed afterwards.")
+    tuning.add_argument('--no-cache', action='store_true', help="Re-vectorize the text for every candidate.")
+    return parser.parse_args()
+
+
+def build_search(args, memory):
+    # Create the pipeline with our chosen model type. With `memory` set, the
+    # fitted 'clean' and 'tfidf' steps are cached on disk per fold and per
+    # vectorizer setting, so candidates that only change clf__C skip the
+    # re-tokenizing and re-vectorizing entirely. Parallel workers share it.
+    pipeline = Pipeline([
+        ('clean', FunctionTransformer(clean_batch)),
+        ('tfidf', TfidfVectorizer()),
+        ('clf', LinearSVC(random_state=42, dual=True, max_iter=2000)),
+    ], memory=memory)
+
+    # cv=5 means it uses 5-fold cross-validation for reliable scoring.
+    # n_jobs=-1 uses all available CPU cores to speed up the process.
+    common = dict(cv=args.cv, n_jobs=args.n_jobs, verbose=2, scoring='f1_weighted')
+    if args.search == 'halving':
+        return HalvingGridSearchCV(pipeline, parameters, factor=3, random_state=42, **common)
+    if args.search == 'random':
+        return RandomizedSearchCV(pipeline, parameter_distributions, n_iter=args.n_iter, random_state=42, **common)
+    return GridSearchCV(pipeline, parameters, **common)
+
+
+def read_chunks(args):
+    """Yields (train, holdout) DataFrames, one pair per CSV chunk.
+
+    read_csv keeps counting the index across chunks, so the holdout split is
+    by global row number and stays the same in every pass.
+    """
+    for chunk in pd.read_csv(args.data, chunksize=args.chunksize, usecols=['description', 'is_genuine']):
+        holdout = (chunk.index % args.holdout_every) == 0
+        yield chunk[~holdout], chunk[holdout]
+
+
+def train_streaming(args):
+    """Out-of-core training: peak memory depends on --chunksize, not the dataset.
+
+    TF-IDF needs the whole vocabulary and document frequencies up front, so
+    this mode uses a stateless HashingVectorizer instead and an SGD-trained
+    linear SVM (hinge loss) updated one chunk at a time with partial_fit.
+    """
+    print(f"🌊 Streaming training from {args.data} in chunks of {args.chunksize} rows...")
+    vectorizer = HashingVectorizer(n_features=2 ** args.hash_bits, ngram_range=(1, 2), alternate_sign=False)
+    clf = SGDClassifier(loss='hinge', alpha=1e-5, random_state=42)
+    classes = np.array([0, 1])
+
+    # --- 1. Incremental Training ---
+    rows = 0
+    with stage('train'):
+        for epoch in range(args.epochs):
+            for i, (train, _) in enumerate(read_chunks(args)):
+                if train.empty:
+                    continue
+                # Shuffle within the chunk; SGD does badly on label-sorted input.
+                train = train.sample(frac=1, random_state=epoch * 100003 + i)
+                X = vectorizer.transform(clean_batch(train['description']))
+                clf.partial_fit(X, train['is_genuine'].to_numpy(), classes=classes)
+                rows += len(train)
+            print(f"   - epoch {epoch + 1}/{args.epochs} done ({rows} rows trained so far)")
+
+    # --- 2. Evaluation on the Held-out Rows (second streaming pass) ---
+    print("\n📊 Evaluating on the held-out rows...")
+    y_true, y_pred = [], []
+    with stage('evaluate'):
+        for _, holdout in read_chunks(args):
+            if holdout.empty:
+                continue
+            X = vectorizer.transform(clean_batch(holdout['description']))
+            y_true.append(holdout['is_genuine'].to_numpy(dtype=np.int8))
+            y_pred.append(clf.predict(X).astype(np.int8))
+    print(classification_report(np.concatenate(y_true), np.concatenate(y_pred)))
+
+    # --- 3. Save a Servable Pipeline ---
+    # Same shape as the tuned model (clean -> vectorize -> clf), so the app's
+    # registry can load it like any other pickle.
+    cleaner = FunctionTransformer(clean_batch).fit(None)
+    model = Pipeline([('clean', cleaner), ('hash', vectorizer.fit(None)), ('clf', clf)])
+    with stage('save'):
+        joblib.dump(model, args.output)
+    print(f"🏆 Streaming model saved to: {args.output}")
+
+    print("⏱️ Wall time per stage:")
+    for name, seconds in stage_times.items():
+        print(f"   - {name:<20} {seconds:8.2f}s")
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform == 'darwin' else 1)
+        print(f"   (peak RSS {peak_kb / 1024:.0f} MB)")
+
+
+def tune(args):
+    # --- 1. Setup and Data Loading ---
+    print("⚙️ Setting up...")
+    print("📂 Loading data...")
+
+    with stage('load data'):
+        df = pd.read_csv(args.data)
+
+        # Descriptions stay raw here: cleaning is the first step of the pipeline, so
+        # the saved model applies it itself at evaluation and serving time.
+        X = df['description']
+        y = df['is_genuine']
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=y, random_state=42)
+    print("Data loading complete.")
+
+    cache_dir = None
+    if not args.no_cache:
+        cache_dir = args.cache_dir or tempfile.mkdtemp(prefix='daan-tfidf-cache-')
+    memory = joblib.Memory(cache_dir, verbose=0) if cache_dir else None
+
+    # --- 2. Hyperparameter Tuning ---
+    print(f"\n🚀 Starting Hyperparameter Tuning for the Champion Model (SVM, {args.search} search)...")
+    search = build_search(args, memory)
+    try:
+        with stage(f'{args.search} search'):
+            search.fit(X_train, y_train)
+    finally:
+        if cache_dir and not args.cache_dir:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    # --- 3. Save the Single Best Model ---
+    print("\n✅ Tuning complete.")
+    print(f"Best F1-Score found: {search.best_score_:.4f}")
+    print("Best parameters found:")
+    print(search.best_params_)
+
+    # The search object itself contains the best, fully-trained model. Drop
+    # the cache reference so the saved pipeline does not point at it.
+    best_model = search.best_estimator_
+    best_model.set_params(memory=None)
+
+    with stage('save and export'):
+        # Save this single, best model to be used by the app.
+        BEST_MODEL_PATH = os.path.join(MODELS_DIR, 'best_model.pkl')
+        joblib.dump(best_model, BEST_MODEL_PATH)
+        print(f"\n🏆 Single best model saved to: {BEST_MODEL_PATH}")
+
+        # Also export the compact format the app prefers: it loads without sklearn.
+        # It must score exactly like the pickle, otherwise it is not kept.
+        COMPACT_MODEL_PATH = os.path.join(MODELS_DIR, 'best_model')
+        export_compact(best_model, COMPACT_MODEL_PATH)
+        compact_scores = CompactModel(COMPACT_MODEL_PATH).decision_function(list(X_test))
+        if np.array_equal(compact_scores, best_model.decision_function(X_test)):
+            print(f"📦 Compact model saved to: {COMPACT_MODEL_PATH}")
+        else:
+            shutil.rmtree(COMPACT_MODEL_PATH)
+            print("❌ Compact model scores differ from the pickle; the app will keep using best_model.pkl.")
 
-grid_search.fit(X_train, y_train)
+    # --- 4. Final Evaluation on the Test Set ---
+    print("\n📊 Evaluating the final tuned model on the unseen test data...")
+    with stage('evaluate'):
+        y_pred = best_model.predict(X_test)
+    print(classification_report(y_test, y_pred))
 
-# --- 3. Save the Single Best Model ---
-print("\n✅ Tuning complete.")
-print(f"Best F1-Score found: {grid_search.best_score_:.4f}")
-print("Best parameters found:")
-print(grid_search.best_params_)
+    # --- 5. Timing Summary ---
+    results = search.cv_results_
+    if cache_dir is None:
+        cache_note = "vectorizer cache off"
+    elif args.cache_dir:
+        cache_note = f"vectorizer cache kept in {cache_dir}"
+    else:
+        cache_note = "temporary vectorizer cache, removed"
+    print("⏱️ Wall time per stage:")
+    for name, seconds in stage_times.items():
+        print(f"   - {name:<20} {seconds:8.2f}s")
+    print(f"   ({len(results['params'])} candidates; mean fit {np.mean(results['mean_fit_time']):.2f}s, "
+          f"mean score {np.mean(results['mean_score_time']):.2f}s, final refit {search.refit_time_:.2f}s; "
+          f"{cache_note})")
 
-# The grid_search object itself contains the best, fully-trained model.
-best_model = grid_search.best_estimator_
 
-# Save this single, best model to be used by the app.
-BEST_MODEL_PATH = os.path.join(MODELS_DIR, 'best_model.pkl')
-joblib.dump(best_model, BEST_MODEL_PATH)
-print(f"\n🏆 Single best model saved to: {BEST_MODEL_PATH}")
+def main():
+    args = parse_args()
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    if args.mode == 'streaming':
+        train_streaming(args)
+    else:
+        tune(args)
 
 
-# --- 4. Final Evaluation on the Test Set ---
-print("\n📊 Evaluating the final tuned model on the unseen test data...")
-y_pred = best_model.predict(X_test)
-print(classification_report(y_test, y_pred))
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+"""The on-disk layer of PredictionCache stays bounded by TTL and row count."""
+
+import sqlite3
+
+from prediction_cache import PredictionCache, make_key
+
+
+def disk_rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+
+def test_disk_layer_is_capped(tmp_path):
+    path = str(tmp_path / "predictions.db")
+    cache = PredictionCache(maxsize=10, ttl=3600, db_path=path, disk_maxsize=50, prune_every=10)
+    for i in range(500):
+        cache.set(make_key(f"story {i}", "v1"), {"label": i})
+    assert disk_rows(path) <= 50 + 10
+    # The newest rows are the ones kept.
+    assert PredictionCache(db_path=path).get(make_key("story 499", "v1")) == {"label": 499}
+    assert PredictionCache(db_path=path).get(make_key("story 0", "v1")) is None
+
+
+def test_expired_rows_are_deleted_on_insert(tmp_path, monkeypatch):
+    path = str(tmp_path / "predictions.db")
+    cache = PredictionCache(ttl=60, db_path=path, prune_every=1)
+    now = 1_000_000.0
+    monkeypatch.setattr("prediction_cache.time.time", lambda: now)
+    cache.set(make_key("old story", "v1"), {"label": 0})
+    now += 120
+    cache.set(make_key("new story", "v1"), {"label": 1})
+    assert disk_rows(path) == 1
@@ -0,0 +1,147 @@
+"""web_enricher against a local stub server and a stub search: page timeouts,
+the overall enrichment deadline and refusal of non-HTML pages."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import web_enricher
+
+ARTICLE = (
+    "<html><body><p>Apollo Hospital in Delhi treats thousands of cancer patients every year. "
+    "Rohan Gupta was diagnosed with leukemia last spring. "
+    "His family has raised part of the cost of his chemotherapy. "
+    "The hospital confirmed that the treatment plan runs for six months. "
+    "Donations go directly to the hospital billing office.</p></body></html>"
+).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def send(self, content_type, body=b'', status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/article':
+            self.send('text/html; charset=utf-8', ARTICLE)
+        elif self.path == '/trickle':  # keeps sending, a little at a time, for 5 s
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.end_headers()
+            for _ in range(25):
+                self.wfile.write(b'<p>still loading</p>' * 10)
+                self.wfile.flush()
+                time.sleep(0.2)
+        elif self.path == '/hang':  # says nothing for 5 s
+            time.sleep(5)
+            self.send('text/html', ARTICLE)
+        elif self.path == '/image':
+            self.send('image/png', b'\x89PNG\r\n\x1a\n' + b'\x00' * 1024)
+        elif self.path == '/binary':  # labelled as HTML but is not
+            self.send('text/html', b'\x00\x01\x02' * 1024)
+        else:
+            self.send('text/html', b'not found', status=404)
+
+
+@pytest.fixture(scope='module')
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def session():
+    with requests.Session() as session:
+        yield session
+
+
+def test_html_page_is_summarized(server, session):
+    url = f"{server}/article"
+    results = web_enricher.fetch_and_summarize([url], session, page_timeout=5, deadline=10)
+    assert not web_enricher.is_error(results[url])
+    assert "leukemia" in results[url] or "Apollo" in results[url]
+
+
+def test_page_timeout_abandons_a_trickling_page(server, session):
+    start = time.monotonic()
+    text = web_enricher.read_webpage(f"{server}/trickle", session, timeout=1)
+    assert text.startswith("Could not retrieve the webpage. Timed out")
+    assert time.monotonic() - start < 2.5
+
+
+def test_overall_deadline_drops_slow_pages(server, session):
+    fast, slow = f"{server}/article", f"{server}/hang"
+    start = time.monotonic()
+    results = web_enricher.fetch_and_summarize([fast, slow], session, page_timeout=10, deadline=1.5)
+    assert time.monotonic() - start < 2.5
+    assert fast in results and slow not in results
+
+
+def test_overall_deadline_covers_summarization(server, session, monkeypatch):
+    def slow_summary(text, *args, **kwargs):
+        time.sleep(3)
+        return "too late"
+
+    monkeypatch.setattr(web_enricher, 'summarize_text', slow_summary)
+    start = time.monotonic()
+    results = web_enricher.fetch_and_summarize([f"{server}/article"], session, page_timeout=5, deadline=1)
+    assert time.monotonic() - start < 2
+    assert results == {}
+
+
+@pytest.mark.parametrize('path, reason', [
+    ('/image', "Unsupported content type: image/png"),
+    ('/binary', "binary, not text"),
+    ('/missing', "Status code: 404"),
+])
+def test_non_html_pages_are_rejected(server, session, path, reason):
+    url = f"{server}{path}"
+    results = web_enricher.fetch_and_summarize([url], session, page_timeout=5, deadline=10)
+    assert web_enricher.is_error(results[url])
+    assert reason in results[url]
+
+
+def test_get_web_enrichment_with_stub_search(server, session, monkeypatch):
+    # The spaCy model is not needed to exercise the fetch and summary stages.
+    monkeypatch.setattr(web_enricher, 'find_clues', lambda description: "rohan gupta leukemia apollo")
+    links = [f"{server}/image", f"{server}/article", f"{server}/hang"]
+    start = time.monotonic()
+    summary = web_enricher.get_web_enrichment(
+        "Help Rohan fight leukemia", search_fn=lambda query: links, session=session,
+        page_timeout=5, deadline=1.5, cache=False)
+    assert time.monotonic() - start < 2.5
+    assert not web_enricher.is_error(summary)
+    assert "Apollo" in summary or "leukemia" in summary
+
+
+def test_concurrent_first_callers_share_one_session(monkeypatch):
+    monkeypatch.setattr(web_enricher, '_session', None)
+    barrier = threading.Barrier(8)
+
+    def first_call(_):
+        barrier.wait()
+        return web_enricher.get_session()
+
+    with ThreadPoolExecutor(8) as pool:
+        sessions = set(map(id, pool.map(first_call, range(8))))
+    assert len(sessions) == 1
+
+
+def test_make_session_sizes_the_connection_pool():
+    session = web_enricher.make_session(40)
+    assert session.get_adapter('https://example.org')._pool_maxsize == 40